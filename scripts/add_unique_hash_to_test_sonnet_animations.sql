@@ -0,0 +1,10 @@
+-- Make the code hash unique so the renderer can upsert metadata on it
+-- Remove duplicate rows first, keeping the most recent one per hash
+DELETE FROM public.test_sonnet_animations a
+USING public.test_sonnet_animations b
+WHERE a.hash = b.hash
+  AND (a.created_at, a.id) < (b.created_at, b.id);
+
+-- Create the unique index used by ON CONFLICT (hash)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_test_sonnet_animations_hash
+ON public.test_sonnet_animations(hash);
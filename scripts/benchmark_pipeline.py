@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""Offline benchmark of the pre-render pipeline over the prompt/code dataset.
+
+Each sample's answer goes through the stages the renderer runs before manim:
+syntax check, repair, Scene detection, pre-flight analysis and cost
+estimation. Pre-flight runs against its built-in API tables instead of an
+installed manim, so nothing is rendered or imported.
+
+For each stage it reports throughput, p50/p99 latency and peak traced memory,
+plus how many samples parse before and after repair and how many pass
+pre-flight. Every run is saved as JSON named after the current commit, so
+two runs can be compared.
+
+Usage:
+    python benchmark_pipeline.py [combined_data.json] [--limit N] [--repeat 3] [--out bench_results]
+    python benchmark_pipeline.py --compare bench_results/old.json bench_results/new.json
+"""
+import argparse
+import ast
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+from code_repair import repair
+from manim_render import check_syntax
+from preflight import analyze, find_scenes
+from render_cost import estimate_features
+
+DEFAULT_DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "combined_data.json")
+STAGES = ("syntax", "repair", "scene_detection", "preflight", "cost_estimate")
+
+
+def load_samples(path, limit=None):
+    with open(path, 'r') as f:
+        samples = json.load(f)
+    codes = [sample.get('answer') or sample.get('code') or "" for sample in samples]
+    return codes[:limit] if limit else codes
+
+
+def _detect_scene(code):
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    scenes = find_scenes(tree)
+    return scenes[0].name if scenes else None
+
+
+def run_stages(raw_code):
+    """Run one sample through every stage. Returns ({stage: seconds}, outcome dict)."""
+    timings = {}
+    started = time.perf_counter()
+    parsed_raw, _ = check_syntax(raw_code)
+    timings['syntax'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    result = repair(raw_code)
+    timings['repair'] = time.perf_counter() - started
+    code = result.code
+
+    started = time.perf_counter()
+    scene = _detect_scene(code)
+    timings['scene_detection'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    report = analyze(code, use_installed_manim=False)
+    timings['preflight'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    estimate_features(code)
+    timings['cost_estimate'] = time.perf_counter() - started
+
+    return timings, {
+        'parsed_raw': parsed_raw,
+        'parsed_repaired': result.ok,
+        'repaired': result.changed,
+        'scene_found': scene is not None,
+        'preflight_ok': report.ok,
+        'rules': result.fired,
+    }
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def measure_peak_memory(codes):
+    """Peak traced allocation per stage, from a separate pass so tracing doesn't skew the timings."""
+    peaks = {}
+    stage_inputs = {
+        'syntax': (check_syntax, codes),
+        'repair': (repair, codes),
+    }
+    repaired = [repair(code).code for code in codes]
+    stage_inputs['scene_detection'] = (_detect_scene, repaired)
+    stage_inputs['preflight'] = (lambda code: analyze(code, use_installed_manim=False), repaired)
+    stage_inputs['cost_estimate'] = (estimate_features, repaired)
+    for stage in STAGES:
+        func, inputs = stage_inputs[stage]
+        tracemalloc.start()
+        for code in inputs:
+            func(code)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peaks[stage] = peak
+    return peaks
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def benchmark(codes, repeat=1):
+    """Run the whole dataset repeat times and return the results dict."""
+    latencies = {stage: [] for stage in STAGES}
+    outcomes = []
+    wall = 0.0
+    for round_number in range(repeat):
+        started = time.perf_counter()
+        for code in codes:
+            timings, outcome = run_stages(code)
+            for stage, seconds in timings.items():
+                latencies[stage].append(seconds)
+            if round_number == 0:
+                outcomes.append(outcome)
+        wall += time.perf_counter() - started
+
+    peaks = measure_peak_memory(codes)
+    stages = {}
+    for stage in STAGES:
+        values = latencies[stage]
+        total = sum(values)
+        stages[stage] = {
+            'samples_per_second': len(values) / total if total else 0.0,
+            'p50_ms': percentile(values, 0.50) * 1000,
+            'p99_ms': percentile(values, 0.99) * 1000,
+            'mean_ms': total / len(values) * 1000 if values else 0.0,
+            'peak_memory_kb': peaks[stage] / 1024,
+        }
+
+    broken = [o for o in outcomes if not o['parsed_raw']]
+    rules = {}
+    for outcome in outcomes:
+        for rule, count in outcome['rules'].items():
+            rules[rule] = rules.get(rule, 0) + count
+    return {
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'samples': len(codes),
+        'repeat': repeat,
+        'pipeline_samples_per_second': len(codes) * repeat / wall if wall else 0.0,
+        'stages': stages,
+        'quality': {
+            'parsed_raw': sum(o['parsed_raw'] for o in outcomes),
+            'parsed_after_repair': sum(o['parsed_repaired'] for o in outcomes),
+            'repair_success_rate': (sum(o['parsed_repaired'] for o in broken) / len(broken)) if broken else 1.0,
+            'scene_found': sum(o['scene_found'] for o in outcomes),
+            'preflight_ok': sum(o['preflight_ok'] for o in outcomes),
+            'repaired': sum(o['repaired'] for o in outcomes),
+        },
+        'rules_fired': dict(sorted(rules.items(), key=lambda item: -item[1])),
+    }
+
+
+def print_results(results):
+    print(f"{results['samples']} samples x {results['repeat']} at {results['revision']}: "
+          f"{results['pipeline_samples_per_second']:.0f} samples/s through the whole pipeline")
+    print(f"{'stage':<16}{'samples/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'peak KB':>10}")
+    for stage, stats in results['stages'].items():
+        print(f"{stage:<16}{stats['samples_per_second']:>12.0f}{stats['p50_ms']:>10.3f}"
+              f"{stats['p99_ms']:>10.3f}{stats['peak_memory_kb']:>10.0f}")
+    quality = results['quality']
+    print(f"Parse before repair {quality['parsed_raw']}, after {quality['parsed_after_repair']} "
+          f"(repair success rate {quality['repair_success_rate']:.1%}); "
+          f"scene found {quality['scene_found']}, pre-flight ok {quality['preflight_ok']}")
+
+
+def compare(old_path, new_path):
+    """Print per-stage and quality deltas between two saved runs."""
+    with open(old_path, 'r') as f:
+        old = json.load(f)
+    with open(new_path, 'r') as f:
+        new = json.load(f)
+    print(f"{old['revision']} -> {new['revision']}")
+    for stage in STAGES:
+        if stage not in old['stages'] or stage not in new['stages']:
+            continue
+        for metric in ('samples_per_second', 'p50_ms', 'p99_ms', 'peak_memory_kb'):
+            before, after = old['stages'][stage][metric], new['stages'][stage][metric]
+            change = (after - before) / before * 100 if before else 0.0
+            print(f"{stage:<16}{metric:<20}{before:>12.3f} -> {after:>12.3f} ({change:+.1f}%)")
+    for metric, after in new['quality'].items():
+        before = old['quality'].get(metric)
+        print(f"{metric:<36}{before} -> {after}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pre-render pipeline over the dataset")
+    parser.add_argument("dataset", nargs="?", default=DEFAULT_DATASET)
+    parser.add_argument("--limit", type=int, help="Only use the first N samples")
+    parser.add_argument("--repeat", type=int, default=1, help="Timed passes over the dataset")
+    parser.add_argument("--out", default="bench_results", help="Directory for the saved JSON results")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two saved runs and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    else:
+        results = benchmark(load_samples(args.dataset, args.limit), args.repeat)
+        print_results(results)
+        os.makedirs(args.out, exist_ok=True)
+        out_path = os.path.join(args.out, f"{results['revision']}_{datetime.now():%Y%m%d_%H%M%S}.json")
+        with open(out_path, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results to {out_path}")
@@ -0,0 +1,669 @@
+#!/usr/bin/env python3
+"""Shared repair engine for generated Manim code.
+
+Repairs run in three fixed stages instead of a chain of regex passes:
+
+1. Text cleanup: markdown fences, spreadsheet `_x000D_` escapes, CRLF line
+   endings and a few known literal typos.
+2. Bracket repair on the token stream: brackets inside strings and comments
+   are ignored, stray closers are dropped and unclosed openers are closed at
+   the end of the statement they belong to.
+3. One AST pass that dispatches every node to the rules registered with
+   @register_rule, so adding an API-compatibility rewrite is one class.
+
+The source is only regenerated with ast.unparse() if an AST rule fired, so
+comments are kept whenever no rewrite was needed.
+
+Usage:
+    python code_repair.py scene.py           # print the repaired code and the rules that fired
+    python code_repair.py --bench data.json  # repair every sample and report rule counts and timing
+    python code_repair.py --check            # repair EXAMPLES and report any that come out wrong
+"""
+import ast
+import io
+import json
+import re
+import sys
+import time
+import tokenize
+from collections import Counter
+from dataclasses import dataclass, field
+
+BRACKETS = {'(': ')', '[': ']', '{': '}'}
+
+# Literal fixes applied before parsing: (rule name, broken text, replacement)
+TEXT_FIXES = [
+    ("crlf", "\r\n", "\n"),
+    ("excel-cr-escape", "_x000D_", ""),
+    ("star-in-condition", "if *self.mobjects in self.mobjects:", "if self.mobjects:  # Fixed syntax"),
+    ("unclosed-vgroup-star", "if VGroup(*tree_mobjects in self.mobjects:",
+     "if VGroup(*tree_mobjects) in self.mobjects:  # Fixed syntax"),
+]
+
+
+@dataclass
+class RepairResult:
+    """Repaired code plus which rules changed it."""
+    code: str
+    fired: Counter = field(default_factory=Counter)
+    syntax_error: str = None
+
+    @property
+    def ok(self):
+        return self.syntax_error is None
+
+    @property
+    def changed(self):
+        return bool(self.fired)
+
+
+def clean_text(code, fired):
+    """Stage 1: strip wrappers and escapes that are never valid Python."""
+    stripped = code.strip()
+    if stripped.startswith("\\n"):
+        stripped = stripped[2:].strip()
+        fired["literal-newline-prefix"] += 1
+    if stripped.startswith("```"):
+        lines = stripped.split("\n")
+        lines = lines[1:]
+        if lines and lines[-1].strip().startswith("```"):
+            lines = lines[:-1]
+        stripped = "\n".join(lines)
+        fired["markdown-fence"] += 1
+    for name, broken, replacement in TEXT_FIXES:
+        if broken in stripped:
+            stripped = stripped.replace(broken, replacement)
+            fired[name] += 1
+    return stripped + "\n" if stripped else stripped
+
+
+def repair_brackets(code, fired):
+    """Stage 2: balance brackets using the tokenizer.
+
+    Stray closing brackets are removed. Each unclosed opener is closed after
+    the last token of its statement, found as the last line before the code
+    dedents back to the opener line's indentation.
+    """
+    tokens = []
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(code).readline):
+            tokens.append(token)
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        pass
+
+    stack = []
+    stray = []
+    line_ends = {}
+    for token in tokens:
+        if token.type == tokenize.OP and token.string in BRACKETS:
+            stack.append(token)
+        elif token.type == tokenize.OP and token.string in BRACKETS.values():
+            if stack and BRACKETS[stack[-1].string] == token.string:
+                stack.pop()
+            else:
+                stray.append(token)
+        if token.type not in (tokenize.COMMENT, tokenize.NL, tokenize.NEWLINE, tokenize.INDENT,
+                              tokenize.DEDENT, tokenize.ENDMARKER):
+            line_ends[token.end[0]] = max(line_ends.get(token.end[0], 0), token.end[1])
+
+    if not stack and not stray:
+        return code
+
+    lines = code.split("\n")
+    edits = []  # (row, col, text to insert or None to delete one char)
+    for token in stray:
+        edits.append((token.start[0], token.start[1], None))
+    for opener in stack:
+        row = opener.start[0]
+        indent = len(lines[row - 1]) - len(lines[row - 1].lstrip())
+        last = row
+        for next_row in range(row + 1, len(lines) + 1):
+            text = lines[next_row - 1]
+            if not text.strip() or text.lstrip().startswith("#"):
+                continue
+            if len(text) - len(text.lstrip()) <= indent:
+                break
+            last = next_row
+        col = line_ends.get(last, len(lines[last - 1].rstrip()))
+        edits.append((last, col, BRACKETS[opener.string]))
+
+    # Apply right-to-left so earlier positions stay valid. Openers are visited
+    # outermost first and each insert lands in front of the previous one, so
+    # closers sharing a position come out innermost first.
+    for row, col, text in sorted(edits, key=lambda edit: (edit[0], edit[1]), reverse=True):
+        line = lines[row - 1]
+        if text is None:
+            lines[row - 1] = line[:col] + line[col + 1:]
+        else:
+            lines[row - 1] = line[:col] + text + line[col:]
+    fired["bracket-balance"] += len(stack) + len(stray)
+    return "\n".join(lines)
+
+
+# ---------------------------------------------------------------------------
+# AST rules
+
+_RULES = []
+
+
+def register_rule(cls):
+    """Class decorator adding an AST rule to the registry."""
+    _RULES.append(cls)
+    return cls
+
+
+def registered_rules():
+    return list(_RULES)
+
+
+class Rule:
+    """Base class for AST rules.
+
+    Define visit_<NodeType>(self, node) methods returning the replacement
+    node, or the node unchanged. Call self.fire() whenever something is
+    rewritten. prepare(tree) runs once before the shared pass.
+
+    A new node returned in place of the old one is dispatched again from the
+    top, children included, so every rule sees it. Rules must leave alone
+    what they already rewrote.
+    """
+    name = None
+
+    def __init__(self):
+        self.fired = 0
+
+    def fire(self):
+        self.fired += 1
+
+    def prepare(self, tree):
+        pass
+
+
+def _call_name(node):
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+        return node.func.id
+    return None
+
+
+def _is_self_method(node, method):
+    return (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == method
+            and isinstance(node.func.value, ast.Name) and node.func.value.id == "self")
+
+
+@register_rule
+class SectionRule(Rule):
+    """self.section(name) does not exist; self.next_section(name) does."""
+    name = "section-to-next-section"
+
+    def visit_Call(self, node):
+        if not _is_self_method(node, "section"):
+            return node
+        self.fire()
+        # next_section only takes a name; anything else the old call passed is dropped
+        node.func.attr = "next_section"
+        node.args, node.keywords = node.args[:1], []
+        return node
+
+
+@register_rule
+class TexColorRule(Rule):
+    """Tex(..., color=X) -> Tex(...).set_color(X), and the same for MathTex."""
+    name = "tex-color-kwarg"
+
+    def visit_Call(self, node):
+        if _call_name(node) not in ("Tex", "MathTex"):
+            return node
+        color = next((kw for kw in node.keywords if kw.arg == "color"), None)
+        if color is None:
+            return node
+        self.fire()
+        node.keywords = [kw for kw in node.keywords if kw is not color]
+        return ast.Call(func=ast.Attribute(value=node, attr="set_color", ctx=ast.Load()), args=[color.value],
+                        keywords=[])
+
+
+@register_rule
+class GetEdgeRule(Rule):
+    """x.get_edge(LEFT) -> x.get_left(), likewise RIGHT/UP/DOWN."""
+    name = "get-edge-direction"
+    METHODS = {"LEFT": "get_left", "RIGHT": "get_right", "UP": "get_top", "DOWN": "get_bottom"}
+
+    def visit_Call(self, node):
+        if not (isinstance(node.func, ast.Attribute) and node.func.attr == "get_edge"
+                and len(node.args) == 1 and not node.keywords and isinstance(node.args[0], ast.Name)
+                and node.args[0].id in self.METHODS):
+            return node
+        self.fire()
+        node.func.attr = self.METHODS[node.args[0].id]
+        node.args = []
+        return node
+
+
+@register_rule
+class IndicateSliceRule(Rule):
+    """Indicate(group[a:b]) and Indicate(python_list) -> Indicate(VGroup(...))."""
+    name = "indicate-vgroup"
+
+    def prepare(self, tree):
+        # Names assigned a plain list, which Indicate cannot animate directly
+        self.list_names = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Assign) and isinstance(node.value, (ast.List, ast.ListComp)):
+                self.list_names.update(t.id for t in node.targets if isinstance(t, ast.Name))
+
+    def visit_Call(self, node):
+        if _call_name(node) != "Indicate" or not node.args:
+            return node
+        target = node.args[0]
+        if isinstance(target, ast.Subscript) and isinstance(target.slice, ast.Slice):
+            bounds = [target.slice.lower, target.slice.upper, target.slice.step]
+            if not all(b is None or (isinstance(b, ast.Constant) and isinstance(b.value, int)) for b in bounds) \
+                    or bounds[1] is None:
+                return node
+            start, stop, step = (b.value if b is not None else None for b in bounds)
+            indices = list(range(start or 0, stop, step or 1))
+            items = [ast.Subscript(value=target.value, slice=ast.Constant(i), ctx=ast.Load()) for i in indices]
+            self.fire()
+            node.args[0] = items[0] if len(items) == 1 else ast.Call(
+                func=ast.Name(id="VGroup", ctx=ast.Load()), args=items, keywords=[])
+        elif isinstance(target, ast.Name) and target.id in self.list_names:
+            self.fire()
+            node.args[0] = ast.Call(func=ast.Name(id="VGroup", ctx=ast.Load()),
+                                    args=[ast.Starred(value=target, ctx=ast.Load())], keywords=[])
+        return node
+
+
+@register_rule
+class TexAmpersandRule(Rule):
+    """Escape bare & in Tex() text, where LaTeX treats it as a column separator."""
+    name = "tex-ampersand"
+
+    def visit_Call(self, node):
+        if _call_name(node) != "Tex":
+            return node
+        for arg in node.args:
+            if isinstance(arg, ast.Constant) and isinstance(arg.value, str) and "&" in arg.value:
+                escaped = arg.value.replace("\\&", "&").replace("&", "\\&")
+                if escaped != arg.value:
+                    arg.value = escaped
+                    self.fire()
+        return node
+
+
+@register_rule
+class RemovedNameRule(Rule):
+    """Rename animations and mobjects removed from manim CE to their replacements."""
+    name = "removed-manim-name"
+    RENAMES = {
+        "ShowCreation": "Create",
+        "TextMobject": "Tex",
+        "TexMobject": "MathTex",
+        "ShowCreationThenDestruction": "ShowPassingFlash",
+    }
+    SHIFTED_FADES = {"FadeInFromDown": ("FadeIn", "UP"), "FadeOutAndShiftDown": ("FadeOut", "DOWN")}
+
+    def prepare(self, tree):
+        # Leave names alone if the file defines them itself
+        self.defined = {node.name for node in ast.walk(tree)
+                        if isinstance(node, (ast.ClassDef, ast.FunctionDef))}
+
+    def visit_Name(self, node):
+        if node.id in self.RENAMES and node.id not in self.defined and isinstance(node.ctx, ast.Load):
+            node.id = self.RENAMES[node.id]
+            self.fire()
+        return node
+
+    def visit_Call(self, node):
+        name = _call_name(node)
+        if name in self.SHIFTED_FADES and name not in self.defined:
+            animation, direction = self.SHIFTED_FADES[name]
+            node.func.id = animation
+            node.keywords.append(ast.keyword(arg="shift", value=ast.Name(id=direction, ctx=ast.Load())))
+            self.fire()
+        return node
+
+
+@register_rule
+class SceneBaseRule(Rule):
+    """Upgrade a plain Scene base when the scene uses camera features it lacks."""
+    name = "scene-base-upgrade"
+    THREE_D_METHODS = {"set_camera_orientation", "move_camera", "begin_ambient_camera_rotation",
+                       "stop_ambient_camera_rotation", "add_fixed_in_frame_mobjects"}
+
+    def visit_ClassDef(self, node):
+        bases = [b for b in node.bases if isinstance(b, ast.Name)]
+        scene_base = next((b for b in bases if b.id == "Scene"), None)
+        if scene_base is None:
+            return node
+        needs_3d = needs_moving = False
+        for item in ast.walk(node):
+            if isinstance(item, ast.Call) and isinstance(item.func, ast.Attribute) \
+                    and item.func.attr in self.THREE_D_METHODS:
+                needs_3d = True
+            elif isinstance(item, ast.Attribute) and item.attr == "frame" and isinstance(item.value, ast.Attribute) \
+                    and item.value.attr == "camera":
+                needs_moving = True
+        if needs_3d:
+            scene_base.id = "ThreeDScene"
+            self.fire()
+        elif needs_moving:
+            scene_base.id = "MovingCameraScene"
+            self.fire()
+        return node
+
+
+# ---------------------------------------------------------------------------
+# Targeted rules
+#
+# Not registered, so repair() never runs them by default. failure_classifier.py
+# picks one for a scene whose render failed in a known way and passes it in
+# rules=, e.g. functools.partial(DropKeywordRule, "tip_length").
+
+
+def _squash(text):
+    return "".join(text.split())
+
+
+class TexToTextRule(Rule):
+    """Tex/MathTex -> Text when LaTeX can't compile them; only calls matching snippet if one is given."""
+    name = "tex-to-text"
+    TEXT_KEYWORDS = {"color", "font_size", "fill_opacity", "stroke_width", "weight", "slant"}
+
+    def __init__(self, snippet=None):
+        super().__init__()
+        self.snippet = _squash(snippet) if snippet else None
+
+    def visit_Call(self, node):
+        if _call_name(node) not in ("Tex", "MathTex") or not node.args:
+            return node
+        parts = [arg.value for arg in node.args if isinstance(arg, ast.Constant) and isinstance(arg.value, str)]
+        if len(parts) != len(node.args):
+            return node
+        source = _squash("".join(parts))
+        if self.snippet and source not in self.snippet and self.snippet not in source:
+            return node
+        text = " ".join(parts).replace("\\\\", "\n").replace("$", "")
+        text = re.sub(r"\\frac\{([^{}]*)\}\{([^{}]*)\}", r"\1/\2", text)
+        text = re.sub(r"\\([a-zA-Z]+)\s*", r"\1 ", text)
+        text = text.replace("\\", "").replace("{", "").replace("}", "")
+        self.fire()
+        node.func.id = "Text"
+        node.args = [ast.Constant(re.sub(r" +", " ", text).strip())]
+        node.keywords = [kw for kw in node.keywords if kw.arg in self.TEXT_KEYWORDS]
+        return node
+
+
+class DropStatementRule(Rule):
+    """Replace statements using an attribute or name manim lacks with pass, and statements using what they set.
+
+    Compound statements are dropped whole when their header (test, iterable,
+    context manager) uses it.
+    """
+    name = "drop-unknown-api"
+    STATEMENTS = (ast.Expr, ast.Assign, ast.AugAssign, ast.AnnAssign, ast.Return, ast.For, ast.While, ast.If,
+                  ast.With, ast.Import, ast.ImportFrom)
+    HEADER_FIELDS = ("test", "iter", "items")
+
+    def __init__(self, attr=None, name=None):
+        super().__init__()
+        self.attrs = {attr} if attr else set()
+        self.names = {name} if name else set()
+
+    def seed(self, tree):
+        """Statements to drop regardless of what they use."""
+        return set()
+
+    def prepare(self, tree):
+        self.dropped = self.seed(tree)
+        statements = sorted((node for node in ast.walk(tree) if isinstance(node, self.STATEMENTS)),
+                            key=lambda node: (node.lineno, node.col_offset))
+        for statement in statements:
+            if id(statement) not in self.dropped and not self._uses(statement):
+                continue
+            self.dropped.add(id(statement))
+            # Whatever the statement would have defined is now missing too
+            targets = list(getattr(statement, "targets", ())) + [getattr(statement, "target", None)]
+            targets += [item.optional_vars for item in getattr(statement, "items", ())]
+            for target in filter(None, targets):
+                for node in ast.walk(target):
+                    if isinstance(node, ast.Name):
+                        self.names.add(node.id)
+                    elif isinstance(node, ast.Attribute):
+                        self.attrs.add(node.attr)
+
+    def _uses(self, statement):
+        if hasattr(statement, "body"):
+            parts = [getattr(statement, field) for field in self.HEADER_FIELDS if hasattr(statement, field)]
+        else:
+            parts = [statement]
+        for part in parts:
+            for item in part if isinstance(part, list) else [part]:
+                for node in ast.walk(item):
+                    if not isinstance(getattr(node, "ctx", None), ast.Load):
+                        continue
+                    if isinstance(node, ast.Attribute) and node.attr in self.attrs \
+                            or isinstance(node, ast.Name) and node.id in self.names:
+                        return True
+        return False
+
+    def rewrite(self, node):
+        """Replacement for one statement."""
+        if id(node) not in self.dropped:
+            return node
+        self.fire()
+        return ast.copy_location(ast.Pass(), node)
+
+    def _visit_statement(self, node):
+        return self.rewrite(node)
+
+    visit_Expr = visit_Assign = visit_AugAssign = visit_AnnAssign = visit_Return = _visit_statement
+    visit_For = visit_While = visit_If = visit_With = visit_Import = visit_ImportFrom = _visit_statement
+
+
+class ImportRule(DropStatementRule):
+    """Fix an import of a missing module or name.
+
+    manimlib and other old manim packages become `from manim import *`.
+    Imports of anything else are dropped along with the code that uses them.
+    """
+    name = "fix-missing-import"
+
+    def __init__(self, module=None, name=None):
+        super().__init__()
+        self.module = module
+        self.missing_name = name
+        root = (module or "").split(".")[0]
+        self.old_manim = root.startswith("manim") and root != "manim"
+
+    def _modules(self, node):
+        if isinstance(node, ast.Import):
+            return [alias.name for alias in node.names]
+        return [node.module or ""]
+
+    def _imports_module(self, node):
+        if self.old_manim:
+            root = self.module.split(".")[0]
+            return any(m.split(".")[0] == root for m in self._modules(node))
+        return any(m == self.module or m.startswith(self.module + ".") for m in self._modules(node))
+
+    def seed(self, tree):
+        dropped = set()
+        for node in ast.walk(tree):
+            if not isinstance(node, (ast.Import, ast.ImportFrom)):
+                continue
+            if self.module and not self.old_manim and self._imports_module(node):
+                dropped.add(id(node))
+                self.names.update((alias.asname or alias.name).split(".")[0] for alias in node.names)
+            elif self.missing_name and isinstance(node, ast.ImportFrom) \
+                    and any(alias.name == self.missing_name for alias in node.names):
+                self.names.add(self.missing_name)
+        return dropped
+
+    def rewrite(self, node):
+        if isinstance(node, (ast.Import, ast.ImportFrom)) and id(node) not in self.dropped:
+            if self.module and self.old_manim and self._imports_module(node):
+                self.fire()
+                return ast.copy_location(ast.ImportFrom(module="manim", names=[ast.alias(name="*")], level=0), node)
+            if self.missing_name and isinstance(node, ast.ImportFrom):
+                kept = [alias for alias in node.names if alias.name != self.missing_name]
+                if len(kept) != len(node.names):
+                    self.fire()
+                    if not kept:
+                        return ast.copy_location(ast.Pass(), node)
+                    node.names = kept
+            return node
+        return super().rewrite(node)
+
+
+class DropKeywordRule(Rule):
+    """Remove a keyword argument the installed manim doesn't accept from every call."""
+    name = "drop-unknown-keyword"
+
+    def __init__(self, keyword):
+        super().__init__()
+        self.keyword = keyword
+
+    def visit_Call(self, node):
+        kept = [kw for kw in node.keywords if kw.arg != self.keyword]
+        if len(kept) != len(node.keywords):
+            self.fire()
+            node.keywords = kept
+        return node
+
+
+class ShortenRule(Rule):
+    """Cap literal run_time= and self.wait() durations, for scenes that ran out of time."""
+    name = "shorten-durations"
+    MAX_SECONDS = 2.0
+
+    def _cap(self, value):
+        if isinstance(value, ast.Constant) and isinstance(value.value, (int, float)) \
+                and not isinstance(value.value, bool) and value.value > self.MAX_SECONDS:
+            self.fire()
+            return ast.Constant(self.MAX_SECONDS)
+        return value
+
+    def visit_Call(self, node):
+        if _is_self_method(node, "wait") and node.args:
+            node.args[0] = self._cap(node.args[0])
+        for kw in node.keywords:
+            if kw.arg in ("run_time", "duration"):
+                kw.value = self._cap(kw.value)
+        return node
+
+
+class _Dispatcher(ast.NodeTransformer):
+    """Single traversal that hands each node to every rule with a matching visitor."""
+
+    def __init__(self, rules):
+        self.handlers = {}
+        for rule in rules:
+            for attr in dir(rule):
+                if attr.startswith("visit_"):
+                    self.handlers.setdefault(attr[len("visit_"):], []).append(getattr(rule, attr))
+
+    def visit(self, node):
+        self.generic_visit(node)
+        for handler in self.handlers.get(type(node).__name__, ()):
+            replacement = handler(node)
+            if replacement is None:
+                return None
+            if replacement is not node:
+                # e.g. Tex(..., color=X).set_color(X): the rules after this one must still see the Tex call
+                return self.visit(replacement)
+        return node
+
+
+def apply_rules(code, fired, rules=None):
+    """Stage 3: run every registered rule in one AST pass. Returns the new code."""
+    tree = ast.parse(code)
+    instances = [rule() for rule in (rules if rules is not None else _RULES)]
+    for rule in instances:
+        rule.prepare(tree)
+    tree = _Dispatcher(instances).visit(tree)
+    changed = False
+    for rule in instances:
+        if rule.fired:
+            fired[rule.name] += rule.fired
+            changed = True
+    if not changed:
+        return code
+    return ast.unparse(ast.fix_missing_locations(tree)) + "\n"
+
+
+def repair(code, rules=None):
+    """Run all repair stages over code and return a RepairResult."""
+    fired = Counter()
+    code = clean_text(code, fired)
+    try:
+        ast.parse(code)
+    except SyntaxError:
+        code = repair_brackets(code, fired)
+
+    try:
+        code = apply_rules(code, fired, rules)
+    except SyntaxError as e:
+        return RepairResult(code, fired, str(e))
+    return RepairResult(code, fired)
+
+
+# Inputs whose repair depends on several rules together: (code, expected repaired code)
+EXAMPLES = [
+    ("Tex('A & B', color=RED)\n", "Tex('A \\\\& B').set_color(RED)\n"),
+    ("MathTex('x', color=BLUE).get_edge(LEFT)\n", "MathTex('x').set_color(BLUE).get_left()\n"),
+    ("self.play(ShowCreation(TextMobject('Q&A', color=RED)))\n",
+     "self.play(Create(Tex('Q\\\\&A').set_color(RED)))\n"),
+]
+
+
+def check_examples():
+    """Repair each of EXAMPLES and print any mismatch. Returns the number of failures."""
+    failures = 0
+    for code, expected in EXAMPLES:
+        result = repair(code)
+        if result.code != expected:
+            failures += 1
+            print(f"{code.strip()!r}\n  expected {expected.strip()!r}\n  got      {result.code.strip()!r}")
+    print(f"{len(EXAMPLES) - failures}/{len(EXAMPLES)} examples repaired as expected")
+    return failures
+
+
+def benchmark(path):
+    """Repair every sample in a combined_data.json-style file and print a summary."""
+    with open(path, 'r') as f:
+        samples = json.load(f)
+    totals = Counter()
+    repaired = parsed_before = 0
+    started = time.perf_counter()
+    for sample in samples:
+        code = sample.get('answer') or sample.get('code') or ""
+        try:
+            ast.parse(code)
+            parsed_before += 1
+        except SyntaxError:
+            pass
+        result = repair(code)
+        totals.update(result.fired)
+        repaired += result.ok
+    elapsed = time.perf_counter() - started
+    print(f"{len(samples)} samples in {elapsed:.2f}s ({len(samples) / elapsed:.0f}/s)")
+    print(f"Parse before repair: {parsed_before}, after: {repaired}")
+    for name, count in totals.most_common():
+        print(f"{count:>6}  {name}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--bench":
+        benchmark(sys.argv[2])
+    elif sys.argv[1:] == ["--check"]:
+        sys.exit(1 if check_examples() else 0)
+    elif len(sys.argv) == 2:
+        with open(sys.argv[1], 'r') as f:
+            result = repair(f.read())
+        print(result.code)
+        for name, count in result.fired.items():
+            print(f"# {name}: {count}", file=sys.stderr)
+        if not result.ok:
+            print(f"# still invalid: {result.syntax_error}", file=sys.stderr)
+    else:
+        print("Usage: python code_repair.py your_manim_script.py | --bench combined_data.json | --check")
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""Sort failed renders into classes and pick a targeted repair for each.
+
+A failed render used to go straight to the fallback scene, and the job was
+then skipped forever as "Manim rendering failed". The classifier reads the
+error class, the tail of manim's output and any LaTeX logs, and sorts the
+failure into one of these classes:
+    latex        a Tex/MathTex string LaTeX could not compile
+    unknown_api  an attribute, name or keyword the installed manim lacks
+    timeout      the render ran out of its time or CPU budget
+    oom          the render ran out of its memory budget or was OOM-killed
+    import       a module or name that can't be imported
+    unknown      anything else
+
+Every class except unknown maps to a retry plan. The plan is a code_repair
+targeted rule aimed at the failing construct and, for memory, a lower
+quality. The scene is then rendered again instead of falling back.
+
+Usage:
+    python failure_classifier.py stderr.txt [ErrorClass]   # classify a saved manim log
+"""
+import functools
+import glob
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+
+from code_repair import (DropKeywordRule, DropStatementRule, ImportRule, ShortenRule, TexToTextRule, repair)
+from manim_render import EXCEPTION_LINE
+
+LATEX = "latex"
+UNKNOWN_API = "unknown_api"
+TIMEOUT = "timeout"
+OOM = "oom"
+IMPORT = "import"
+UNKNOWN = "unknown"
+
+LOW_MEMORY_FLAGS = "-ql"  # Quality a scene that ran out of memory is retried at
+
+MISSING_ATTRIBUTE = re.compile(r"has no attribute '(\w+)'")
+MISSING_NAME = re.compile(r"name '(\w+)' is not defined")
+UNEXPECTED_KEYWORD = re.compile(r"unexpected keyword argument '(\w+)'")
+MISSING_MODULE = re.compile(r"No module named '([\w.]+)'")
+MISSING_IMPORT_NAME = re.compile(r"cannot import name '(\w+)'")
+LATEX_MARKERS = ("LaTeX compilation error", "latex error converting", "LaTeX Error")
+
+
+@dataclass
+class Failure:
+    """What went wrong with one render."""
+    kind: str
+    error_class: str
+    detail: str = ""
+    symbol: str = None  # The attribute, name, keyword or module at fault
+    snippet: str = None  # The Tex source LaTeX failed on, when it could be found
+
+
+@dataclass
+class RetryPlan:
+    """How to render a failed scene again."""
+    code: str
+    quality_flags: str = None  # None keeps the original quality
+    fired: dict = field(default_factory=dict)
+
+
+def last_exception(text):
+    """(error class, message) of the last exception line in text, or (None, None)."""
+    found = (None, None)
+    for line in text.splitlines():
+        match = EXCEPTION_LINE.match(line)
+        if match:
+            found = (match.group(2), (match.group(3) or "").strip())
+    return found
+
+
+def failing_tex(media_dir):
+    """Body of the newest .tex file under media_dir that LaTeX failed on, or None."""
+    if not media_dir:
+        return None
+    # Split renders keep a media directory per piece, so search the whole tree
+    logs = sorted(glob.glob(os.path.join(media_dir, "**", "Tex", "*.log"), recursive=True), key=os.path.getmtime,
+                  reverse=True)
+    for log_path in logs:
+        base = os.path.splitext(log_path)[0]
+        if any(os.path.exists(base + ext) for ext in (".dvi", ".xdv", ".svg")):
+            continue  # This one compiled
+        try:
+            with open(base + ".tex", 'r') as f:
+                source = f.read()
+        except OSError:
+            continue
+        body = source.split("\\begin{document}", 1)[-1].split("\\end{document}", 1)[0]
+        # Drop the environment manim wraps the text in
+        lines = [line for line in body.strip().split("\n") if not re.match(r"\s*\\(begin|end)\{[\w*]+\}\s*$", line)]
+        return "\n".join(lines).strip() or None
+    return None
+
+
+def classify(error_class, error="", stderr="", media_dir=None):
+    """Classify a failed render from its RenderResult fields and, for LaTeX, its media directory."""
+    error = error or ""
+    stderr = stderr or ""
+    text = f"{error}\n{stderr}"
+    if error_class in ("Timeout", "CpuLimit"):
+        return Failure(TIMEOUT, error_class, error)
+    if error_class in ("MemoryLimit", "MemoryError") or error.endswith("code -9"):
+        return Failure(OOM, error_class, error)
+    if error_class == "LatexError" or any(marker in text for marker in LATEX_MARKERS):
+        return Failure(LATEX, error_class, error, snippet=failing_tex(media_dir))
+
+    # The error class of a plain non-zero exit is in the traceback
+    exception, message = error_class, error
+    if error_class in (None, "RenderError", "WorkerCrashed"):
+        found_class, found_message = last_exception(stderr)
+        if found_class:
+            exception, message = found_class, found_message
+    if exception in ("ModuleNotFoundError", "ImportError"):
+        module = MISSING_MODULE.search(message)
+        name = MISSING_IMPORT_NAME.search(message)
+        symbol = module.group(1) if module else name.group(1) if name else None
+        return Failure(IMPORT, exception, message, symbol)
+    patterns = {"AttributeError": MISSING_ATTRIBUTE, "NameError": MISSING_NAME, "TypeError": UNEXPECTED_KEYWORD}
+    match = patterns[exception].search(message) if exception in patterns else None
+    if match:
+        return Failure(UNKNOWN_API, exception, message, match.group(1))
+    return Failure(UNKNOWN, exception or "RenderError", message)
+
+
+def targeted_rule(failure):
+    """The code_repair rule aimed at this failure, or None."""
+    if failure.kind == LATEX:
+        return functools.partial(TexToTextRule, failure.snippet)
+    if failure.kind == TIMEOUT:
+        return ShortenRule
+    if failure.kind == IMPORT and failure.symbol:
+        if MISSING_MODULE.search(failure.detail):
+            return functools.partial(ImportRule, failure.symbol)
+        return functools.partial(ImportRule, None, failure.symbol)
+    if failure.kind == UNKNOWN_API:
+        if failure.error_class == "TypeError":
+            return functools.partial(DropKeywordRule, failure.symbol)
+        if failure.error_class == "NameError":
+            return functools.partial(DropStatementRule, None, failure.symbol)
+        return functools.partial(DropStatementRule, failure.symbol)
+    return None
+
+
+def plan_retry(failure, code, quality_flags):
+    """A RetryPlan for rendering code again after failure, or None if a retry would fail the same way."""
+    if failure.kind == OOM:
+        if quality_flags == LOW_MEMORY_FLAGS:
+            return None
+        return RetryPlan(code, LOW_MEMORY_FLAGS)
+    rule = targeted_rule(failure)
+    if rule is None:
+        return None
+    result = repair(code, rules=[rule])
+    # A rule that changed nothing would only reproduce the failure
+    if not result.ok or not result.changed:
+        return None
+    return RetryPlan(result.code, fired=dict(result.fired))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python failure_classifier.py stderr.txt [ErrorClass]")
+        sys.exit(1)
+    with open(sys.argv[1], 'r') as f:
+        log = f.read()
+    failure = classify(sys.argv[2] if len(sys.argv) == 3 else None, "", log)
+    print(f"{failure.kind}: {failure.error_class} {failure.symbol or ''}".rstrip())
+    if failure.detail:
+        print(failure.detail)
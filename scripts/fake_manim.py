@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Timed stand-in for the manim CLI, for load tests without a manim install.
+
+Accepts the arguments manim_render.build_command() passes. It sleeps for the
+scene's estimated render time scaled by FAKE_MANIM_SCALE, spending
+FAKE_MANIM_CPU of that time busy so CPU sizing numbers stay meaningful. Then
+it writes a dummy video where manim would have put it. With -n, only the
+share of the scene inside the animation range is timed, and with -s a dummy
+last-frame image is written instead of the video. Progress is printed
+as a single manim-style progress bar covering the scene's frames. A missing scene class
+fails like manim does, and FAKE_MANIM_FAIL_RATE injects random failures.
+
+Usage:
+    MANIM_COMMAND="python fake_manim.py" python render_animations.py
+"""
+import argparse
+import ast
+import dataclasses
+import os
+import random
+import sys
+import time
+
+from manim_render import QUALITY_SETTINGS, expected_image_path, expected_output_path
+from preflight import find_scenes
+from render_cost import CostModel, animation_timeline, estimate_features
+
+FAKE_MANIM_SCALE = float(os.environ.get("FAKE_MANIM_SCALE", "0.1"))  # Fraction of the estimated render time
+FAKE_MANIM_CPU = float(os.environ.get("FAKE_MANIM_CPU", "0.5"))  # Fraction of that time spent burning CPU
+FAKE_MANIM_FAIL_RATE = float(os.environ.get("FAKE_MANIM_FAIL_RATE", "0.0"))
+FAKE_MANIM_OUTPUT_KB = int(os.environ.get("FAKE_MANIM_OUTPUT_KB", "256"))
+PROGRESS_STEPS = 10
+
+QUALITY_FLAGS = ("-ql", "-qm", "-qh", "-qp", "-qk")
+
+
+def burn(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="fake_manim")
+    parser.add_argument("script")
+    parser.add_argument("scene")
+    for flag in QUALITY_FLAGS:
+        parser.add_argument(flag, dest="quality", action="store_const", const=flag)
+    parser.add_argument("--format", default="mp4")
+    parser.add_argument("--media_dir", default="media")
+    parser.add_argument("-o", dest="output_name")
+    parser.add_argument("--fps", type=float)
+    parser.add_argument("--disable_caching", action="store_true")
+    parser.add_argument("-n", dest="animation_range")
+    parser.add_argument("-s", dest="still", action="store_true")
+    args = parser.parse_args(argv)
+    quality = args.quality or "-qm"
+
+    with open(args.script, 'r') as f:
+        code = f.read()
+    try:
+        scenes = {scene.name for scene in find_scenes(ast.parse(code))}
+    except SyntaxError as e:
+        print(f"SyntaxError: {e}", file=sys.stderr)
+        return 1
+    if args.scene not in scenes:
+        print(f"{args.scene} is not in the script", file=sys.stderr)
+        return 1
+
+    features = estimate_features(code)
+    if args.still:
+        # One frame: only startup and LaTeX cost anything
+        features = dataclasses.replace(features, animation_seconds=0.0)
+    seconds = CostModel().predict(features, quality) * FAKE_MANIM_SCALE
+    animation_seconds = features.animation_seconds
+    if args.animation_range:
+        # Only the share of the scene inside the range is rendered
+        timeline = animation_timeline(code, args.scene)
+        start, _, end = args.animation_range.partition(",")
+        selected = timeline[int(start):int(end) + 1 if end else None]
+        if not selected:
+            print(f"No animations in range {args.animation_range}")
+            return 0
+        share = sum(selected) / sum(timeline)
+        seconds *= share
+        animation_seconds *= share
+    frames = max(1, int(animation_seconds * (args.fps or QUALITY_SETTINGS[quality][1])))
+    for step in range(1, PROGRESS_STEPS + 1):
+        burn(seconds * FAKE_MANIM_CPU / PROGRESS_STEPS)
+        time.sleep(seconds * (1 - FAKE_MANIM_CPU) / PROGRESS_STEPS)
+        percent = step * 100 // PROGRESS_STEPS
+        sys.stderr.write(f"Animation 0: FakeRender(): {percent:3d}%| | {frames * step // PROGRESS_STEPS}/{frames}\r")
+        sys.stderr.flush()
+    sys.stderr.write("\n")
+    if random.random() < FAKE_MANIM_FAIL_RATE:
+        print("Injected render failure", file=sys.stderr)
+        return 1
+
+    output_name = args.output_name or args.scene
+    output_path = expected_output_path(args.media_dir, args.script, output_name, quality, args.format, args.fps)
+    if args.still:
+        output_path = expected_image_path(args.media_dir, args.script, output_name)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'wb') as f:
+        f.write(os.urandom(FAKE_MANIM_OUTPUT_KB * 1024))
+    print(f"File ready at {output_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Instant fallback videos from a pre-rendered base clip.
+
+The fallback scene's shapes are the same for every animation; only the title
+and the animation number differ. The title-less base scene is rendered once
+per quality setting and kept in FALLBACK_DIR. Each fallback then costs one
+ffmpeg pass that draws the text over the base clip, instead of a full manim
+render. If ffmpeg cannot draw text (no ffmpeg, or a build without
+libfreetype), the untitled base clip is used as is.
+
+Usage:
+    python fallback_clip.py prepare [-qm ...]   # render base clips ahead of time
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+from ffmpeg_tools import filter_path, run_ffmpeg
+from manim_render import render_scene
+
+FALLBACK_DIR = os.environ.get("FALLBACK_DIR", "fallback_clips")
+FALLBACK_FONT = os.environ.get("FALLBACK_FONT")  # Font file for drawtext; fontconfig's default Sans otherwise
+
+BASE_SCENE_NAME = "FallbackBase"
+# FallbackAnimation from render_animations.create_fallback_animation() minus
+# its two Text mobjects, which are drawn over the clip instead
+BASE_SCENE_CODE = """from manim import *
+
+class FallbackBase(Scene):
+    def construct(self):
+        config.frame_width = 12
+        config.frame_height = 8
+
+        # Leave the title's time on screen
+        self.wait(2)
+
+        shapes = VGroup()
+        circle = Circle(radius=1, color=BLUE)
+        circle.shift(LEFT * 3)
+        shapes.add(circle)
+        square = Square(side_length=2, color=GREEN)
+        square.shift(RIGHT * 3)
+        shapes.add(square)
+
+        self.play(Create(shapes))
+        self.wait(2)
+        self.play(
+            circle.animate.scale(0.5),
+            square.animate.rotate(PI/4)
+        )
+        self.wait(2)
+"""
+
+
+class FallbackClips:
+    """Base clips per quality setting, rendered on first use and composited per animation."""
+
+    def __init__(self, directory=FALLBACK_DIR, cache=None, pool=None):
+        self.directory = directory
+        self.cache = cache
+        self.pool = pool
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def base_path(self, quality_flags, fps=None):
+        return os.path.join(self.directory, f"base{quality_flags}{f'_{fps:g}fps' if fps else ''}.mp4")
+
+    def base_clip(self, quality_flags="-qm", fps=None):
+        """Path of the base clip for these settings, rendering it if needed. None if it can't be rendered."""
+        path = self.base_path(quality_flags, fps)
+        if os.path.exists(path):
+            return path
+        with self._lock:
+            if os.path.exists(path):
+                return path
+            work_dir = tempfile.mkdtemp(prefix="fallback_base_")
+            try:
+                result = render_scene(BASE_SCENE_CODE, BASE_SCENE_NAME, work_dir, "fallback_base", quality_flags,
+                                      cache=self.cache, pool=self.pool, fps=fps)
+                if not result.success:
+                    print(f"Could not render the fallback base clip ({result.error_class}): {result.error}")
+                    return None
+                os.replace(result.output_path, path)
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+        print(f"Rendered fallback base clip {path}")
+        return path
+
+    def compose(self, title, subtitle, output_path, quality_flags="-qm", fps=None):
+        """Write a fallback video with title and subtitle to output_path. Returns output_path or None."""
+        base = self.base_clip(quality_flags, fps)
+        if base is None:
+            return None
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+        with tempfile.TemporaryDirectory(prefix="fallback_text_") as text_dir:
+            # Text goes through files so prompts never need filter escaping
+            filters = []
+            for name, text, size, y in (("title", title, "h/18", "h/12"), ("subtitle", subtitle, "h/30", "h*0.78")):
+                text_path = os.path.join(text_dir, f"{name}.txt")
+                with open(text_path, 'w') as f:
+                    f.write(text)
+                font = f"fontfile='{filter_path(FALLBACK_FONT)}'" if FALLBACK_FONT else "font=Sans"
+                filters.append(f"drawtext={font}:textfile='{filter_path(text_path)}':fontcolor=white:"
+                               f"fontsize={size}:x=(w-text_w)/2:y={y}")
+            ok, stderr = run_ffmpeg(["-i", base, "-vf", ",".join(filters), "-c:v", "libx264", "-preset", "ultrafast",
+                                     "-pix_fmt", "yuv420p", "-an", output_path])
+        if ok:
+            return output_path
+
+        print(f"Could not draw fallback title ({stderr.strip()[:200]}); using the untitled base clip")
+        shutil.copyfile(base, output_path)
+        return output_path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "prepare":
+        clips = FallbackClips()
+        for flags in sys.argv[2:] or ["-qm"]:
+            clips.base_clip(flags)
+    else:
+        print("Usage: python fallback_clip.py prepare [-ql -qm ...]")
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""Small helpers for running ffmpeg on rendered clips.
+
+manim already needs ffmpeg, so these only add ways of calling it. Nothing
+goes through a shell, and every call has a timeout.
+"""
+import functools
+import os
+import shlex
+import shutil
+import subprocess
+
+# Command used to launch ffmpeg; override to point at a specific build
+FFMPEG_COMMAND = shlex.split(os.environ.get("FFMPEG_COMMAND", "ffmpeg"))
+FFMPEG_TIMEOUT = float(os.environ.get("FFMPEG_TIMEOUT", "60"))
+
+
+@functools.lru_cache(maxsize=None)
+def ffmpeg_available():
+    return shutil.which(FFMPEG_COMMAND[0]) is not None
+
+
+def run_ffmpeg(args, timeout=FFMPEG_TIMEOUT):
+    """Run ffmpeg with args, overwriting outputs. Returns (success, stderr)."""
+    if not ffmpeg_available():
+        return False, f"{FFMPEG_COMMAND[0]} not found"
+    cmd = FFMPEG_COMMAND + ["-y", "-hide_banner", "-loglevel", "error"] + list(args)
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return False, f"ffmpeg exceeded {timeout}s"
+    return proc.returncode == 0, proc.stderr
+
+
+def loop_still(image_path, output_path, seconds, fps):
+    """Encode one image as a seconds-long H.264 video at fps. Returns (success, stderr)."""
+    return run_ffmpeg(["-loop", "1", "-framerate", f"{fps:g}", "-i", image_path, "-t", f"{seconds:g}",
+                       "-c:v", "libx264", "-tune", "stillimage", "-pix_fmt", "yuv420p", "-an", output_path])
+
+
+def filter_path(path):
+    """Escape a file path for use as an option value inside an ffmpeg filter graph."""
+    return path.replace("\\", "\\\\").replace(":", "\\:").replace("'", "\\'")
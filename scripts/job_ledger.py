@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""SQLite-backed ledger of render jobs, keyed by code hash.
+
+Replaces rewriting rendered_animations.json / failed_animations.json after
+every animation. Each state change is a single-row transaction in a WAL
+journal, so a crash mid-backfill loses at most the job in progress and never
+corrupts the ledger.
+
+Usage:
+    python job_ledger.py import [rendered_animations.json] [failed_animations.json]
+    python job_ledger.py stats
+    python job_ledger.py profiles [limit]
+"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+LEDGER_DB = os.environ.get("RENDER_LEDGER_DB", "render_jobs.db")
+
+PENDING = "pending"
+RENDERING = "rendering"
+UPLOADING = "uploading"
+PREVIEWED = "previewed"  # Preview published, full-quality render still to come
+RETRYING = "retrying"  # Render failed in a recoverable way; re-queued after a backoff
+DONE = "done"
+FAILED = "failed"
+STATES = (PENDING, RENDERING, UPLOADING, PREVIEWED, RETRYING, DONE, FAILED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    code_hash TEXT PRIMARY KEY,
+    animation_id TEXT,
+    prompt TEXT,
+    state TEXT NOT NULL,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    failure_class TEXT,
+    retries INTEGER NOT NULL DEFAULT 0,
+    retry_at REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, updated_at);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS metadata_spill (
+    hash TEXT PRIMARY KEY,
+    row TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS render_timings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    animation_id TEXT,
+    quality TEXT NOT NULL,
+    features TEXT NOT NULL,
+    estimated REAL,
+    actual REAL NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS render_timings_quality ON render_timings (quality, id);
+CREATE TABLE IF NOT EXISTS scene_profiles (
+    animation_id TEXT PRIMARY KEY,
+    seconds REAL NOT NULL,
+    categories TEXT NOT NULL,
+    top_lines TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+# Columns added after the first release, for ledgers created before them
+MIGRATIONS = {
+    'jobs': [
+        ("failure_class", "TEXT"),
+        ("retries", "INTEGER NOT NULL DEFAULT 0"),
+        ("retry_at", "REAL"),
+    ],
+}
+
+
+class JobLedger:
+    """Thread-safe job ledger; one connection shared behind a lock."""
+
+    def __init__(self, path=LEDGER_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+            for table, columns in MIGRATIONS.items():
+                existing = {row['name'] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+                for name, definition in columns:
+                    if name not in existing:
+                        self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _execute(self, sql, params=()):
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params)
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def get(self, code_hash):
+        """Return the job row for code_hash as a dict, or None."""
+        rows = self._query("SELECT * FROM jobs WHERE code_hash = ?", (code_hash,))
+        return rows[0] if rows else None
+
+    def status(self, code_hash):
+        """Return the state of code_hash, or None if it has never been seen."""
+        rows = self._query("SELECT state FROM jobs WHERE code_hash = ?", (code_hash,))
+        return rows[0]['state'] if rows else None
+
+    def add(self, code_hash, animation_id, prompt):
+        """Record a new pending job. Returns False if the hash is already known."""
+        now = time.time()
+        cursor = self._execute(
+            "INSERT OR IGNORE INTO jobs (code_hash, animation_id, prompt, state, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (code_hash, animation_id, prompt, PENDING, now, now))
+        return cursor.rowcount == 1
+
+    def set_state(self, code_hash, state, error=None):
+        if state not in STATES:
+            raise ValueError(f"Unknown job state: {state}")
+        self._execute(
+            "UPDATE jobs SET state = ?, error = ?, updated_at = ?, "
+            "attempts = attempts + (CASE WHEN ? = 'rendering' THEN 1 ELSE 0 END) "
+            "WHERE code_hash = ?",
+            (state, error, time.time(), state, code_hash))
+
+    def mark_rendering(self, code_hash):
+        self.set_state(code_hash, RENDERING)
+
+    def mark_done(self, code_hash):
+        self.set_state(code_hash, DONE)
+
+    def mark_failed(self, code_hash, error):
+        self.set_state(code_hash, FAILED, error)
+
+    def record_failure(self, code_hash, failure_class, error):
+        """Note how a render failed; the row keeps it even if a retry or the fallback later succeeds."""
+        self._execute("UPDATE jobs SET failure_class = ?, error = ?, updated_at = ? WHERE code_hash = ?",
+                      (failure_class, error, time.time(), code_hash))
+
+    def mark_retrying(self, code_hash, retry_at):
+        """Count a retry against the job's budget and park it until retry_at."""
+        self._execute(
+            "UPDATE jobs SET state = ?, retries = retries + 1, retry_at = ?, updated_at = ? WHERE code_hash = ?",
+            (RETRYING, retry_at, time.time(), code_hash))
+
+    def retries(self, code_hash):
+        rows = self._query("SELECT retries FROM jobs WHERE code_hash = ?", (code_hash,))
+        return rows[0]['retries'] if rows else 0
+
+    def failure_counts(self):
+        """Return {failure class: {state: count}} over every job that ever failed a render."""
+        counts = {}
+        for row in self._query("SELECT failure_class, state, COUNT(*) AS n FROM jobs "
+                               "WHERE failure_class IS NOT NULL GROUP BY failure_class, state"):
+            counts.setdefault(row['failure_class'], {})[row['state']] = row['n']
+        return counts
+
+    def by_state(self, state, limit=None):
+        """Return jobs in the given state, oldest update first."""
+        sql = "SELECT * FROM jobs WHERE state = ? ORDER BY updated_at"
+        params = (state,)
+        if limit is not None:
+            sql += " LIMIT ?"
+            params += (limit,)
+        return self._query(sql, params)
+
+    def counts(self):
+        """Return a {state: count} dict covering every state."""
+        counts = {state: 0 for state in STATES}
+        for row in self._query("SELECT state, COUNT(*) AS n FROM jobs GROUP BY state"):
+            counts[row['state']] = row['n']
+        return counts
+
+    def requeue_interrupted(self):
+        """Move jobs a crashed run left unfinished back to 'pending'."""
+        cursor = self._execute(
+            "UPDATE jobs SET state = ?, updated_at = ? WHERE state IN (?, ?, ?, ?)",
+            (PENDING, time.time(), RENDERING, UPLOADING, PREVIEWED, RETRYING))
+        return cursor.rowcount
+
+    def get_meta(self, key, default=None):
+        rows = self._query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0]['value'] if rows else default
+
+    def set_meta(self, key, value):
+        self._execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def spill_metadata(self, rows):
+        """Keep metadata rows until the remote table has them; a newer row for a hash replaces the older one."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO metadata_spill (hash, row, created_at) VALUES (?, ?, ?)",
+                [(row['hash'], json.dumps(row), now) for row in rows])
+
+    def spilled_metadata(self, limit=100):
+        """Return up to limit spilled metadata rows, oldest first."""
+        rows = self._query("SELECT row FROM metadata_spill ORDER BY created_at LIMIT ?", (limit,))
+        return [json.loads(row['row']) for row in rows]
+
+    def clear_spilled_metadata(self, rows):
+        """Forget spilled rows that were written; a newer row spilled for the same hash since is kept."""
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM metadata_spill WHERE hash = ? AND row = ?",
+                                   [(row['hash'], json.dumps(row)) for row in rows])
+
+    def record_render_time(self, animation_id, quality, features, estimated, actual):
+        """Store one render's cost features next to how long it really took."""
+        self._execute(
+            "INSERT INTO render_timings (animation_id, quality, features, estimated, actual, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (animation_id, quality, json.dumps(features), estimated, actual, time.time()))
+
+    def render_timings(self, quality, limit=500):
+        """Return the latest (features, actual seconds) pairs recorded for a quality flag."""
+        rows = self._query("SELECT features, actual FROM render_timings WHERE quality = ? ORDER BY id DESC LIMIT ?",
+                           (quality, limit))
+        return [(json.loads(row['features']), row['actual']) for row in rows]
+
+    def timed_qualities(self):
+        return [row['quality'] for row in self._query("SELECT DISTINCT quality FROM render_timings")]
+
+    def record_profile(self, animation_id, seconds, categories, top_lines):
+        """Keep the category split and slowest scene lines of a profiled render."""
+        self._execute(
+            "INSERT OR REPLACE INTO scene_profiles (animation_id, seconds, categories, top_lines, created_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (animation_id, seconds, json.dumps(categories), json.dumps(top_lines), time.time()))
+
+    def slowest_profiles(self, limit=20):
+        """Profiled renders, slowest first, with categories and top_lines decoded."""
+        rows = self._query("SELECT * FROM scene_profiles ORDER BY seconds DESC LIMIT ?", (limit,))
+        for row in rows:
+            row['categories'] = json.loads(row['categories'])
+            row['top_lines'] = json.loads(row['top_lines'])
+        return rows
+
+    def import_json_logs(self, processed_log, failed_log):
+        """One-time import of the legacy JSON logs. Returns the number of rows imported."""
+        if self.get_meta("json_logs_imported"):
+            return 0
+
+        rows = []
+        for path, state in ((processed_log, DONE), (failed_log, FAILED)):
+            if not path or not os.path.exists(path):
+                continue
+            with open(path, 'r') as f:
+                entries = json.load(f)
+            for code_hash, entry in entries.items():
+                timestamp = entry.get('timestamp', time.time())
+                rows.append((code_hash, entry.get('animation_id'), entry.get('prompt'), state,
+                             entry.get('error'), timestamp, timestamp))
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO jobs (code_hash, animation_id, prompt, state, error, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_logs_imported', ?)",
+                               (str(time.time()),))
+        return len(rows)
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    ledger = JobLedger()
+    if command == "import":
+        processed_log = sys.argv[2] if len(sys.argv) > 2 else "rendered_animations.json"
+        failed_log = sys.argv[3] if len(sys.argv) > 3 else "failed_animations.json"
+        print(f"Imported {ledger.import_json_logs(processed_log, failed_log)} jobs into {ledger.path}")
+    elif command == "stats":
+        for state, count in ledger.counts().items():
+            print(f"{state:>10}: {count}")
+        failures = ledger.failure_counts()
+        if failures:
+            print("Render failures by class (current state of those jobs):")
+            for failure_class, states in sorted(failures.items()):
+                print(f"  {failure_class:<12} " + ", ".join(f"{state} {n}" for state, n in sorted(states.items())))
+    elif command == "profiles":
+        for profile in ledger.slowest_profiles(int(sys.argv[2]) if len(sys.argv) > 2 else 20):
+            split = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in profile['categories'].items())
+            print(f"{profile['animation_id']}: {profile['seconds']:.1f}s ({split})")
+            for line in profile['top_lines'][:3]:
+                print(f"    {line['seconds']:>6.2f}s  line {line['line']}: {line['source']}")
+    else:
+        print("Usage: python job_ledger.py [import [processed.json] [failed.json] | stats | profiles [limit]]")
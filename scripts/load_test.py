@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""End-to-end load test of the render, upload and metadata path.
+
+Scenes are drawn from the dataset in a configurable mix. Each is pushed
+through render_animations' render workers, upload stage and metadata writer.
+Storage and the animations table are served by storage_standin.py, and
+manim is either real or the timed fake_manim.py.
+
+Reports sustained animations per minute, queue wait, p50/p95/p99 end-to-end
+latency and CPU use per worker, for sizing render nodes.
+
+Scene mix categories:
+    short   - passes pre-flight, under LONG_SCENE_SECONDS of animation
+    long    - passes pre-flight, at least LONG_SCENE_SECONDS of animation
+    broken  - cannot be repaired or fails pre-flight, so the fallback renders
+
+Usage:
+    python load_test.py --fake-manim --count 200 --workers 4 --mix short=0.7,long=0.2,broken=0.1
+    python load_test.py --count 50 --rate 30 --out load_results.json   # real manim, 30 submissions/min
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from benchmark_pipeline import DEFAULT_DATASET, load_samples, percentile
+from code_repair import repair
+from preflight import analyze
+from render_cost import estimate_features
+from storage_standin import start_standin
+
+LONG_SCENE_SECONDS = 20.0
+# supabase-py rejects keys that are not JWT-shaped; the stand-in never checks it
+STANDIN_KEY = "standin.standin.standin"
+
+
+def categorize(codes):
+    """Split dataset samples into the scene mix categories."""
+    categories = {'short': [], 'long': [], 'broken': []}
+    for code in codes:
+        result = repair(code)
+        if not result.ok or not analyze(result.code, use_installed_manim=False).ok:
+            categories['broken'].append(code)
+        elif estimate_features(result.code).animation_seconds >= LONG_SCENE_SECONDS:
+            categories['long'].append(code)
+        else:
+            categories['short'].append(code)
+    return categories
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, weight = part.split("=")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def configure_environment(args, work_dir, base_url):
+    """Point render_animations at the stand-in and scratch paths; must run before importing it."""
+    os.environ["SUPABASE_URL"] = base_url
+    os.environ["STORAGE_URL"] = base_url
+    os.environ["SUPABASE_SERVICE_ROLE_KEY"] = STANDIN_KEY
+    os.environ["RENDER_LEDGER_DB"] = os.path.join(work_dir, "render_jobs.db")
+    os.environ["RENDER_CACHE_DIR"] = os.path.join(work_dir, "render_cache")
+    os.environ["TEX_CACHE_DIR"] = os.path.join(work_dir, "tex_cache")
+    os.environ["RENDER_WORKERS"] = str(args.workers)
+    os.environ["INTERACTIVE_WORKERS"] = "0"
+    os.environ["METADATA_FLUSH_INTERVAL"] = "1.0"
+    if args.fake_manim:
+        fake = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_manim.py")
+        os.environ["MANIM_COMMAND"] = f"{sys.executable} {fake}"
+        os.environ["FAKE_MANIM_SCALE"] = str(args.fake_scale)
+
+
+def cpu_seconds():
+    """CPU time of this process plus its reaped children."""
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+def run_load(args):
+    codes = load_samples(args.dataset, args.limit)
+    categories = categorize(codes)
+    mix = parse_mix(args.mix)
+    for name in mix:
+        if not categories.get(name):
+            raise SystemExit(f"No samples in category '{name}'")
+    print("Dataset mix available: " + ", ".join(f"{k}={len(v)}" for k, v in categories.items()))
+
+    work_dir = tempfile.mkdtemp(prefix="render_load_")
+    server, base_url = start_standin(os.path.join(work_dir, "storage"), latency=args.latency,
+                                     fail_rate=args.fail_rate)
+    configure_environment(args, work_dir, base_url)
+    os.chdir(work_dir)
+
+    import render_animations as renderer
+    from render_queue import RenderJob
+
+    renderer.init()
+    if not args.cache:
+        renderer.render_cache = None
+    if renderer.RENDER_MODE == "warm":
+        from manim_worker import WarmWorkerPool
+        renderer.warm_pool = WarmWorkerPool(args.workers)
+    renderer.start_workers(renderer.render_jobs, args.workers, reserved=0)
+
+    rng = random.Random(args.seed)
+    names, weights = zip(*mix.items())
+    results = []
+    lock = threading.Lock()
+    finished = threading.Semaphore(0)
+
+    def make_callback(job, category):
+        def done(success, _):
+            with lock:
+                results.append({
+                    'category': category,
+                    'success': success,
+                    'queue_wait': job.started_at - job.enqueued_at,
+                    'latency': time.monotonic() - job.enqueued_at,
+                    'finished': time.monotonic(),
+                })
+            finished.release()
+        return done
+
+    cpu_before = cpu_seconds()
+    started = time.monotonic()
+    for i in range(args.count):
+        category = rng.choices(names, weights)[0]
+        code = rng.choice(categories[category])
+        # Unique hashes so the ledger treats repeats of a sample as new jobs
+        job = RenderJob(f"load-{i}-{uuid.uuid4().hex}", str(uuid.uuid4()), code, f"load test {category} {i}",
+                        estimate=renderer.estimate_render_seconds(code), group="load-test")
+        job.callback = make_callback(job, category)
+        renderer.render_jobs.put(job)
+        if args.rate:
+            time.sleep(rng.expovariate(args.rate / 60.0))
+
+    for _ in range(args.count):
+        finished.acquire()
+    renderer.upload_stage.join()
+    wall = time.monotonic() - started
+    renderer.metadata_writer.flush()
+    if renderer.warm_pool is not None:
+        renderer.warm_pool.close()  # Reaps the workers so their CPU time is counted
+    cpu = cpu_seconds() - cpu_before
+
+    uploads = sum(1 for r in server.requests if r['kind'] == "upload")
+    rows = len(server.tables.get(renderer.TABLE_NAME, {}))
+    server.shutdown()
+    return summarize(results, wall, cpu, args.workers, uploads, rows)
+
+
+def summarize(results, wall, cpu, workers, uploads, rows):
+    finish_times = sorted(r['finished'] for r in results)
+    # Sustained rate over the steady middle of the run, skipping ramp-up and drain
+    steady = finish_times[len(finish_times) // 10: len(finish_times) - len(finish_times) // 10]
+    steady_rate = (len(steady) - 1) / (steady[-1] - steady[0]) * 60 if len(steady) > 1 and steady[-1] > steady[0] \
+        else len(results) / wall * 60
+    latencies = [r['latency'] for r in results]
+    waits = [r['queue_wait'] for r in results]
+    by_category = {}
+    for r in results:
+        stats = by_category.setdefault(r['category'], {'count': 0, 'failed': 0, 'latencies': []})
+        stats['count'] += 1
+        stats['failed'] += not r['success']
+        stats['latencies'].append(r['latency'])
+    return {
+        'animations': len(results),
+        'failed': sum(not r['success'] for r in results),
+        'wall_seconds': wall,
+        'animations_per_minute': len(results) / wall * 60,
+        'sustained_animations_per_minute': steady_rate,
+        'queue_wait_seconds': {p: percentile(waits, q) for p, q in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99))},
+        'latency_seconds': {p: percentile(latencies, q) for p, q in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99))},
+        'cpu_seconds': cpu,
+        'cpu_seconds_per_animation': cpu / len(results) if results else 0.0,
+        'cpu_utilization_per_worker': cpu / (wall * workers) if wall else 0.0,
+        'uploads': uploads,
+        'table_rows': rows,
+        'categories': {name: {'count': s['count'], 'failed': s['failed'], 'p50_latency': percentile(s['latencies'], 0.5)}
+                       for name, s in by_category.items()},
+    }
+
+
+def print_summary(summary):
+    print(f"\n{summary['animations']} animations ({summary['failed']} failed) in {summary['wall_seconds']:.1f}s")
+    print(f"Throughput: {summary['animations_per_minute']:.1f}/min overall, "
+          f"{summary['sustained_animations_per_minute']:.1f}/min sustained")
+    for label, key in (("Queue wait", 'queue_wait_seconds'), ("End-to-end", 'latency_seconds')):
+        values = summary[key]
+        print(f"{label}: p50 {values['p50']:.2f}s, p95 {values['p95']:.2f}s, p99 {values['p99']:.2f}s")
+    print(f"CPU: {summary['cpu_seconds']:.1f}s total, {summary['cpu_seconds_per_animation']:.2f}s per animation, "
+          f"{summary['cpu_utilization_per_worker']:.0%} of a core per worker")
+    print(f"Stand-in received {summary['uploads']} uploads and holds {summary['table_rows']} metadata rows")
+    for name, stats in summary['categories'].items():
+        print(f"  {name:<8}{stats['count']:>6} jobs, {stats['failed']} failed, p50 {stats['p50_latency']:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the render pipeline against local stand-ins")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--limit", type=int, help="Only draw from the first N dataset samples")
+    parser.add_argument("--count", type=int, default=100, help="Animations to submit")
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="Submissions per minute (Poisson arrivals); 0 submits as fast as the queue accepts")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--mix", default="short=0.7,long=0.2,broken=0.1")
+    parser.add_argument("--fake-manim", action="store_true", help="Use fake_manim.py instead of manim")
+    parser.add_argument("--fake-scale", type=float, default=0.1, help="Fake render time as a fraction of the estimate")
+    parser.add_argument("--cache", action="store_true", help="Keep the render cache enabled")
+    parser.add_argument("--latency", type=float, default=0.0, help="Stand-in latency per upload/upsert")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Stand-in failure rate per upload/upsert")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Write the summary as JSON to this path")
+    args = parser.parse_args()
+    if args.out:
+        args.out = os.path.abspath(args.out)
+    args.dataset = os.path.abspath(args.dataset)
+
+    summary = run_load(args)
+    print_summary(summary)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"Saved summary to {args.out}")
+    if summary['animations'] - summary['failed'] <= 0:
+        # Every job failing means the setup is broken (manim missing, stand-in unreachable), not a slow node
+        sys.exit("No animation rendered successfully; the numbers above measure failures only")
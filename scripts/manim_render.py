@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""Shared helpers for rendering a Manim scene into a known output path.
+
+Nothing here changes the process working directory, so several renders can
+run side by side from threads. The caller picks a work directory; the scene
+file and manim's media tree both live under it, and the final video path is
+computed before manim starts.
+"""
+import ast
+import json
+import os
+import re
+import shlex
+import shutil
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+
+from ffmpeg_tools import loop_still
+from preflight import analyze
+from render_cache import fingerprint
+from render_cost import estimate_features
+from render_sandbox import RenderLimits, run_sandboxed
+
+# MANIM_COMMAND (default "manim") launches manim; override to point at a specific install. It is read
+# per render by manim_command(), so setting it after import (as load_test.py does) still takes effect
+PROFILER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scene_profiler.py")
+TEX_CACHE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tex_cache.py")
+BATCH_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "manim_worker.py")
+
+# Pixel height and default frame rate for each quality flag
+QUALITY_SETTINGS = {
+    "-ql": (480, 15),
+    "-qm": (720, 30),
+    "-qh": (1080, 60),
+    "-qp": (1440, 60),
+    "-qk": (2160, 60),
+}
+
+# Output lines that mean the render cannot succeed, checked as manim writes them
+LATEX_ERROR = re.compile(r"LaTeX compilation error|latex error converting to|^! (LaTeX Error|Undefined control sequence|"
+                         r"Missing \$ inserted)")
+TRACEBACK_START = re.compile(r"Traceback \(most recent call last\)")
+# The exception line that ends a (rich or plain) traceback
+EXCEPTION_LINE = re.compile(r"^[\s│|]*((?:\w+\.)*([A-Z]\w*(?:Error|Exception|Interrupt)))(?::\s*(.*?))?[\s│|]*$")
+# tqdm progress line: "Animation 3: Create(Circle):  45%|████▌     | 27/60 [00:00<00:00, 95.2it/s]"
+PROGRESS_LINE = re.compile(r"Animation (\d+)\s*:.*?(\d+)%\|.*?(\d+)/(\d+)")
+
+
+def manim_command():
+    """(argv prefix, overridden) for launching manim.
+
+    The tex cache and batches run manim inside this interpreter, so an
+    overridden command goes without them.
+    """
+    return shlex.split(os.environ.get("MANIM_COMMAND", "manim")), "MANIM_COMMAND" in os.environ
+
+
+class OutputWatcher:
+    """Reads manim's output as it streams: stops on the first fatal error and tracks progress.
+
+    Called with each (stream, line). Returns (error_class, error) when the
+    render should be killed. The first LaTeX error or the exception line of
+    a traceback is fatal, so manim isn't left to unwind, log and clean up
+    a render that has already failed. Progress is the share of the scene's
+    expected frames rendered so far, from the per-animation progress bars;
+    on_progress(fraction) is called whenever it moves.
+    """
+
+    def __init__(self, expected_frames=0, on_progress=None):
+        self.expected_frames = expected_frames
+        self.on_progress = on_progress
+        self.in_traceback = False
+        self.frames_done = 0  # Frames of the animations before the current one
+        self.animation = None
+        self.animation_frames = (0, 0)  # (rendered, total) of the current animation
+        self.progress = 0.0
+
+    def __call__(self, stream, line):
+        if LATEX_ERROR.search(line):
+            return "LatexError", line.strip()
+        if TRACEBACK_START.search(line):
+            self.in_traceback = True
+        elif self.in_traceback:
+            match = EXCEPTION_LINE.match(line)
+            if match:
+                return match.group(2), line.strip(" │|\n")
+        match = PROGRESS_LINE.search(line)
+        if match:
+            self._advance(int(match.group(1)), int(match.group(3)), int(match.group(4)))
+        return None
+
+    def _advance(self, animation, frames, total):
+        if animation != self.animation:
+            self.frames_done += self.animation_frames[1]
+            self.animation = animation
+        self.animation_frames = (frames, total)
+        if not self.expected_frames:
+            return
+        # The static estimate is approximate, so never claim to be done before manim exits
+        progress = min(0.99, (self.frames_done + frames) / self.expected_frames)
+        if progress > self.progress:
+            self.progress = progress
+            if self.on_progress is not None:
+                self.on_progress(progress)
+
+
+@dataclass
+class RenderResult:
+    """Outcome of a single render_scene() call."""
+    success: bool
+    scene_name: str = None
+    output_path: str = None
+    error_class: str = None
+    error: str = None
+    stderr: str = ""
+    cached: bool = False
+    timings: dict = field(default_factory=dict)
+
+
+def check_syntax(code):
+    """Check if the code has valid Python syntax."""
+    try:
+        ast.parse(code)
+        return True, None
+    except SyntaxError as e:
+        return False, str(e)
+
+
+def find_scene_name(code):
+    """Return the name of the Scene class to render from the code, if any.
+
+    Uses the pre-flight AST scan, which also finds ThreeDScene,
+    MovingCameraScene and scenes inheriting from other local scenes. Code
+    that doesn't parse falls back to a line scan.
+    """
+    report = analyze(code)
+    if report.syntax_error is None:
+        return report.scene_name
+    for line in code.split('\n'):
+        if line.strip().startswith('class ') and '(Scene)' in line:
+            return line.split('class ')[1].split('(')[0].strip()
+    return None
+
+
+def expected_output_path(media_dir, script_path, output_name, quality_flags="-qm", fmt="mp4", fps=None):
+    """Path manim will write the rendered video to for these arguments."""
+    module_name = os.path.splitext(os.path.basename(script_path))[0]
+    height, default_fps = QUALITY_SETTINGS.get(quality_flags, QUALITY_SETTINGS["-qm"])
+    quality_dir = f"{height}p{fps or default_fps:g}"
+    return os.path.join(media_dir, "videos", module_name, quality_dir, f"{output_name}.{fmt}")
+
+
+def expected_image_path(media_dir, script_path, output_name):
+    """Path manim writes the last frame to when run with -s."""
+    module_name = os.path.splitext(os.path.basename(script_path))[0]
+    return os.path.join(media_dir, "images", module_name, f"{output_name}.png")
+
+
+def build_command(script_path, scene_name, media_dir, output_name, quality_flags="-qm", fmt="mp4",
+                  disable_caching=True, fps=None, profile_path=None, tex_cache_dir=None, animation_range=None,
+                  still=False):
+    """Build the manim argument list; no shell is involved.
+
+    animation_range is a (start, end) pair of animation numbers for manim's
+    -n option; end may be None to render through the end of the scene. With
+    still, manim only saves the last frame (-s) to expected_image_path().
+
+    With profile_path, manim runs in-process under scene_profiler.py, which
+    writes its profile there. With tex_cache_dir, manim runs in-process under
+    tex_cache.py and compiles Tex through the shared cache in that directory,
+    unless MANIM_COMMAND points at another install.
+    """
+    launcher, overridden = manim_command()
+    if profile_path:
+        tex_cache = ["--tex-cache", tex_cache_dir] if tex_cache_dir else []
+        launcher = [sys.executable, PROFILER_SCRIPT, "run", "--out", profile_path] + tex_cache + ["--"]
+    elif tex_cache_dir and not overridden:
+        launcher = [sys.executable, TEX_CACHE_SCRIPT, "run", "--dir", tex_cache_dir, "--"]
+    cmd = launcher + [
+        script_path, scene_name, quality_flags,
+        f"--format={fmt}",
+        "--media_dir", media_dir,
+        "-o", output_name,
+    ]
+    if fps:
+        cmd += ["--fps", f"{fps:g}"]
+    if animation_range:
+        start, end = animation_range
+        cmd += ["-n", f"{start},{end}" if end is not None else f"{start}"]
+    if still:
+        cmd.append("-s")
+    if disable_caching:
+        cmd.append("--disable_caching")
+    return cmd
+
+
+def render_scene(code, scene_name, work_dir, output_name, quality_flags="-qm", fmt="mp4",
+                 disable_caching=True, cache=None, pool=None, fps=None, profile_path=None, limits=None,
+                 on_progress=None, tex_cache_dir=None, animation_range=None, still_seconds=None):
+    """Render scene_name from code inside work_dir and return a RenderResult.
+
+    The scene is written to work_dir/<output_name>.py and manim is pointed at
+    work_dir/media, so the output lands at expected_output_path(). With a
+    RenderCache, a hit is copied to that path without running manim and a
+    fresh render is added to the cache. With a WarmWorkerPool the scene is
+    rendered by an already-running manim process instead of a new CLI launch.
+    fps overrides the frame rate implied by quality_flags. With profile_path,
+    the render always runs as a profiled subprocess, bypassing the cache and
+    the pool, and its profile is written to that path. tex_cache_dir is the
+    shared tex_cache.py directory Tex is compiled through, if any. With
+    animation_range, only those animations are rendered (see
+    build_command()); such a partial render always runs as a subprocess and
+    is never cached. With still_seconds, for a scene whose frames never
+    change (see preflight.py), manim only renders the last frame, which
+    ffmpeg then loops into a video of that many seconds at the same path.
+
+    The manim subprocess runs under render_sandbox.py with limits (a
+    RenderLimits; the default budgets if None), and a breached budget is
+    reported as its error_class. A warm worker only enforces the time limit.
+    The subprocess's output is watched by OutputWatcher: the first fatal
+    error kills it, and on_progress(fraction) follows its progress bars.
+    result.stderr holds only the tail of the output.
+    """
+    started = time.perf_counter()
+    result = RenderResult(success=False, scene_name=scene_name)
+    limits = limits or RenderLimits()
+    _, default_fps = QUALITY_SETTINGS.get(quality_flags, QUALITY_SETTINGS["-qm"])
+    still = still_seconds is not None and fmt in ("mp4", "mov")
+
+    if not scene_name:
+        result.error_class = "NoScene"
+        result.error = "No Scene class to render"
+        return result
+
+    try:
+        work_dir = os.path.abspath(work_dir)
+        os.makedirs(work_dir, exist_ok=True)
+        if tex_cache_dir:
+            tex_cache_dir = os.path.abspath(tex_cache_dir)  # manim runs from work_dir
+        media_dir = os.path.join(work_dir, "media")
+        script_path = os.path.join(work_dir, f"{output_name}.py")
+        with open(script_path, 'w') as f:
+            f.write(code)
+        result.timings['write'] = time.perf_counter() - started
+
+        cmd = build_command(script_path, scene_name, media_dir, output_name, quality_flags, fmt, disable_caching, fps,
+                            profile_path, tex_cache_dir, animation_range, still)
+        output_path = expected_output_path(media_dir, script_path, output_name, quality_flags, fmt, fps)
+
+        cache_key = None
+        if cache is not None and not profile_path and not animation_range:
+            cache_key = fingerprint(code, scene_name, quality_flags, fmt, extra=(fps or "",))
+            if cache.fetch(cache_key, output_path, fmt):
+                result.success = True
+                result.cached = True
+                result.output_path = output_path
+                result.timings['total'] = time.perf_counter() - started
+                return result
+
+        manim_started = time.perf_counter()
+        if pool is not None and not profile_path and not animation_range:
+            reply = pool.render(script_path, scene_name, media_dir, output_name, quality_flags, fmt, disable_caching,
+                                timeout=limits.wall_seconds, fps=fps, tex_cache_dir=tex_cache_dir, still=still)
+        else:
+            expected_frames = estimate_features(code).animation_seconds * (fps or default_fps)
+            watcher = OutputWatcher(expected_frames, on_progress)
+            proc = run_sandboxed(cmd, cwd=work_dir, limits=limits, on_line=watcher)
+            failed = proc.returncode != 0 or proc.breach or proc.abort
+            reply = {'success': not failed, 'stderr': proc.stderr,
+                     'error_class': proc.breach or proc.abort or "RenderError",
+                     'error': proc.error or f"manim exited with code {proc.returncode}"}
+        result.timings['manim'] = time.perf_counter() - manim_started
+        result.stderr = reply['stderr']
+
+        image_path = expected_image_path(media_dir, script_path, output_name)
+        if reply['success'] and still and os.path.exists(image_path):
+            # Hold the one frame for as long as the scene would have run
+            encode_started = time.perf_counter()
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            ok, stderr = loop_still(image_path, output_path, still_seconds, fps or default_fps)
+            result.timings['encode'] = time.perf_counter() - encode_started
+            if not ok:
+                reply = {'success': False, 'error_class': "EncodeError",
+                         'error': f"Could not encode the still frame: {stderr.strip()[:500]}"}
+
+        if not reply['success']:
+            result.error_class = reply['error_class']
+            result.error = reply['error']
+        elif not os.path.exists(output_path):
+            result.error_class = "MissingOutput"
+            result.error = f"manim did not produce {output_path}"
+        else:
+            result.success = True
+            result.output_path = output_path
+            if cache_key is not None:
+                cache.put(cache_key, output_path, fmt)
+    except Exception as e:
+        result.error_class = type(e).__name__
+        result.error = str(e)
+
+    result.timings['total'] = time.perf_counter() - started
+    return result
+
+
+def render_batch(scenes, quality_flags="-qm", fmt="mp4", disable_caching=True, cache=None, fps=None, limits=None,
+                 tex_cache_dir=None):
+    """Render several scenes in sequence in one manim process and return a RenderResult per scene.
+
+    scenes is a list of (code, scene_name, work_dir, output_name), laid out
+    and cached as render_scene() does. The process imports manim once and
+    renders the scenes in turn, so small scenes stop paying for interpreter
+    start, the manim import and config setup each. One scene failing only
+    fails its own result.
+
+    limits covers the whole batch. If the batch is killed, the scene it was
+    on takes the blame (Timeout, MemoryLimit, ...) and the scenes it never
+    reached are rendered with render_scene() instead. A MANIM_COMMAND
+    override can't run a batch, so then every scene goes to render_scene().
+    """
+    limits = limits or RenderLimits()
+    if manim_command()[1]:
+        return [render_scene(code, scene_name, work_dir, output_name, quality_flags, fmt, disable_caching, cache,
+                             fps=fps, limits=limits, tex_cache_dir=tex_cache_dir)
+                for code, scene_name, work_dir, output_name in scenes]
+
+    results = []
+    batched = []  # (index into scenes, cache key, output path, job for render_in_process)
+    for index, (code, scene_name, work_dir, output_name) in enumerate(scenes):
+        started = time.perf_counter()
+        result = RenderResult(success=False, scene_name=scene_name)
+        results.append(result)
+        if not scene_name:
+            result.error_class = "NoScene"
+            result.error = "No Scene class to render"
+            continue
+        try:
+            work_dir = os.path.abspath(work_dir)
+            os.makedirs(work_dir, exist_ok=True)
+            media_dir = os.path.join(work_dir, "media")
+            script_path = os.path.join(work_dir, f"{output_name}.py")
+            with open(script_path, 'w') as f:
+                f.write(code)
+            result.timings['write'] = time.perf_counter() - started
+            output_path = expected_output_path(media_dir, script_path, output_name, quality_flags, fmt, fps)
+
+            cache_key = None
+            if cache is not None:
+                cache_key = fingerprint(code, scene_name, quality_flags, fmt, extra=(fps or "",))
+                if cache.fetch(cache_key, output_path, fmt):
+                    result.success = True
+                    result.cached = True
+                    result.output_path = output_path
+                    result.timings['total'] = time.perf_counter() - started
+                    continue
+            batched.append((index, cache_key, output_path, {
+                'script_path': script_path,
+                'scene_name': scene_name,
+                'media_dir': media_dir,
+                'output_name': output_name,
+            }))
+        except Exception as e:
+            result.error_class = type(e).__name__
+            result.error = str(e)
+    if not batched:
+        return results
+
+    batch_dir = tempfile.mkdtemp(prefix="manim_batch_")
+    try:
+        manifest_path = os.path.join(batch_dir, "manifest.json")
+        with open(manifest_path, 'w') as f:
+            json.dump({
+                'options': {
+                    'quality_flags': quality_flags,
+                    'fmt': fmt,
+                    'disable_caching': disable_caching,
+                    'fps': fps,
+                    'tex_cache_dir': tex_cache_dir and os.path.abspath(tex_cache_dir),
+                },
+                'scenes': [job for _, _, _, job in batched],
+            }, f)
+        proc = run_sandboxed([sys.executable, BATCH_SCRIPT, "batch", manifest_path], cwd=batch_dir, limits=limits)
+        replies = {}
+        if os.path.exists(manifest_path + ".results"):
+            with open(manifest_path + ".results", 'r') as f:
+                for line in f:
+                    try:
+                        reply = json.loads(line)
+                    except ValueError:
+                        break  # Cut off mid-line by the kill
+                    replies[reply['index']] = reply
+    finally:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+
+    blamed = False
+    for position, (index, cache_key, output_path, job) in enumerate(batched):
+        result = results[index]
+        reply = replies.get(position)
+        if reply is None:
+            if blamed:
+                # Never reached; render it on its own
+                code, scene_name, work_dir, output_name = scenes[index]
+                results[index] = render_scene(code, scene_name, work_dir, output_name, quality_flags, fmt,
+                                              disable_caching, cache, fps=fps, limits=limits,
+                                              tex_cache_dir=tex_cache_dir)
+                continue
+            blamed = True
+            reply = {'success': False, 'error_class': proc.breach or proc.abort or "RenderError",
+                     'error': proc.error or f"manim batch exited with code {proc.returncode}", 'stderr': proc.stderr}
+        result.stderr = reply['stderr']
+        result.timings['manim'] = reply.get('elapsed', proc.elapsed)
+        result.timings['total'] = result.timings.get('write', 0.0) + result.timings['manim']
+
+        if not reply['success']:
+            result.error_class = reply['error_class']
+            result.error = reply['error']
+        elif not os.path.exists(output_path):
+            result.error_class = "MissingOutput"
+            result.error = f"manim did not produce {output_path}"
+        else:
+            result.success = True
+            result.output_path = output_path
+            if cache_key is not None:
+                cache.put(cache_key, output_path, fmt)
+    return results
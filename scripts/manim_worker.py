@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""Long-lived manim worker processes that render scenes in-process.
+
+Each worker imports manim (and its numpy/cairo/pango stack) once, then
+renders one job at a time: the scene file is executed in a fresh module
+namespace under a temporary manim config, so nothing leaks between jobs.
+Workers are recycled after WARM_WORKER_MAX_JOBS jobs or once their peak RSS
+passes WARM_WORKER_MAX_RSS_MB, and replaced if they crash.
+
+Run as a script, this module is the child of manim_render.render_batch(): it
+imports manim once and renders every scene of a batch manifest in turn.
+
+Usage:
+    python manim_worker.py batch manifest.json   # replies go to manifest.json.results
+"""
+import json
+import multiprocessing
+import os
+import queue
+import resource
+import sys
+import time
+import traceback
+import types
+
+WARM_WORKER_MAX_JOBS = int(os.environ.get("WARM_WORKER_MAX_JOBS", "50"))
+WARM_WORKER_MAX_RSS_MB = int(os.environ.get("WARM_WORKER_MAX_RSS_MB", "2048"))
+
+# manim config quality names for each CLI quality flag
+QUALITY_NAMES = {
+    "-ql": "low_quality",
+    "-qm": "medium_quality",
+    "-qh": "high_quality",
+    "-qp": "production_quality",
+    "-qk": "fourk_quality",
+}
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def render_in_process(script_path, scene_name, media_dir, output_name, quality_flags="-qm", fmt="mp4",
+                      disable_caching=True, fps=None, tex_cache_dir=None, still=False):
+    """Render scene_name from script_path with the already-imported manim.
+
+    Writes to the same path the manim CLI would for these arguments, with
+    still standing for -s. With tex_cache_dir, Tex is compiled through the
+    shared tex_cache.py cache.
+    """
+    import manim
+
+    if tex_cache_dir:
+        from tex_cache import install
+        install(tex_cache_dir)
+
+    module_name = os.path.splitext(os.path.basename(script_path))[0]
+    with open(script_path, 'r') as f:
+        code = f.read()
+
+    overrides = {
+        "input_file": script_path,
+        "media_dir": media_dir,
+        "output_file": output_name,
+        "quality": QUALITY_NAMES.get(quality_flags, "medium_quality"),
+        "format": fmt,
+        "disable_caching": disable_caching,
+        "write_to_movie": True,
+        "progress_bar": "none",
+    }
+    if fps:
+        overrides["frame_rate"] = fps
+    if still:
+        overrides["save_last_frame"] = True
+        overrides["write_to_movie"] = False
+    with manim.tempconfig(overrides):
+        module = types.ModuleType(module_name)
+        module.__file__ = script_path
+        exec(compile(code, script_path, "exec"), module.__dict__)
+        scene_cls = module.__dict__.get(scene_name)
+        if scene_cls is None:
+            raise LookupError(f"Scene {scene_name} not found in {script_path}")
+        scene_cls().render()
+
+
+def _worker_main(conn):
+    """Worker process loop: import manim once, then serve render jobs from the pipe."""
+    import manim  # noqa: F401 - paid once per worker rather than once per render
+
+    conn.send({'ready': True, 'pid': os.getpid()})
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+
+        reply = {'success': True, 'stderr': ""}
+        try:
+            render_in_process(**job)
+        except BaseException as e:
+            reply = {
+                'success': False,
+                'error_class': type(e).__name__,
+                'error': str(e),
+                'stderr': traceback.format_exc(),
+            }
+        reply['rss_mb'] = peak_rss_mb()
+        conn.send(reply)
+
+
+def render_batch_main(manifest_path):
+    """Render each scene in a batch manifest in turn, appending one JSON reply line per scene.
+
+    A failing scene only fails its own reply. Replies are flushed as they are
+    written, so the parent knows how far a killed batch got.
+    """
+    import manim  # noqa: F401 - paid once for the whole batch
+
+    with open(manifest_path, 'r') as f:
+        manifest = json.load(f)
+    scenes = manifest['scenes']
+    with open(manifest_path + ".results", 'a') as out:
+        for index, job in enumerate(scenes):
+            print(f"Batch scene {index + 1}/{len(scenes)}: {job['scene_name']}", flush=True)
+            started = time.perf_counter()
+            reply = {'index': index, 'success': True, 'stderr': ""}
+            try:
+                render_in_process(**job, **manifest['options'])
+            except BaseException as e:
+                reply = {
+                    'index': index,
+                    'success': False,
+                    'error_class': type(e).__name__,
+                    'error': str(e),
+                    'stderr': traceback.format_exc(),
+                }
+                print(reply['stderr'], file=sys.stderr, flush=True)
+            reply['elapsed'] = time.perf_counter() - started
+            out.write(json.dumps(reply) + "\n")
+            out.flush()
+
+
+class WarmWorker:
+    """Parent-side handle on one worker process."""
+
+    def __init__(self, context, max_jobs=WARM_WORKER_MAX_JOBS, max_rss_mb=WARM_WORKER_MAX_RSS_MB):
+        self.context = context
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self.process = None
+        self.conn = None
+        self.jobs = 0
+        self.start()
+
+    def start(self):
+        parent_conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        self.jobs = 0
+        self.conn.recv()  # Wait until manim is imported
+
+    def stop(self):
+        if self.process is None:
+            return
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+        self.process = None
+
+    def recycle(self, reason):
+        print(f"Recycling manim worker {self.process.pid} ({reason})")
+        self.stop()
+        self.start()
+
+    def run(self, job, timeout=None):
+        """Send one job and wait for its reply dict."""
+        self.conn.send(job)
+        if not self.conn.poll(timeout):
+            self.process.kill()
+            self.process.join()
+            self.start()
+            return {'success': False, 'error_class': "Timeout", 'error': f"Render exceeded {timeout}s", 'stderr': ""}
+        try:
+            reply = self.conn.recv()
+        except EOFError:
+            exitcode = self.process.exitcode
+            self.process.join()
+            self.start()
+            return {'success': False, 'error_class': "WorkerCrashed",
+                    'error': f"Worker exited with code {exitcode}", 'stderr': ""}
+
+        self.jobs += 1
+        if reply.get('rss_mb', 0) > self.max_rss_mb:
+            self.recycle(f"peak RSS {reply['rss_mb']:.0f} MB")
+        elif self.jobs >= self.max_jobs:
+            self.recycle(f"served {self.jobs} jobs")
+        return reply
+
+
+class WarmWorkerPool:
+    """Fixed-size set of warm workers shared by the render threads."""
+
+    def __init__(self, size, max_jobs=WARM_WORKER_MAX_JOBS, max_rss_mb=WARM_WORKER_MAX_RSS_MB):
+        # spawn starts workers without the parent's threads and network clients. It does re-import the
+        # parent's __main__ module as __mp_main__, so that module must not do work at import time
+        # (render_animations.py sets up in init())
+        context = multiprocessing.get_context("spawn")
+        self._idle = queue.Queue()
+        self._workers = []
+        for _ in range(size):
+            worker = WarmWorker(context, max_jobs, max_rss_mb)
+            self._workers.append(worker)
+            self._idle.put(worker)
+
+    def render(self, script_path, scene_name, media_dir, output_name, quality_flags="-qm", fmt="mp4",
+               disable_caching=True, timeout=None, fps=None, tex_cache_dir=None, still=False):
+        """Render on the next idle worker; blocks until one is free. Returns the reply dict."""
+        worker = self._idle.get()
+        try:
+            started = time.perf_counter()
+            reply = worker.run({
+                'script_path': script_path,
+                'scene_name': scene_name,
+                'media_dir': media_dir,
+                'output_name': output_name,
+                'quality_flags': quality_flags,
+                'fmt': fmt,
+                'disable_caching': disable_caching,
+                'fps': fps,
+                'tex_cache_dir': tex_cache_dir,
+                'still': still,
+            }, timeout)
+            reply['elapsed'] = time.perf_counter() - started
+            return reply
+        finally:
+            self._idle.put(worker)
+
+    def close(self):
+        for worker in self._workers:
+            worker.stop()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "batch":
+        render_batch_main(sys.argv[2])
+    else:
+        print("Usage: python manim_worker.py batch manifest.json")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Buffered, batched metadata writes to the animations table.
+
+Rows are collected in memory and sent as one multi-row upsert when the
+buffer reaches METADATA_BATCH_SIZE rows or METADATA_FLUSH_INTERVAL seconds
+pass. Upserting on the unique hash column makes re-runs idempotent.
+
+Every row is also spilled to the job ledger as it is added and cleared once
+written, so rows still buffered when the process dies, or in a batch the
+database rejects, are resent by a later flush. The ledger keeps only the
+newest row per hash, so an older row (a preview's) is never resent over a
+newer one (the final render's).
+"""
+import os
+import threading
+import time
+
+from metrics import metrics
+
+METADATA_BATCH_SIZE = int(os.environ.get("METADATA_BATCH_SIZE", "50"))
+METADATA_FLUSH_INTERVAL = float(os.environ.get("METADATA_FLUSH_INTERVAL", "5.0"))
+
+
+class MetadataWriter:
+    """Background writer that turns many single-row inserts into a few upserts."""
+
+    def __init__(self, supabase_client, table_name, ledger, batch_size=METADATA_BATCH_SIZE,
+                 flush_interval=METADATA_FLUSH_INTERVAL):
+        self.client = supabase_client
+        self.table_name = table_name
+        self.ledger = ledger
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._rows = {}
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="metadata-writer", daemon=True)
+        self._thread.start()
+
+    def add(self, row):
+        """Buffer one row; a full buffer wakes the writer thread.
+
+        A newer row for a hash that is still buffered replaces the older one,
+        since one upsert statement cannot touch the same row twice.
+        """
+        self.ledger.spill_metadata([row])
+        with self._cond:
+            self._rows[row['hash']] = row
+            if len(self._rows) >= self.batch_size:
+                self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while not self._closed and len(self._rows) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                closed = self._closed
+            self.flush()
+            if closed:
+                break
+
+    def _upsert(self, rows):
+        with metrics.span("metadata", rows=len(rows)):
+            self.client.table(self.table_name).upsert(rows, on_conflict="hash").execute()
+
+    def flush(self):
+        """Send everything buffered, plus any rows spilled and not yet written."""
+        with self._flush_lock:
+            with self._cond:
+                rows, self._rows = list(self._rows.values()), {}
+
+            for start in range(0, len(rows), self.batch_size):
+                batch = rows[start:start + self.batch_size]
+                try:
+                    self._upsert(batch)
+                    self.ledger.clear_spilled_metadata(batch)
+                    metrics.incr("metadata_rows_total", len(batch), outcome="written")
+                    print(f"Stored metadata for {len(batch)} animations in Supabase")
+                except Exception as e:
+                    # This batch and everything after it stay spilled for the next flush
+                    unsent = rows[start:]
+                    print(f"Error storing animation metadata ({len(unsent)} rows kept in ledger): {e}")
+                    metrics.incr("metadata_rows_total", len(unsent), outcome="spilled")
+                    return
+
+            self._replay_spilled()
+
+    def _replay_spilled(self):
+        spilled = self.ledger.spilled_metadata(self.batch_size)
+        while spilled:
+            try:
+                self._upsert(spilled)
+            except Exception as e:
+                print(f"Spilled metadata still cannot be written: {e}")
+                return
+            self.ledger.clear_spilled_metadata(spilled)
+            print(f"Replayed {len(spilled)} spilled metadata rows")
+            spilled = self.ledger.spilled_metadata(self.batch_size)
+
+    def close(self):
+        """Flush remaining rows and stop the writer thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""Per-stage timing spans, counters and histograms for the render pipeline.
+
+Every span is one stage of one animation (repair, preflight, manim, upload,
+metadata, ...). When a trace file is configured, each span is appended to
+it as a JSON line, and its duration always feeds the stage-seconds
+histogram. Counters track fallbacks, repairs and failures by class.
+
+Exports:
+    METRICS_TRACE_FILE  JSONL file that receives one line per span
+    METRICS_PROM_FILE   Prometheus text-format file, rewritten every METRICS_EXPORT_INTERVAL seconds
+    METRICS_PORT        Serve the same text at http://<host>:<port>/metrics
+
+Usage:
+    from metrics import metrics
+    with metrics.span("repair", animation_id):
+        ...
+    metrics.incr("fallbacks_total", reason="preflight")
+
+    python metrics.py render_trace.jsonl   # per-stage summary of a trace file
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_TRACE_FILE = os.environ.get("METRICS_TRACE_FILE")
+METRICS_PROM_FILE = os.environ.get("METRICS_PROM_FILE")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))
+METRICS_EXPORT_INTERVAL = float(os.environ.get("METRICS_EXPORT_INTERVAL", "15"))
+
+PREFIX = "render_"
+STAGE_HISTOGRAM = "stage_seconds"
+# Stage durations range from sub-millisecond AST passes to multi-minute renders
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+DESCRIPTIONS = {
+    STAGE_HISTOGRAM: "Seconds spent in each pipeline stage per animation",
+    "queue_wait_seconds": "Seconds a render job waited in the queue",
+    "fallbacks_total": "Animations rendered with the fallback scene, by reason",
+    "repairs_total": "Repair rules applied to submitted code, by rule",
+    "failures_total": "Failed stages, by stage and error class",
+    "render_failures_total": "Failed manim renders, by failure class",
+    "retries_total": "Renders re-queued with a targeted repair, by failure class",
+    "cache_hits_total": "Renders served from the render cache",
+    "upload_retries_total": "Upload attempts retried after a failure",
+    "metadata_rows_total": "Metadata rows written or spilled, by outcome",
+}
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Metrics:
+    """Thread-safe registry of counters and histograms with an optional span trace."""
+
+    def __init__(self, trace_file=None):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)  # (name, label key) -> value
+        self._histograms = {}  # (name, label key) -> [bucket counts..., sum, count]
+        self._trace = open(trace_file, 'a', buffering=1) if trace_file else None
+
+    def incr(self, name, value=1, **labels):
+        with self._lock:
+            self._counters[(name, _label_key(labels))] += value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * len(BUCKETS) + [0.0, 0]
+            for i, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    histogram[i] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def record_span(self, stage, seconds, animation_id=None, status="ok", **attrs):
+        """Record a stage that was timed elsewhere, e.g. from RenderResult.timings."""
+        self.observe(STAGE_HISTOGRAM, seconds, stage=stage)
+        if status != "ok":
+            self.incr("failures_total", stage=stage, error_class=status)
+        if self._trace is not None:
+            record = {'ts': time.time(), 'stage': stage, 'animation_id': animation_id, 'seconds': round(seconds, 6),
+                      'status': status}
+            record.update(attrs)
+            line = json.dumps(record, default=str)
+            with self._lock:
+                self._trace.write(line + "\n")
+
+    @contextmanager
+    def span(self, stage, animation_id=None, **attrs):
+        """Time the enclosed block as one stage; an exception marks the span failed and propagates."""
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            yield attrs
+        except BaseException as e:
+            status = type(e).__name__
+            raise
+        finally:
+            self.record_span(stage, time.perf_counter() - started, animation_id, status, **attrs)
+
+    def prometheus_text(self):
+        """Render every metric in the Prometheus text exposition format."""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(value) for key, value in self._histograms.items()}
+
+        lines = []
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# HELP {PREFIX}{name} {DESCRIPTIONS.get(name, name)}")
+            lines.append(f"# TYPE {PREFIX}{name} counter")
+            for (metric, key), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{PREFIX}{name}{_format_labels(key)} {value:g}")
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f"# HELP {PREFIX}{name} {DESCRIPTIONS.get(name, name)}")
+            lines.append(f"# TYPE {PREFIX}{name} histogram")
+            for (metric, key), values in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for bound, count in zip(BUCKETS, values):
+                    lines.append(f"{PREFIX}{name}_bucket{_format_labels(key, [('le', f'{bound:g}')])} {count}")
+                lines.append(f"{PREFIX}{name}_bucket{_format_labels(key, [('le', '+Inf')])} {values[-1]}")
+                lines.append(f"{PREFIX}{name}_sum{_format_labels(key)} {values[-2]:g}")
+                lines.append(f"{PREFIX}{name}_count{_format_labels(key)} {values[-1]}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Atomically replace path with the current metrics, for node_exporter's textfile collector."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def start_exporters(self, prom_file=METRICS_PROM_FILE, port=METRICS_PORT, interval=METRICS_EXPORT_INTERVAL):
+        """Start whichever of the file and HTTP exporters are configured."""
+        if prom_file:
+            def export_forever():
+                while True:
+                    time.sleep(interval)
+                    self.write_prometheus(prom_file)
+            threading.Thread(target=export_forever, name="metrics-file", daemon=True).start()
+        if port:
+            registry = self
+
+            class MetricsHandler(BaseHTTPRequestHandler):
+                def log_message(self, format, *args):
+                    pass
+
+                def do_GET(self):
+                    if self.path != "/metrics":
+                        self.send_response(404)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    body = registry.prometheus_text().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+            server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+
+
+# Shared registry for the whole process
+metrics = Metrics(METRICS_TRACE_FILE)
+
+
+def summarize_trace(path):
+    """Print count, total and mean seconds per stage from a trace file."""
+    totals = defaultdict(lambda: [0, 0.0, 0])
+    with open(path, 'r') as f:
+        for line in f:
+            record = json.loads(line)
+            stats = totals[record['stage']]
+            stats[0] += 1
+            stats[1] += record['seconds']
+            stats[2] += record['status'] != "ok"
+    print(f"{'stage':<16}{'spans':>8}{'total s':>12}{'mean s':>10}{'failed':>8}")
+    for stage, (count, seconds, failed) in sorted(totals.items(), key=lambda item: -item[1][1]):
+        print(f"{stage:<16}{count:>8}{seconds:>12.2f}{seconds / count:>10.3f}{failed:>8}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 2:
+        summarize_trace(sys.argv[1])
+    else:
+        print("Usage: python metrics.py render_trace.jsonl")
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""Static pre-flight checks for generated Manim code.
+
+Runs in milliseconds on the AST and catches what would otherwise only show
+up after paying for a full manim launch:
+
+- every Scene subclass, including ThreeDScene/MovingCameraScene bases and
+  scenes that inherit from other scenes in the same file;
+- Scene methods and manim names that don't exist in the installed manim
+  (or, without manim installed, a list of known-removed APIs);
+- names that are used but never imported or defined;
+- obviously unrenderable code: no scene, a scene without construct(), or
+  a construct() that loops forever.
+
+It also spots still scenes. A scene is still when nothing in the file plays an
+animation or adds an updater, and its only waits are at the end of
+construct(). Every frame of such a scene is its last one, so it can be
+rendered as a single image.
+
+Usage:
+    python preflight.py scene.py
+    python preflight.py --check     # analyze EXAMPLES and report any that come out wrong
+"""
+import ast
+import builtins
+import functools
+import inspect
+import sys
+import textwrap
+from dataclasses import dataclass, field
+
+# Scene base classes shipped with manim, used when manim isn't importable
+KNOWN_SCENE_BASES = {
+    "Scene", "ThreeDScene", "SpecialThreeDScene", "MovingCameraScene", "ZoomedScene",
+    "VectorScene", "LinearTransformationScene",
+}
+THREE_D_BASES = {"ThreeDScene", "SpecialThreeDScene"}
+MOVING_CAMERA_BASES = {"MovingCameraScene", "ZoomedScene"}
+
+# Scene methods that don't exist in manim community edition
+REMOVED_SCENE_METHODS = {
+    "section": "self.section() is not available in this Manim version; use self.next_section()",
+}
+
+# Methods that only exist on ThreeDScene
+THREE_D_METHODS = {
+    "set_camera_orientation", "move_camera", "begin_ambient_camera_rotation",
+    "stop_ambient_camera_rotation", "begin_3dillusion_camera_rotation", "add_fixed_in_frame_mobjects",
+    "add_fixed_orientation_mobjects",
+}
+
+# Names from older manim releases and their community-edition replacements
+REMOVED_NAMES = {
+    "ShowCreation": "Create",
+    "TextMobject": "Text or Tex",
+    "TexMobject": "MathTex",
+    "FadeInFrom": "FadeIn(mobject, shift=...)",
+    "FadeInFromDown": "FadeIn(mobject, shift=UP)",
+    "FadeOutAndShift": "FadeOut(mobject, shift=...)",
+    "FadeOutAndShiftDown": "FadeOut(mobject, shift=DOWN)",
+    "ShowCreationThenDestruction": "ShowPassingFlash",
+    "GraphScene": "Axes inside a Scene",
+    "CONFIG": "__init__ arguments",
+}
+
+# Calls that change what is on screen over time; a still scene has none of them
+ANIMATING_METHODS = {
+    "play", "wait_until", "add_updater", "move_camera", "begin_ambient_camera_rotation",
+    "begin_3dillusion_camera_rotation", "add_sound", "interactive_embed", "embed",
+}
+ANIMATING_FUNCTIONS = {"always_redraw", "always", "f_always", "turn_animation_into_updater", "cycle_animation"}
+WAIT_METHODS = ("wait", "pause")
+DEFAULT_WAIT_SECONDS = 1.0
+
+_manim_namespace = None
+
+
+def installed_manim_namespace():
+    """Return the names exported by the installed manim, or None if it isn't installed."""
+    global _manim_namespace
+    if _manim_namespace is None:
+        try:
+            import manim
+            _manim_namespace = vars(manim)
+        except Exception:
+            _manim_namespace = {}
+    return _manim_namespace or None
+
+
+@functools.lru_cache(maxsize=None)
+def scene_attributes(cls):
+    """Attributes available on instances of a manim Scene class.
+
+    Class attributes come from dir(); instance attributes are collected from
+    `self.x = ...` assignments in the source of every class in the MRO.
+    """
+    names = set(dir(cls))
+    for klass in cls.__mro__:
+        try:
+            tree = ast.parse(textwrap.dedent(inspect.getsource(klass)))
+        except (OSError, TypeError, SyntaxError):
+            continue
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Attribute) and isinstance(node.ctx, ast.Store) \
+                    and isinstance(node.value, ast.Name) and node.value.id == "self":
+                names.add(node.attr)
+    return frozenset(names)
+
+
+@dataclass
+class Issue:
+    code: str
+    message: str
+    lineno: int = None
+
+    def __str__(self):
+        location = f"line {self.lineno}: " if self.lineno else ""
+        return f"{location}{self.message} [{self.code}]"
+
+
+@dataclass
+class SceneInfo:
+    name: str
+    bases: list
+    lineno: int
+    has_construct: bool = False
+    is_3d: bool = False
+    moving_camera: bool = False
+    still_seconds: float = None  # Seconds of trailing waits when every frame is the last one, else None
+
+
+@dataclass
+class PreflightReport:
+    """Result of analyze(); ok is False when the code should not be sent to manim."""
+    scenes: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+    warnings: list = field(default_factory=list)
+    syntax_error: str = None
+
+    @property
+    def ok(self):
+        return self.syntax_error is None and not self.errors
+
+    @property
+    def scene_name(self):
+        """The scene to render: the first one no other scene in the file inherits from."""
+        inherited = {base for scene in self.scenes for base in scene.bases}
+        for scene in self.scenes:
+            if scene.name not in inherited:
+                return scene.name
+        return self.scenes[0].name if self.scenes else None
+
+    @property
+    def still_seconds(self):
+        """still_seconds of the scene to render; None unless it never changes on screen."""
+        scene = next((scene for scene in self.scenes if scene.name == self.scene_name), None)
+        return scene.still_seconds if scene else None
+
+
+def _base_name(node):
+    """'Scene' for both Scene and manim.Scene base expressions."""
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+
+def _scene_bases(manim_names):
+    if manim_names:
+        scene_cls = manim_names.get("Scene")
+        bases = {name for name, value in manim_names.items()
+                 if isinstance(value, type) and scene_cls is not None and issubclass(value, scene_cls)}
+        return bases or KNOWN_SCENE_BASES
+    return KNOWN_SCENE_BASES
+
+
+def find_scenes(tree, manim_names=None):
+    """Return SceneInfo for every class in tree that (transitively) subclasses a manim Scene."""
+    manim_bases = _scene_bases(manim_names)
+    classes = [node for node in tree.body if isinstance(node, ast.ClassDef)]
+    scene_names = {}
+    changed = True
+    while changed:
+        changed = False
+        for node in classes:
+            if node.name in scene_names:
+                continue
+            bases = [_base_name(base) for base in node.bases]
+            if any(base in manim_bases or base in scene_names for base in bases):
+                scene_names[node.name] = node
+                changed = True
+
+    scenes = []
+    for node in classes:
+        if node.name not in scene_names:
+            continue
+        bases = [_base_name(base) for base in node.bases]
+        info = SceneInfo(node.name, bases, node.lineno)
+        info.has_construct = any(isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) and item.name == "construct"
+                                 for item in node.body)
+        scenes.append(info)
+
+    # Inherit construct() and camera capabilities from scenes in the same file
+    by_name = {scene.name: scene for scene in scenes}
+    for _ in range(len(scenes)):
+        for scene in scenes:
+            for base in scene.bases:
+                parent = by_name.get(base)
+                scene.is_3d |= base in THREE_D_BASES or bool(parent and parent.is_3d)
+                scene.moving_camera |= base in MOVING_CAMERA_BASES or bool(parent and parent.moving_camera)
+                scene.has_construct |= bool(parent and parent.has_construct)
+    return scenes
+
+
+def _bound_names(tree):
+    """Every name bound anywhere in the module, ignoring scope."""
+    names = set(dir(builtins)) | {"__name__", "__file__", "__doc__"}
+    star_modules = []
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                if alias.name == "*":
+                    star_modules.append(node.module)
+                else:
+                    names.add(alias.asname or alias.name.split(".")[0])
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+        elif isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+            names.add(node.id)
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            names.add(node.name)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            names.update(node.names)
+        elif isinstance(node, (ast.MatchAs, ast.MatchStar)) and node.name:
+            names.add(node.name)
+        elif isinstance(node, ast.MatchMapping) and node.rest:
+            names.add(node.rest)
+    return names, star_modules
+
+
+def _loops_forever(node):
+    """True for `while True:` loops with no break or return inside."""
+    if not isinstance(node, ast.While):
+        return False
+    if not (isinstance(node.test, ast.Constant) and node.test.value):
+        return False
+    return not any(isinstance(inner, (ast.Break, ast.Return, ast.Raise)) for inner in ast.walk(node))
+
+
+def _self_attributes(tree):
+    """Methods, class attributes and self.x attributes defined by any class in the module."""
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ClassDef):
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                    names.add(item.name)
+                elif isinstance(item, (ast.Assign, ast.AnnAssign, ast.AugAssign)):
+                    targets = item.targets if isinstance(item, ast.Assign) else [item.target]
+                    names.update(target.id for t in targets for target in ast.walk(t) if isinstance(target, ast.Name))
+        elif isinstance(node, ast.Attribute) and isinstance(node.ctx, ast.Store) \
+                and isinstance(node.value, ast.Name) and node.value.id == "self":
+            names.add(node.attr)
+    return names
+
+
+def _wait_seconds(call):
+    arg = call.args[0] if call.args else next((kw.value for kw in call.keywords if kw.arg == "duration"), None)
+    if isinstance(arg, ast.Constant) and isinstance(arg.value, (int, float)) and arg.value > 0:
+        return float(arg.value)
+    return DEFAULT_WAIT_SECONDS
+
+
+def _still_seconds(tree, node):
+    """Seconds of the trailing waits in node's construct() if the scene never changes on screen, else None."""
+    construct = next((item for item in node.body if isinstance(item, ast.FunctionDef) and item.name == "construct"),
+                     None)
+    if construct is None:
+        return None
+    trailing = []
+    for stmt in reversed(construct.body):
+        call = stmt.value if isinstance(stmt, ast.Expr) else None
+        if not (isinstance(call, ast.Call) and isinstance(call.func, ast.Attribute) and call.func.attr in WAIT_METHODS
+                and isinstance(call.func.value, ast.Name) and call.func.value.id == "self"):
+            break
+        trailing.append(call)
+    # Helpers anywhere in the file may animate the scene they are given
+    for item in ast.walk(tree):
+        if not isinstance(item, ast.Call):
+            continue
+        if isinstance(item.func, ast.Attribute):
+            if item.func.attr in ANIMATING_METHODS:
+                return None
+            if item.func.attr in WAIT_METHODS and not any(item is call for call in trailing):
+                return None  # Something may change between two waits
+        elif isinstance(item.func, ast.Name) and item.func.id in ANIMATING_FUNCTIONS:
+            return None
+    return sum((_wait_seconds(call) for call in trailing), 0.0)
+
+
+def _check_scene_class(node, info, local_attributes, manim_names, report):
+    manim_base = next((manim_names[base] for base in info.bases if manim_names and base in manim_names), None)
+    known = scene_attributes(manim_base) if isinstance(manim_base, type) else None
+    flagged = set()
+
+    for item in ast.walk(node):
+        if isinstance(item, ast.Attribute) and isinstance(item.value, ast.Name) and item.value.id == "self":
+            attr = item.attr
+            if attr in local_attributes or attr in flagged:
+                continue
+            if attr in REMOVED_SCENE_METHODS:
+                message = REMOVED_SCENE_METHODS[attr]
+            elif attr in THREE_D_METHODS and not info.is_3d:
+                message = f"self.{attr}() needs {info.name} to subclass ThreeDScene"
+            elif known is not None and attr not in known:
+                message = f"self.{attr} does not exist on {manim_base.__name__} in the installed manim"
+            else:
+                continue
+            flagged.add(attr)
+            report.errors.append(Issue("unknown-api", message, item.lineno))
+        elif isinstance(item, ast.Attribute) and item.attr == "frame" and not info.moving_camera:
+            value = item.value
+            if isinstance(value, ast.Attribute) and value.attr == "camera" \
+                    and isinstance(value.value, ast.Name) and value.value.id == "self" and "camera.frame" not in flagged:
+                flagged.add("camera.frame")
+                report.errors.append(Issue(
+                    "unknown-api", f"self.camera.frame needs {info.name} to subclass MovingCameraScene", item.lineno))
+
+    if not info.has_construct:
+        report.errors.append(Issue("unrenderable", f"{info.name} has no construct() method", node.lineno))
+    for item in node.body:
+        if isinstance(item, ast.FunctionDef) and item.name == "construct":
+            if all(isinstance(stmt, ast.Pass) or (isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant))
+                   for stmt in item.body):
+                report.warnings.append(Issue("empty-scene", f"{info.name}.construct() does nothing", item.lineno))
+            for inner in ast.walk(item):
+                if _loops_forever(inner):
+                    report.errors.append(Issue(
+                        "unrenderable", "construct() contains a `while True` loop with no exit", inner.lineno))
+
+
+def analyze(code, use_installed_manim=True, manim_names=None):
+    """Run every pre-flight check over code and return a PreflightReport.
+
+    manim_names replaces the installed manim's namespace, e.g. with a stand-in.
+    """
+    report = PreflightReport()
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        report.syntax_error = str(e)
+        return report
+
+    if manim_names is None and use_installed_manim:
+        manim_names = installed_manim_namespace()
+    report.scenes = find_scenes(tree, manim_names)
+    if not report.scenes:
+        report.errors.append(Issue("no-scene", "No Scene subclass found"))
+    elif len(report.scenes) > 1:
+        report.warnings.append(Issue(
+            "multiple-scenes", f"{len(report.scenes)} scenes defined; rendering {report.scene_name}"))
+
+    user_bound, star_modules = _bound_names(tree)
+    manim_star = any(module and module.split(".")[0] == "manim" for module in star_modules)
+    other_star = any(not module or module.split(".")[0] != "manim" for module in star_modules)
+    bound = user_bound | set(manim_names) if manim_star and manim_names else user_bound
+
+    seen = set()
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load)) or node.id in seen:
+            continue
+        name = node.id
+        if name in REMOVED_NAMES and name not in user_bound and not (manim_names and name in manim_names):
+            seen.add(name)
+            report.errors.append(Issue(
+                "unknown-api", f"{name} was removed from manim; use {REMOVED_NAMES[name]}", node.lineno))
+        elif name not in bound and not other_star and (manim_names or not manim_star):
+            # Without manim installed, `from manim import *` could define anything
+            seen.add(name)
+            report.errors.append(Issue("missing-import", f"{name} is used but never imported or defined", node.lineno))
+
+    local_attributes = _self_attributes(tree)
+    scenes = {scene.name: scene for scene in report.scenes}
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and node.name in scenes:
+            _check_scene_class(node, scenes[node.name], local_attributes, manim_names, report)
+            scenes[node.name].still_seconds = _still_seconds(tree, node)
+    return report
+
+
+class _StandInScene:
+    """Minimal Scene for EXAMPLES, so they check the installed-manim path without manim."""
+
+    def play(self, *animations):
+        pass
+
+    def wait(self, duration=1.0):
+        pass
+
+    def add(self, *mobjects):
+        pass
+
+
+# (code, error codes analyze() should report against _StandInScene)
+EXAMPLES = [
+    ("from manim import *\nclass A(Scene):\n    COLORS = [1, 2]\n    size: float = 2.0\n\n"
+     "    def construct(self):\n        self.add(self.COLORS, self.size)\n        self.wait()\n", []),
+    ("from manim import *\nclass A(Scene):\n    def construct(self):\n        self.shout()\n", ["unknown-api"]),
+    ("from manim import *\nclass A(Scene):\n    def construct(self):\n        self.x = 1\n"
+     "        self.play(self.x)\n", []),
+]
+
+
+def check_examples():
+    """Analyze each of EXAMPLES and print any mismatch. Returns the number of failures."""
+    namespace = {"Scene": _StandInScene}
+    failures = 0
+    for code, expected in EXAMPLES:
+        report = analyze(code, manim_names=namespace)
+        codes = [issue.code for issue in report.errors]
+        if codes != expected:
+            failures += 1
+            print(f"{code!r}\n  expected {expected}\n  got      {[str(issue) for issue in report.errors]}")
+    print(f"{len(EXAMPLES) - failures}/{len(EXAMPLES)} examples analyzed as expected")
+    return failures
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python preflight.py your_manim_script.py | --check")
+        sys.exit(2)
+    if sys.argv[1] == "--check":
+        sys.exit(1 if check_examples() else 0)
+    with open(sys.argv[1], 'r') as f:
+        result = analyze(f.read())
+    if result.syntax_error:
+        print(f"Syntax error: {result.syntax_error}")
+    for scene in result.scenes:
+        print(f"Scene: {scene.name} ({', '.join(b for b in scene.bases if b)})")
+        if scene.still_seconds is not None:
+            print(f"  still: one frame held for {scene.still_seconds:g}s")
+    for issue in result.errors:
+        print(f"ERROR {issue}")
+    for issue in result.warnings:
+        print(f"WARNING {issue}")
+    sys.exit(0 if result.ok else 1)
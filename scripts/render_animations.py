@@ -2,56 +2,137 @@
 import json
 import os
 import time
-import subprocess
-import hashlib
-import tempfile
 import shutil
-import ast
-import re
 from tqdm import tqdm
 import supabase
 import dotenv
 from datetime import datetime
 import base64
+import dataclasses
+import functools
 import uuid
+import threading
+from code_repair import repair
+from failure_classifier import classify, plan_retry
+from fallback_clip import FallbackClips
+from ffmpeg_tools import ffmpeg_available
+from job_ledger import JobLedger, PENDING, PREVIEWED, UPLOADING
+from manim_worker import WarmWorkerPool
+from metadata_writer import MetadataWriter
+from metrics import metrics
+from manim_render import render_batch, render_scene
+from preflight import analyze
+from render_cache import RenderCache
+from render_cost import CostModel, estimate_features
+from render_intake import RENDER_INTAKE_HOST, start_intake
+from render_queue import (LANE_BATCH, LANE_INTERACTIVE, LANES, PRIORITY_FINAL, PRIORITY_PREVIEW, RenderJob,
+                          RenderQueue)
+from render_sandbox import LIMIT_ERRORS, RenderLimits
+from scene_profiler import top_offenders
+from source_ingest import JsonArraySource, JsonlSource, get_code_hash
+from split_render import SPLIT_MIN_SECONDS, plan_ranges, render_split
+from tex_cache import TEX_CACHE_DIR
+from upload_stage import StorageClient, UploadStage
 
 # Load environment variables from .env file if it exists
 dotenv.load_dotenv()
 
 # Configuration
 SOURCE_JSON = "combined_data_2.json"
-PROCESSED_LOG = "rendered_animations.json"
-FAILED_ANIMATIONS_LOG = "failed_animations.json"
-RENDER_INTERVAL = 30  # Check for new animations every 30 seconds
+SOURCE_JSONL = os.environ.get("SOURCE_JSONL")  # Append-only JSONL source; enables incremental ingest
+PROCESSED_LOG = "rendered_animations.json"  # Legacy log, imported into the ledger once
+FAILED_ANIMATIONS_LOG = "failed_animations.json"  # Legacy log, imported into the ledger once
+LEDGER_DB = os.environ.get("RENDER_LEDGER_DB", "render_jobs.db")
+RENDER_INTERVAL = 30  # Re-check for new animations at least every 30 seconds
 OUTPUT_DIR = "rendered_animations"
 MANIM_FLAGS = "-qm"  # Medium quality for faster rendering
+PREVIEW_MODE = os.environ.get("PREVIEW_MODE", "0") == "1"  # Publish a fast preview before the full render
+PREVIEW_FLAGS = "-ql"  # Preview quality
+PREVIEW_FPS = int(os.environ.get("PREVIEW_FPS", "10"))  # Preview frame rate
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", os.cpu_count() or 1))  # Concurrent manim renders
+RENDER_MODE = os.environ.get("RENDER_MODE", "subprocess")  # "subprocess" or "warm" (persistent manim workers)
+RENDER_QUEUE_SIZE = int(os.environ.get("RENDER_QUEUE_SIZE", RENDER_WORKERS * 2))  # Max queued items waiting for a worker
+# Workers that only take interactive (chat) renders, so a backfill never fills every worker
+INTERACTIVE_WORKERS = int(os.environ.get("INTERACTIVE_WORKERS", "1" if RENDER_WORKERS > 1 else "0"))
+RENDER_INTAKE_PORT = int(os.environ.get("RENDER_INTAKE_PORT", "0"))  # HTTP intake for chat renders; 0 disables it
+
+RENDER_CACHE_DIR = os.environ.get("RENDER_CACHE_DIR", "render_cache")  # Rendered videos keyed by AST fingerprint
+RENDER_CACHE_MAX_MB = int(os.environ.get("RENDER_CACHE_MAX_MB", "5120"))  # LRU-evicted above this size
+PROFILE_RENDERS = os.environ.get("PROFILE_RENDERS", "0") == "1"  # Run renders under scene_profiler.py
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "render_profiles")  # Per-render profiles, merged by scene_profiler.py
+RETRY_BUDGET = int(os.environ.get("RETRY_BUDGET", "2"))  # Targeted retries per animation before the fallback
+RETRY_BACKOFF = float(os.environ.get("RETRY_BACKOFF", "5"))  # Seconds before the first retry; doubles each time
+RETRY_SCHEDULED = "retry-scheduled"  # render_animation() result when the job went back to the queue
+RENDER_BATCH_SIZE = int(os.environ.get("RENDER_BATCH_SIZE", "1"))  # Small scenes per manim process; 1 disables batching
+BATCH_MAX_SECONDS = float(os.environ.get("BATCH_MAX_SECONDS", "20"))  # Largest estimated render that gets batched
+# Batches run in their own manim process, so they take the place of subprocess renders only
+BATCH_RENDERS = RENDER_BATCH_SIZE > 1 and RENDER_MODE == "subprocess" and not PROFILE_RENDERS
+STILL_SCENES = os.environ.get("STILL_SCENES", "1") == "1"  # Render scenes that never change as one held frame
+STILL_MIN_SECONDS = float(os.environ.get("STILL_MIN_SECONDS", "2"))  # Shortest video a still scene becomes
 
 # Supabase configuration
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
 # Try the service role key instead of the anon key for more permissions
 SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")  # Changed this line
 STORAGE_BUCKET = "test-sonnet-animations"
+STORAGE_URL = os.environ.get("STORAGE_URL", SUPABASE_URL)  # Point at storage_standin.py for local runs
+UPLOAD_WORKERS = int(os.environ.get("UPLOAD_WORKERS", "4"))  # Concurrent uploads, independent of render workers
 TABLE_NAME = "test_sonnet_animations"
+ANIMATION_ID_NAMESPACE = uuid.UUID("6f1c0a52-3c1e-4f4e-9d0b-5a4f3e2d1c0b")  # Row ids are derived from the code hash
 
-# Create output directory if it doesn't exist
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+# Render jobs by lane and priority; interactive jobs first, then previews before full-quality renders
+render_jobs = RenderQueue(maxsize=RENDER_QUEUE_SIZE)
 
-# Initialize or load the logs
-processed_animations = {}
-if os.path.exists(PROCESSED_LOG):
-    with open(PROCESSED_LOG, 'r') as f:
-        processed_animations = json.load(f)
+# Guards the set of items currently queued, rendering or uploading and the scan stats
+log_lock = threading.Lock()
+in_flight = set()
+scan_stats = {'rendered': 0, 'failed': 0}
 
-failed_animations = {}
-if os.path.exists(FAILED_ANIMATIONS_LOG):
-    with open(FAILED_ANIMATIONS_LOG, 'r') as f:
-        failed_animations = json.load(f)
+# Opened by init(), not at import: spawned warm workers re-import this module as __mp_main__
+render_cache = None
+# Started in main() when RENDER_MODE is "warm"
+warm_pool = None
+fallback_clips = None
+ledger = None
+cost_model = None
+supabase_client = None
+upload_stage = None
+metadata_writer = None
 
-# Initialize Supabase client
-# Add debug information to verify keys are loaded correctly
-print(f"Connecting to Supabase at URL: {SUPABASE_URL}")
-print(f"Using API key starting with: {SUPABASE_KEY[:10]}..." if SUPABASE_KEY else "API key not found!")
-supabase_client = supabase.create_client(SUPABASE_URL, SUPABASE_KEY)
+def init():
+    """Open the ledger, caches, Supabase client and upload threads. Call once before rendering."""
+    global render_cache, fallback_clips, ledger, cost_model, supabase_client, upload_stage, metadata_writer
+    
+    # Create output directory if it doesn't exist
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    
+    render_cache = RenderCache(RENDER_CACHE_DIR, RENDER_CACHE_MAX_MB * 1024 * 1024)
+    # Pre-rendered fallback clips; failed animations get their title drawn onto one instead of a second render
+    fallback_clips = FallbackClips(cache=render_cache)
+    
+    # Open the job ledger, pulling in the old JSON logs the first time
+    ledger = JobLedger(LEDGER_DB)
+    imported = ledger.import_json_logs(PROCESSED_LOG, FAILED_ANIMATIONS_LOG)
+    if imported:
+        print(f"Imported {imported} jobs from {PROCESSED_LOG} and {FAILED_ANIMATIONS_LOG} into {LEDGER_DB}")
+    interrupted = ledger.requeue_interrupted()
+    if interrupted:
+        print(f"Re-queued {interrupted} animations interrupted by the previous run")
+    
+    # Predicts render times for queue ordering, calibrated from past renders
+    cost_model = CostModel(ledger)
+    cost_model.calibrate()
+    
+    # Initialize Supabase client
+    # Add debug information to verify keys are loaded correctly
+    print(f"Connecting to Supabase at URL: {SUPABASE_URL}")
+    print(f"Using API key starting with: {SUPABASE_KEY[:10]}..." if SUPABASE_KEY else "API key not found!")
+    supabase_client = supabase.create_client(SUPABASE_URL, SUPABASE_KEY)
+    
+    # Uploads run on their own threads so render workers never wait on the network
+    upload_stage = UploadStage(StorageClient(STORAGE_URL, SUPABASE_KEY, STORAGE_BUCKET), UPLOAD_WORKERS)
+    # Metadata rows are batched into multi-row upserts; the ledger holds each row until it is written
+    metadata_writer = MetadataWriter(supabase_client, TABLE_NAME, ledger)
 
 # Check if the table exists, create if it doesn't
 def ensure_table_exists():
@@ -62,106 +143,34 @@ def ensure_table_exists():
     except Exception as e:
         print(f"Error checking table: {e}")
         print(f"Table '{TABLE_NAME}' may need to be created. Please create it with appropriate columns:")
-        print("id UUID PRIMARY KEY, prompt TEXT, code TEXT, animation_url TEXT, created_at TIMESTAMP, hash TEXT")
-
-def get_code_hash(code):
-    """Generate a unique hash for the code to track what's been processed."""
-    return hashlib.md5(code.encode('utf-8')).hexdigest()
-
-def upload_to_supabase(file_path, animation_id):
-    """Upload a file to Supabase storage and return the public URL."""
-    try:
-        file_name = f"dsa_animation_{animation_id}.mp4"
-        
-        # Read file content
-        with open(file_path, 'rb') as f:
-            file_data = f.read()
-        
-        # Upload to Supabase storage
-        supabase_client.storage.from_(STORAGE_BUCKET).upload(
-            path=file_name,
-            file=file_data,
-            file_options={"content-type": "video/mp4"}
-        )
-        
-        # Get the public URL
-        url = supabase_client.storage.from_(STORAGE_BUCKET).get_public_url(file_name)
-        print(f"Uploaded {file_name} to Supabase storage")
-        return url
-    except Exception as e:
-        print(f"Error uploading to Supabase storage: {e}")
-        return None
+        print("id UUID PRIMARY KEY, prompt TEXT, code TEXT, animation_url TEXT, created_at TIMESTAMP, hash TEXT UNIQUE")
 
 def store_animation_metadata(animation_id, prompt, code, url, code_hash):
-    """Store animation metadata in Supabase table."""
-    try:
-        # Insert data into the table
-        data = {
-            "id": str(uuid.uuid4()),
-            "prompt": prompt,
-            "code": code,
-            "animation_url": url,
-            "created_at": datetime.now().isoformat(),
-            "hash": code_hash
-        }
-        
-        result = supabase_client.table(TABLE_NAME).insert(data).execute()
-        print(f"Stored metadata for animation {animation_id} in Supabase")
-        return result.data[0]['id']
-    except Exception as e:
-        print(f"Error storing animation metadata: {e}")
-        return None
+    """Queue animation metadata for the next batched upsert into the Supabase table.
 
-def check_syntax(code):
-    """Check if the code has valid Python syntax."""
-    try:
-        ast.parse(code)
-        return True, None
-    except SyntaxError as e:
-        return False, str(e)
-
-def fix_common_syntax_errors(code):
-    """Attempt to fix common syntax errors in Manim code."""
-    fixed_code = code
-    
-    # Fix mismatched brackets and parentheses
-    brackets = {'(': ')', '[': ']', '{': '}'}
-    stack = []
-    problem_lines = []
-    
-    lines = fixed_code.split('\n')
-    for i, line in enumerate(lines):
-        for char in line:
-            if char in brackets:
-                stack.append((char, i))
-            elif char in brackets.values():
-                if not stack or brackets[stack[-1][0]] != char:
-                    problem_lines.append(i)
-                else:
-                    stack.pop()
-    
-    # Add missing closing brackets
-    if stack:
-        for bracket, line_num in reversed(stack):
-            closing_bracket = brackets[bracket]
-            lines[line_num] = lines[line_num] + closing_bracket
-        fixed_code = '\n'.join(lines)
-    
-    # Fix common specific errors
-    fixed_code = fixed_code.replace("if *self.mobjects in self.mobjects:", "if self.mobjects:  # Fixed syntax")
-    fixed_code = fixed_code.replace("if VGroup(*tree_mobjects in self.mobjects:", 
-                                  "if VGroup(*tree_mobjects) in self.mobjects:  # Fixed syntax")
-    
-    # Fix other common function parameter issues
-    fixed_code = re.sub(r'(\w+)\s*\*\s*(\w+)', r'\1 * \2', fixed_code)
-    
-    # Fix misplaced colons
-    fixed_code = re.sub(r'if\s+([^:]+)in', r'if \1 in', fixed_code)
-    
-    return fixed_code
+    The row id is derived from the hash so a re-run upserts the same row.
+    """
+    row_id = str(uuid.uuid5(ANIMATION_ID_NAMESPACE, code_hash))
+    metadata_writer.add({
+        "id": row_id,
+        "prompt": prompt,
+        "code": code,
+        "animation_url": url,
+        "created_at": datetime.now().isoformat(),
+        "hash": code_hash
+    })
+    return row_id
+
+def fallback_title(prompt):
+    return prompt[:50] + "..." if len(prompt) > 50 else prompt
 
 def create_fallback_animation(animation_id, prompt):
-    """Create a simple but reliable fallback animation when the original code fails."""
+    """Create a simple but reliable fallback animation when the original code fails.
+
+    fallback_clip.py produces the same picture without a manim render; this
+    scene is stored as the code of fallback rows and rendered only when the
+    instant path is unavailable.
+    """
     # Extract possible keywords from the prompt
     keywords = prompt.lower().split()
     algorithm_keywords = ["sort", "search", "tree", "graph", "hash", "array", "list", "stack", "queue"]
@@ -169,7 +178,7 @@ def create_fallback_animation(animation_id, prompt):
     # Determine animation theme based on prompt
     theme = next((kw for kw in keywords if any(alg in kw for alg in algorithm_keywords)), "algorithm")
     
-    title = prompt[:50] + "..." if len(prompt) > 50 else prompt
+    title = fallback_title(prompt)
     
     # Create a simple, reliable animation
     return f"""from manim import *
@@ -218,231 +227,542 @@ class FallbackAnimation(Scene):
         self.wait(2)
 """
 
-def render_animation(code, prompt, animation_id):
-    """Render a single Manim animation from the provided code and upload to Supabase."""
-    animation_output_dir = None
+def record_render_spans(result, animation_id, **attrs):
+    """Turn a RenderResult's timings into metric spans."""
+    status = "ok" if result.success else result.error_class
+    if result.cached:
+        metrics.incr("cache_hits_total")
+    for stage, seconds in result.timings.items():
+        if stage != "total":
+            metrics.record_span(stage, seconds, animation_id, status if stage == "manim" else "ok", **attrs)
+
+def store_profile(profile_path, animation_id):
+    """Record a profiled render's slowest lines in the ledger; the JSON stays in PROFILE_DIR for flamegraphs."""
+    try:
+        with open(profile_path, 'r') as f:
+            profile = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"No profile for animation {animation_id}: {e}")
+        return
+    ledger.record_profile(animation_id, profile['seconds'], profile['categories'], top_offenders(profile))
+    split = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in list(profile['categories'].items())[:3])
+    print(f"Profiled animation {animation_id}: {profile['seconds']:.1f}s ({split})")
+
+def render_fallback(animation_id, prompt, work_dir, output_name, quality_flags, fps, reason):
+    """Produce the fallback video for an animation that cannot be rendered.
+
+    Composites the title onto the pre-rendered base clip, and only renders
+    the fallback scene with manim if that is unavailable. Returns the video
+    path inside work_dir, or None.
+    """
+    metrics.incr("fallbacks_total", reason=reason)
+    output_path = os.path.join(work_dir, f"{output_name}.mp4")
+    with metrics.span("fallback", animation_id, reason=reason):
+        composed = fallback_clips.compose(fallback_title(prompt), f"Animation #{animation_id}", output_path,
+                                          quality_flags, fps)
+    if composed:
+        return composed
+    
+    print("Instant fallback unavailable; rendering the fallback scene with manim")
+    fallback_code = create_fallback_animation(animation_id, prompt)
+    result = render_scene(fallback_code, "FallbackAnimation", os.path.join(work_dir, "fallback"), output_name,
+                          quality_flags, cache=render_cache, pool=warm_pool, fps=fps)
+    record_render_spans(result, animation_id, fallback=True)
+    if not result.success:
+        print(f"Fallback animation also failed ({result.error_class}).")
+        return None
+    return result.output_path
+
+def prepare_animation(code, animation_id):
+    """Repair code and pre-flight it. Returns (code, PreflightReport or None, fallback reason or None)."""
+    # Repair syntax and outdated manim APIs in one pass
+    with metrics.span("repair", animation_id):
+        result = repair(code)
+    if result.changed:
+        print(f"Repaired animation {animation_id}: {', '.join(sorted(result.fired))}")
+        for rule, count in result.fired.items():
+            metrics.incr("repairs_total", count, rule=rule)
+    
+    if not result.ok:
+        print(f"Syntax error in animation {animation_id}: {result.syntax_error}")
+        print(f"Could not fix syntax errors. Using fallback animation.")
+        return code, None, "syntax"
+    code = result.code
+    
+    # Reject code that can't render before paying for a manim launch
+    with metrics.span("preflight", animation_id):
+        report = analyze(code)
+    for warning in report.warnings:
+        print(f"Pre-flight warning for animation {animation_id}: {warning}")
+    if not report.ok:
+        print(f"Pre-flight rejected animation {animation_id}:")
+        for error in report.errors:
+            print(f"  {error}")
+        return code, report, "preflight"
+    return code, report, None
+
+def still_seconds(report):
+    """How long to hold a still scene's only frame for, or None to render the scene frame by frame."""
+    if not STILL_SCENES or report.still_seconds is None or not ffmpeg_available():
+        return None
+    return max(report.still_seconds, STILL_MIN_SECONDS)
+
+def finish_animation(result, code, prompt, animation_id, quality_flags, fps, work_dir, output_name,
+                     fallback_reason=None, on_failure=None, observe=True):
+    """Turn a render_scene() result into render_animation()'s return value.
+
+    result is None when the scene was never rendered because of
+    fallback_reason. A failed render is classified and offered to
+    on_failure before the fallback is used. With observe, a fresh render's
+    time calibrates the cost model.
+    """
+    if result is not None:
+        record_render_spans(result, animation_id)
+        if result.success:
+            if result.cached:
+                print(f"Reused cached render of {result.scene_name}")
+            else:
+                if observe:
+                    cost_model.observe(animation_id, estimate_features(code), quality_flags, result.timings['manim'])
+                print(f"Rendered {result.scene_name} in {result.timings['total']:.1f}s")
+            video_path = result.output_path
+        else:
+            print(f"Error rendering animation {animation_id} ({result.error_class}): {result.error}")
+            print(result.stderr)
+            failure = classify(result.error_class, result.error, result.stderr, work_dir)
+            metrics.incr("render_failures_total", failure_class=failure.kind)
+            if on_failure is not None and on_failure(failure, code, quality_flags):
+                return RETRY_SCHEDULED
+            fallback_reason = "limit" if result.error_class in LIMIT_ERRORS else "render"
+    
+    if fallback_reason is not None:
+        print(f"Using fallback animation for {animation_id} ({fallback_reason})")
+        video_path = render_fallback(animation_id, prompt, work_dir, output_name, quality_flags, fps, fallback_reason)
+        if video_path is None:
+            return None
+        # Store the scene the fallback clip depicts
+        code = create_fallback_animation(animation_id, prompt)
+    
+    # Move the final MP4 out of the scratch directory with a clean name
+    clean_output = os.path.join(OUTPUT_DIR, f"{output_name}.mp4")
+    with metrics.span("move", animation_id):
+        os.replace(video_path, clean_output)
+    
+    print(f"Successfully rendered animation {animation_id}")
+    return clean_output, code, fallback_reason is not None
+
+def remove_work_dir(animation_output_dir):
+    """Clean up an animation's scratch directory regardless of success or failure."""
+    if os.path.exists(animation_output_dir):
+        try:
+            shutil.rmtree(animation_output_dir)
+            print(f"Cleaned up directory: {animation_output_dir}")
+        except Exception as cleanup_error:
+            print(f"Error cleaning up directory: {cleanup_error}")
+
+def render_animation(code, prompt, animation_id, quality_flags=MANIM_FLAGS, fps=None, output_suffix="",
+                     profile=PROFILE_RENDERS, on_progress=None, on_failure=None):
+    """Render a single Manim animation from the provided code.
+
+    Returns (video path, code that produced it, whether the fallback was
+    used) with the video moved into OUTPUT_DIR, or None if neither the code
+    nor the fallback rendered. With profile=True the render runs under the
+    sampling profiler and its top offenders are stored in the ledger.
+    on_progress(fraction) follows the manim render, see manim_render.OutputWatcher.
+    A failed render is classified and passed to on_failure(failure, code,
+    quality_flags); if that re-queues the job, RETRY_SCHEDULED is returned
+    instead of rendering the fallback.
+    """
+    # Create a clean output directory for this specific animation
+    animation_output_dir = os.path.join(OUTPUT_DIR, f"animation_{animation_id}{output_suffix}")
+    final_output_name = f"dsa_animation_{animation_id}{output_suffix}"
     
     try:
-        # First check if the code has valid syntax
-        is_valid, syntax_error = check_syntax(code)
+        code, report, fallback_reason = prepare_animation(code, animation_id)
+        os.makedirs(animation_output_dir, exist_ok=True)
         
-        if not is_valid:
-            print(f"Syntax error in animation {animation_id}: {syntax_error}")
-            print("Attempting to fix common issues...")
+        result = None
+        ranges = []
+        still = None
+        if fallback_reason is None:
+            scene_name = report.scene_name
+            still = still_seconds(report)
+            profile_path = None
+            if profile:
+                os.makedirs(PROFILE_DIR, exist_ok=True)
+                profile_path = os.path.abspath(os.path.join(PROFILE_DIR, f"{final_output_name}.json"))
             
-            # Try to fix common syntax errors
-            fixed_code = fix_common_syntax_errors(code)
-            is_valid, syntax_error = check_syntax(fixed_code)
-            
-            if is_valid:
-                print("Successfully fixed syntax errors!")
-                code = fixed_code
+            # Time and CPU budgets scale with the predicted render time
+            estimate = cost_model.estimate(code, quality_flags)
+            limits = RenderLimits.for_estimate(estimate)
+            # Long scenes render as parallel animation ranges
+            if estimate >= SPLIT_MIN_SECONDS and not profile_path and still is None:
+                ranges = plan_ranges(code, scene_name=scene_name)
+            if still is not None:
+                print(f"Rendering still animation {animation_id} as one frame held {still:g}s: {prompt[:50]}...")
+                result = render_scene(code, scene_name, animation_output_dir, final_output_name, quality_flags,
+                                      cache=render_cache, pool=warm_pool, fps=fps, profile_path=profile_path,
+                                      limits=limits, tex_cache_dir=TEX_CACHE_DIR or None, still_seconds=still)
+            elif ranges:
+                print(f"Rendering animation {animation_id} in {len(ranges)} parallel parts: {prompt[:50]}...")
+                result = render_split(code, scene_name, animation_output_dir, final_output_name, ranges,
+                                      quality_flags, cache=render_cache, fps=fps, limits=limits,
+                                      tex_cache_dir=TEX_CACHE_DIR or None)
             else:
-                print(f"Could not fix syntax errors. Using fallback animation.")
-                code = create_fallback_animation(animation_id, prompt)
-        
-        # Create a temporary Python file with the Manim code
-        with tempfile.NamedTemporaryFile(suffix='.py', mode='w', delete=False) as temp_file:
-            temp_filename = temp_file.name
-            temp_file.write(code)
-        
-        # Extract the Scene class name from the code
-        scene_name = None
-        for line in code.split('\n'):
-            if line.strip().startswith('class ') and '(Scene)' in line:
-                scene_name = line.split('class ')[1].split('(')[0].strip()
-                break
-        
-        if not scene_name:
-            print(f"Could not find Scene class in animation {animation_id}")
-            # Create a fallback animation
-            code = create_fallback_animation(animation_id, prompt)
-            with open(temp_filename, 'w') as f:
-                f.write(code)
-            scene_name = "FallbackAnimation"
+                print(f"Rendering animation {animation_id}: {prompt[:50]}...")
+                result = render_scene(code, scene_name, animation_output_dir, final_output_name, quality_flags,
+                                      cache=render_cache, pool=warm_pool, fps=fps, profile_path=profile_path,
+                                      limits=limits, on_progress=on_progress, tex_cache_dir=TEX_CACHE_DIR or None)
+            if profile_path:
+                store_profile(profile_path, f"{animation_id}{output_suffix}")
         
-        # Create a clean output directory for this specific animation
-        animation_output_dir = os.path.join(OUTPUT_DIR, f"animation_{animation_id}")
-        os.makedirs(animation_output_dir, exist_ok=True)
-        
-        # Run manim with specific flags to generate a single clean MP4
-        final_output_name = f"dsa_animation_{animation_id}"
-        cmd = f"manim {temp_filename} {scene_name} -qm --format=mp4 --disable_caching -o {final_output_name}"
-        
-        print(f"Rendering animation {animation_id}: {prompt[:50]}...")
-        # Change working directory to the animation output directory
-        original_dir = os.getcwd()
-        os.chdir(animation_output_dir)
-        
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-        
-        # Move back to original directory
-        os.chdir(original_dir)
-        
-        # Clean up the temporary file
-        os.unlink(temp_filename)
-        
-        if result.returncode != 0:
-            print(f"Error rendering animation {animation_id}:")
-            print(result.stderr)
+        # Split and still renders don't take the time the model predicts for a full single-process render
+        return finish_animation(result, code, prompt, animation_id, quality_flags, fps, animation_output_dir,
+                                final_output_name, fallback_reason, on_failure, observe=not ranges and still is None)
             
-            # If the regular animation failed, try the fallback
-            print("Trying fallback animation...")
-            fallback_code = create_fallback_animation(animation_id, prompt)
-            
-            with tempfile.NamedTemporaryFile(suffix='.py', mode='w', delete=False) as temp_file:
-                temp_filename = temp_file.name
-                temp_file.write(fallback_code)
-            
-            # Run manim with the fallback animation
-            os.chdir(animation_output_dir)
-            fallback_cmd = f"manim {temp_filename} FallbackAnimation -qm --format=mp4 --disable_caching -o {final_output_name}"
-            fallback_result = subprocess.run(fallback_cmd, shell=True, capture_output=True, text=True)
-            os.chdir(original_dir)
-            
-            # Clean up the temporary file
-            os.unlink(temp_filename)
-            
-            if fallback_result.returncode != 0:
-                print("Fallback animation also failed.")
-                return False
-            
-            # Use the fallback code for storage
-            code = fallback_code
-            
-        # Find the rendered MP4 file
-        expected_output = None
+    except Exception as e:
+        print(f"Exception while rendering animation {animation_id}: {e}")
+        return None
+    finally:
+        with metrics.span("cleanup", animation_id):
+            remove_work_dir(animation_output_dir)
+
+def render_animation_batch(jobs, quality_flags, fps=None, output_suffix="", on_failures=None):
+    """Render several small animations in one manim process, see manim_render.render_batch().
+
+    Returns one render_animation() outcome per job, in order. Each job keeps
+    its own repair, pre-flight, retry and fallback; only the manim launch is
+    shared.
+    """
+    outcomes = [None] * len(jobs)
+    on_failures = on_failures or [None] * len(jobs)
+    prepared = []  # (index, code, scene name, still seconds, fallback reason, work dir, output name)
+    try:
+        for index, job in enumerate(jobs):
+            work_dir = os.path.join(OUTPUT_DIR, f"animation_{job.animation_id}{output_suffix}")
+            output_name = f"dsa_animation_{job.animation_id}{output_suffix}"
+            try:
+                code, report, fallback_reason = prepare_animation(job.code, job.animation_id)
+                os.makedirs(work_dir, exist_ok=True)
+                scene_name, still = None, None
+                if fallback_reason is None:
+                    scene_name, still = report.scene_name, still_seconds(report)
+                prepared.append((index, code, scene_name, still, fallback_reason, work_dir, output_name))
+            except Exception as e:
+                print(f"Exception while preparing animation {job.animation_id}: {e}")
         
-        for root, _, files in os.walk(animation_output_dir):
-            for file in files:
-                if file.endswith('.mp4'):
-                    expected_output = os.path.join(root, file)
-                    break
-            if expected_output:
-                break
+        # Still scenes skip the batch; one frame each is cheaper than any shared launch saves
+        batched = [entry for entry in prepared if entry[3] is None and entry[4] is None]
+        scenes = [(code, scene_name, work_dir, output_name)
+                  for _, code, scene_name, _, _, work_dir, output_name in batched]
+        results = iter(())
+        if scenes:
+            # One budget for the whole batch, sized by its total predicted time
+            estimate = sum(cost_model.estimate(code, quality_flags) for code, _, _, _ in scenes)
+            ids = ", ".join(jobs[entry[0]].animation_id for entry in batched)
+            print(f"Rendering {len(scenes)} animations in one manim process: {ids}")
+            results = iter(render_batch(scenes, quality_flags, cache=render_cache, fps=fps,
+                                        limits=RenderLimits.for_estimate(estimate),
+                                        tex_cache_dir=TEX_CACHE_DIR or None))
         
-        if expected_output:
-            # Move the final MP4 to the top level of the animation directory with a clean name
-            clean_output = os.path.join(animation_output_dir, f"dsa_animation_{animation_id}.mp4")
-            os.rename(expected_output, clean_output)
-            
-            # Upload to Supabase
-            code_hash = get_code_hash(code)
-            url = upload_to_supabase(clean_output, animation_id)
-            
-            if url:
-                # Store metadata in Supabase table
-                db_id = store_animation_metadata(animation_id, prompt, code, url, code_hash)
-                
-                if not db_id:
-                    print(f"Failed to store metadata for animation {animation_id}")
-            
-            # Clean up extra directories
-            for item in os.listdir(animation_output_dir):
-                item_path = os.path.join(animation_output_dir, item)
-                if os.path.isdir(item_path):
-                    shutil.rmtree(item_path)
-            
-            # Delete the local file after successful upload
-            if os.path.exists(clean_output) and url:
-                os.remove(clean_output)
-                print(f"Deleted local file: {clean_output}")
-                
-            print(f"Successfully rendered animation {animation_id}")
-            if url:
-                print(f"Uploaded to Supabase with URL: {url}")
-            return True
-        else:
-            print(f"Animation rendered but could not find output MP4 file")
-            return False
-            
+        for index, code, scene_name, still, fallback_reason, work_dir, output_name in prepared:
+            job = jobs[index]
+            try:
+                result = None
+                if still is not None:
+                    result = render_scene(code, scene_name, work_dir, output_name, quality_flags, cache=render_cache,
+                                          fps=fps, tex_cache_dir=TEX_CACHE_DIR or None, still_seconds=still)
+                elif fallback_reason is None:
+                    result = next(results)
+                outcomes[index] = finish_animation(result, code, job.prompt, job.animation_id, quality_flags, fps,
+                                                   work_dir, output_name, fallback_reason, on_failures[index],
+                                                   observe=still is None)
+            except Exception as e:
+                print(f"Exception while rendering animation {job.animation_id}: {e}")
     except Exception as e:
-        print(f"Exception while rendering animation {animation_id}: {e}")
+        print(f"Exception while rendering a batch of {len(jobs)} animations: {e}")
+    finally:
+        for job in jobs:
+            remove_work_dir(os.path.join(OUTPUT_DIR, f"animation_{job.animation_id}{output_suffix}"))
+    return outcomes
+
+def estimate_render_seconds(code, quality_flags=MANIM_FLAGS):
+    """Predicted render time of code, costed as it will run after repair."""
+    return cost_model.estimate(repair(code).code, quality_flags)
+
+def record_result(job, success, error="Manim rendering failed", url=None):
+    """Record a finished job in the job ledger and tell whoever submitted it."""
+    if success:
+        ledger.mark_done(job.code_hash)
+    else:
+        ledger.mark_failed(job.code_hash, error)
+    if job.lane == LANE_BATCH:
+        with log_lock:
+            in_flight.discard(job.code_hash)
+            scan_stats['rendered' if success else 'failed'] += 1
+    if not success:
+        metrics.incr("failures_total", stage="job", error_class=error.split(":")[0])
+    if job.callback:
+        job.callback(success, url if success else error)
+
+def schedule_retry(job, failure, code, quality_flags):
+    """Re-queue job with a repair aimed at failure, after an exponential backoff.
+
+    Returns False, leaving the job to the fallback, when no targeted repair
+    applies or the ledger shows its retry budget is spent.
+    """
+    ledger.record_failure(job.code_hash, failure.kind, f"{failure.error_class}: {failure.detail}")
+    retries = ledger.retries(job.code_hash)
+    if retries >= RETRY_BUDGET:
+        print(f"Animation {job.animation_id} has used its {RETRY_BUDGET} retries")
         return False
+    plan = plan_retry(failure, code, quality_flags)
+    if plan is None:
+        return False
+    
+    delay = RETRY_BACKOFF * 2 ** retries
+    ledger.mark_retrying(job.code_hash, time.time() + delay)
+    metrics.incr("retries_total", failure_class=failure.kind)
+    fixes = ", ".join(plan.fired) or f"quality {plan.quality_flags}"
+    print(f"Retrying animation {job.animation_id} in {delay:.0f}s after a {failure.kind} failure ({fixes})")
+    retry_flags = plan.quality_flags or quality_flags
+    retry_job = dataclasses.replace(job, code=plan.code, quality_flags=plan.quality_flags or job.quality_flags,
+                                    estimate=estimate_render_seconds(plan.code, retry_flags))
+    render_jobs.put_later(retry_job, delay, PRIORITY_PREVIEW if job.tier == "preview" else PRIORITY_FINAL)
+    return True
+
+def upload_animation(job, code, video_path, final=True):
+    """Hand a rendered video to the upload stage; metadata is stored once it lands.
+
+    A preview upload publishes its URL and then queues the full-quality
+    render, whose upload later replaces the URL on the same row.
+    """
+    suffix = "" if final else "_preview"
+    
+    def uploaded(url):
+        # Keyed on the source's hash, not the repaired or fallback code's, so the preview and final share a row
+        store_animation_metadata(job.animation_id, job.prompt, code, url, job.code_hash)
+        
+        # Delete the local file after successful upload
+        os.remove(video_path)
+        print(f"Uploaded animation {job.animation_id}{suffix} to Supabase with URL: {url}")
+        if final:
+            record_result(job, True, url=url)
+        else:
+            ledger.set_state(job.code_hash, PREVIEWED)
+            final_job = dataclasses.replace(job, tier="final", quality_flags=None,
+                                            estimate=estimate_render_seconds(job.code))
+            render_jobs.put(final_job, PRIORITY_FINAL, bounded=False)
+    
+    def upload_failed(error):
+        print(f"Error uploading animation {job.animation_id}{suffix}: {error}")
+        record_result(job, False, f"Upload failed: {error}")
+    
+    ledger.set_state(job.code_hash, UPLOADING)
+    upload_stage.submit(video_path, f"dsa_animation_{job.animation_id}{suffix}.mp4", uploaded, upload_failed)
+
+def complete_job(jobs, job, rendered):
+    """Upload a rendered job or record its failure, then mark it done in the queue."""
+    if rendered == RETRY_SCHEDULED:
+        pass  # The retry job carries it from here
+    elif rendered:
+        video_path, final_code, used_fallback = rendered
+        # A fallback clip gains nothing from a second, higher-quality pass
+        upload_animation(job, final_code, video_path, final=job.tier == "final" or used_fallback)
+    else:
+        record_result(job, False)
+    jobs.task_done(job)
+
+def batchable(first, job):
+    """Whether job can share a batch render process with first: small dataset jobs at the same quality."""
+    return all(j.lane == LANE_BATCH and j.on_progress is None and j.estimate <= BATCH_MAX_SECONDS
+               for j in (first, job)) and job.tier == first.tier and job.quality_flags == first.quality_flags
+
+def render_batch_jobs(jobs, batch):
+    """Render a batch of compatible jobs in one manim process and complete each of them."""
+    outcomes = [None] * len(batch)
+    first = batch[0]
+    preview = first.tier == "preview"
+    try:
+        for job in batch:
+            ledger.mark_rendering(job.code_hash)
+        with metrics.span("render_batch", first.animation_id, tier=first.tier, size=len(batch)):
+            outcomes = render_animation_batch(batch, first.quality_flags or (PREVIEW_FLAGS if preview else MANIM_FLAGS),
+                                              PREVIEW_FPS if preview else None, "_preview" if preview else "",
+                                              [functools.partial(schedule_retry, job) for job in batch])
     finally:
-        # Clean up the animation directory regardless of success or failure
-        if animation_output_dir and os.path.exists(animation_output_dir):
-            try:
-                shutil.rmtree(animation_output_dir)
-                print(f"Cleaned up directory: {animation_output_dir}")
-            except Exception as cleanup_error:
-                print(f"Error cleaning up directory: {cleanup_error}")
+        for job, rendered in zip(batch, outcomes):
+            complete_job(jobs, job, rendered)
+
+def render_worker(jobs, lanes=LANES):
+    """Take queued animations from the given lanes of the job queue and render them, forever.
+
+    With RENDER_BATCH_SIZE above 1, small dataset jobs that are next in line
+    are taken together and rendered in one manim process.
+    """
+    while True:
+        if BATCH_RENDERS:
+            batch = jobs.get_batch(lanes, RENDER_BATCH_SIZE, batchable)
+        else:
+            batch = [jobs.get(lanes)]
+        for job in batch:
+            metrics.observe("queue_wait_seconds", job.started_at - job.enqueued_at, lane=job.lane)
+        if len(batch) > 1:
+            render_batch_jobs(jobs, batch)
+            continue
+        
+        job = batch[0]
+        rendered = None
+        try:
+            ledger.mark_rendering(job.code_hash)
+            on_failure = functools.partial(schedule_retry, job)
+            with metrics.span("render_animation", job.animation_id, tier=job.tier, lane=job.lane):
+                if job.tier == "preview":
+                    rendered = render_animation(job.code, job.prompt, job.animation_id,
+                                                job.quality_flags or PREVIEW_FLAGS, PREVIEW_FPS, "_preview",
+                                                on_progress=job.on_progress, on_failure=on_failure)
+                else:
+                    rendered = render_animation(job.code, job.prompt, job.animation_id,
+                                                job.quality_flags or MANIM_FLAGS, on_progress=job.on_progress,
+                                                on_failure=on_failure)
+        finally:
+            complete_job(jobs, job, rendered)
+
+def wait_for_idle(jobs):
+    """Wait until every queued dataset animation has finished rendering and uploading, follow-ups included.
+
+    Interactive jobs are not waited for; they keep flowing between scans.
+    """
+    while True:
+        jobs.join((LANE_BATCH,))
+        upload_stage.join()
+        with log_lock:
+            if not in_flight:
+                return
+        time.sleep(0.1)  # A job is between queue and upload (e.g. its callback is running); don't spin
+
+def start_workers(jobs, count=RENDER_WORKERS, reserved=INTERACTIVE_WORKERS):
+    """Start the render worker threads; each one keeps a single manim process in flight.
+
+    The first `reserved` workers only serve the interactive lane.
+    """
+    workers = []
+    for i in range(count):
+        lanes = (LANE_INTERACTIVE,) if i < reserved else LANES
+        worker = threading.Thread(target=render_worker, args=(jobs, lanes), name=f"render-worker-{i}", daemon=True)
+        worker.start()
+        workers.append(worker)
+    return workers
+
+def submit_interactive(code, prompt, group, callback, on_progress=None):
+    """Queue a chat render ahead of the backfill. Returns its animation id."""
+    code_hash = get_code_hash(code)
+    animation_id = str(uuid.uuid4())
+    ledger.add(code_hash, animation_id, prompt)
+    job = RenderJob(code_hash, animation_id, code, prompt, estimate=estimate_render_seconds(code),
+                    lane=LANE_INTERACTIVE, group=group, callback=callback, on_progress=on_progress)
+    render_jobs.put(job, PRIORITY_FINAL, bounded=False)
+    return animation_id
 
 def main():
     """Main loop to periodically check for and render new animations."""
-    print(f"Starting Manim renderer. Will check for new animations every {RENDER_INTERVAL} seconds.")
+    init()
+    print(f"Starting Manim renderer. Will check for new animations on change or every {RENDER_INTERVAL} seconds.")
     print(f"Local animations will be saved to {OUTPUT_DIR}")
     print(f"Animations will be uploaded to Supabase storage and metadata stored in {TABLE_NAME}")
     
     # Verify Supabase connection and table
     ensure_table_exists()
     
+    global warm_pool
+    if RENDER_MODE == "warm":
+        print(f"Starting {RENDER_WORKERS} warm manim workers...")
+        warm_pool = WarmWorkerPool(RENDER_WORKERS)
+        fallback_clips.pool = warm_pool
+    
+    print(f"Rendering with {RENDER_WORKERS} workers (queue size {RENDER_QUEUE_SIZE})")
+    if PREVIEW_MODE:
+        print(f"Publishing {PREVIEW_FLAGS} previews at {PREVIEW_FPS} fps before each {MANIM_FLAGS} render")
+    start_workers(render_jobs)
+    metrics.start_exporters()
+    if RENDER_INTAKE_PORT:
+        print(f"Accepting interactive renders on {RENDER_INTAKE_HOST}:{RENDER_INTAKE_PORT} "
+              f"({INTERACTIVE_WORKERS} workers reserved)")
+        start_intake(submit_interactive, RENDER_INTAKE_PORT, lambda: {
+            'interactive_queued': render_jobs.qsize((LANE_INTERACTIVE,)),
+            'batch_queued': render_jobs.qsize((LANE_BATCH,)),
+        })
+    
+    if SOURCE_JSONL:
+        print(f"Incrementally ingesting new records from {SOURCE_JSONL}")
+        source = JsonlSource(SOURCE_JSONL, ledger)
+    else:
+        source = JsonArraySource(SOURCE_JSON)
+    # Batch jobs share their lane fairly by source file
+    source_group = SOURCE_JSONL or SOURCE_JSON
+    
     while True:
         try:
-            # Try to read the current JSON file
-            current_data = []
+            # Only records added since the last scan are parsed and hashed
             try:
-                with open(SOURCE_JSON, 'r') as f:
-                    current_data = json.load(f)
+                new_items = source.read_new()
             except json.JSONDecodeError:
-                print("JSON file is currently being written and is incomplete. Will retry later.")
-                time.sleep(RENDER_INTERVAL)
+                print("JSON file is currently being written and is incomplete. Will retry when it changes.")
+                source.wait_for_change(RENDER_INTERVAL)
                 continue
                 
-            # Process new animations
-            new_animations = 0
-            failed_new_animations = 0
+            # Queue new animations; put() blocks while the queue is full
             
-            for idx, item in enumerate(current_data):
-                if 'code' not in item or 'prompt' not in item:
-                    continue
-                    
-                code_hash = get_code_hash(item['code'])
-                
-                # Skip if we've already processed or failed with this animation
-                if code_hash in processed_animations or code_hash in failed_animations:
+            for animation_id, item, code_hash in new_items:
+                # Skip if we've already processed, failed or queued this animation
+                if ledger.status(code_hash) not in (None, PENDING):
                     continue
                 
-                # This is a new animation - attempt to render it
-                animation_id = f"{idx:04d}"
-                success = render_animation(item['code'], item['prompt'], animation_id)
-                
-                if success:
-                    # Record that we've processed this animation
-                    processed_animations[code_hash] = {
-                        'animation_id': animation_id,
-                        'prompt': item['prompt'],
-                        'timestamp': time.time()
-                    }
-                    new_animations += 1
-                    
-                    # Save the updated processed log
-                    with open(PROCESSED_LOG, 'w') as f:
-                        json.dump(processed_animations, f, indent=2)
+                # This is a new animation - hand it to a render worker, shortest estimated render first.
+                # The job is built before the hash is claimed, so a scene that breaks the estimate claims nothing
+                if PREVIEW_MODE:
+                    job = RenderJob(code_hash, animation_id, item['code'], item['prompt'], tier="preview",
+                                    estimate=estimate_render_seconds(item['code'], PREVIEW_FLAGS), group=source_group)
+                    priority = PRIORITY_PREVIEW
                 else:
-                    # Record this as a failed animation
-                    failed_animations[code_hash] = {
-                        'animation_id': animation_id,
-                        'prompt': item['prompt'],
-                        'timestamp': time.time(),
-                        'error': "Manim rendering failed"
-                    }
-                    failed_new_animations += 1
-                    
-                    # Save the updated failed log
-                    with open(FAILED_ANIMATIONS_LOG, 'w') as f:
-                        json.dump(failed_animations, f, indent=2)
+                    job = RenderJob(code_hash, animation_id, item['code'], item['prompt'],
+                                    estimate=estimate_render_seconds(item['code']), group=source_group)
+                    priority = PRIORITY_FINAL
+                with log_lock:
+                    if code_hash in in_flight:
+                        continue
+                    in_flight.add(code_hash)
+                try:
+                    ledger.add(code_hash, animation_id, item['prompt'])
+                    render_jobs.put(job, priority)
+                except BaseException:
+                    # Otherwise wait_for_idle() waits forever on a job that was never queued
+                    with log_lock:
+                        in_flight.discard(code_hash)
+                    raise
+            
+            # Wait for this scan's renders and uploads to finish before reporting
+            wait_for_idle(render_jobs)
+            metadata_writer.flush()
+            source.commit()
+            cost_model.calibrate()
+            
+            with log_lock:
+                new_animations, failed_new_animations = scan_stats['rendered'], scan_stats['failed']
+                scan_stats['rendered'] = scan_stats['failed'] = 0
+            total_processed = ledger.counts()['done']
             
             if new_animations > 0 or failed_new_animations > 0:
-                print(f"Rendered {new_animations} new animations. Failed {failed_new_animations}. Total processed: {len(processed_animations)}")
-            else:
-                print(f"No new animations to render. Total processed: {len(processed_animations)}")
+                print(f"Rendered {new_animations} new animations. Failed {failed_new_animations}. Total processed: {total_processed}")
+            elif new_items:
+                print(f"No new animations to render. Total processed: {total_processed}")
                 
-            # Wait before checking again
-            time.sleep(RENDER_INTERVAL)
+            # Wake as soon as the source changes, or after RENDER_INTERVAL at the latest
+            source.wait_for_change(RENDER_INTERVAL)
             
         except KeyboardInterrupt:
             print("Rendering stopped by user.")
+            metadata_writer.close()
             break
         except Exception as e:
             print(f"Error in main rendering loop: {e}")
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""Content-addressed cache of rendered videos with size-bounded LRU eviction.
+
+Keys are a fingerprint of the normalized scene AST plus the render flags, so
+submissions that differ only in whitespace, comments, docstrings or class
+names map to the same video. Entries are plain files in one directory; the
+file mtime doubles as the LRU clock and is bumped on every hit.
+
+Usage:
+    python render_cache.py stats
+    python render_cache.py evict
+"""
+import ast
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+RENDER_CACHE_DIR = os.environ.get("RENDER_CACHE_DIR", "render_cache")
+RENDER_CACHE_MAX_MB = int(os.environ.get("RENDER_CACHE_MAX_MB", "5120"))
+
+
+class _Normalizer(ast.NodeTransformer):
+    """Strip docstrings and give classes positional names."""
+
+    def __init__(self, class_names):
+        self.class_names = class_names
+
+    def _strip_docstring(self, node):
+        body = node.body
+        if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant) \
+                and isinstance(body[0].value.value, str):
+            node.body = body[1:] or [ast.Pass()]
+        return node
+
+    def visit_Module(self, node):
+        self.generic_visit(node)
+        return self._strip_docstring(node)
+
+    def visit_ClassDef(self, node):
+        self.generic_visit(node)
+        node.name = self.class_names.get(node.name, node.name)
+        return self._strip_docstring(node)
+
+    def visit_FunctionDef(self, node):
+        self.generic_visit(node)
+        return self._strip_docstring(node)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Name(self, node):
+        node.id = self.class_names.get(node.id, node.id)
+        return node
+
+
+def fingerprint(code, scene_name, quality_flags="-qm", fmt="mp4", extra=()):
+    """Return a cache key for rendering scene_name from code with these flags."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        source = "raw:" + code
+        target = scene_name
+    else:
+        class_names = {}
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ClassDef) and node.name not in class_names:
+                class_names[node.name] = f"_C{len(class_names)}"
+        tree = _Normalizer(class_names).visit(tree)
+        source = ast.dump(tree, annotate_fields=False, include_attributes=False)
+        target = class_names.get(scene_name, scene_name)
+
+    digest = hashlib.sha256()
+    for part in (source, target, quality_flags, fmt, *extra):
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class RenderCache:
+    """Directory of <key>.<ext> files bounded to max_bytes by least-recent use."""
+
+    def __init__(self, directory=RENDER_CACHE_DIR, max_bytes=RENDER_CACHE_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key, fmt):
+        return os.path.join(self.directory, f"{key}.{fmt}")
+
+    def get(self, key, fmt="mp4"):
+        """Return the cached file path for key, or None. Marks the entry as recently used."""
+        path = self._path(key, fmt)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def fetch(self, key, dest, fmt="mp4"):
+        """Copy the cached entry to dest. Returns True on a hit."""
+        path = self.get(key, fmt)
+        if path is None:
+            return False
+        os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+        try:
+            shutil.copyfile(path, dest)
+        except FileNotFoundError:
+            # Evicted by another process between get() and the copy
+            return False
+        return True
+
+    def put(self, key, src, fmt="mp4"):
+        """Store a copy of src under key, then evict down to the size bound."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            shutil.copyfile(src, tmp_path)
+            os.replace(tmp_path, self._path(key, fmt))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self.evict()
+
+    def entries(self):
+        """Return (mtime, size, path) for every cached file, oldest first."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".tmp"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+        return entries
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        with self._lock:
+            entries = self.entries()
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.unlink(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+                total -= size
+            return removed
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    cache = RenderCache()
+    if command == "stats":
+        entries = cache.entries()
+        total = sum(size for _, size, _ in entries)
+        print(f"{len(entries)} entries, {total / 1024 / 1024:.1f} MB of {RENDER_CACHE_MAX_MB} MB in {cache.directory}")
+    elif command == "evict":
+        print(f"Evicted {cache.evict()} entries")
+    else:
+        print("Usage: python render_cache.py [stats | evict]")
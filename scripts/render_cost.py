@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""Static render-cost estimates for Manim scenes.
+
+The estimate is read from the scene AST without running it:
+- animated seconds are summed from self.play() run_time= values (default
+  1s) and self.wait() durations (default 1s), multiplied through loops;
+- Tex/MathTex-style objects are counted, since each one is a LaTeX compile;
+- 3D scenes are flagged, because they are much slower per frame.
+
+A CostModel turns these features into predicted wall-clock seconds for a
+quality flag. Its coefficients are refitted from the actual render times
+recorded in the job ledger.
+
+Usage:
+    python render_cost.py estimate scene.py
+    python render_cost.py stats
+"""
+import ast
+import json
+import os
+import sys
+import threading
+from dataclasses import asdict, dataclass
+
+DEFAULT_PLAY_SECONDS = 1.0
+DEFAULT_WAIT_SECONDS = 1.0
+# Iterations assumed for loops whose trip count is not a literal
+UNKNOWN_LOOP_ITERATIONS = 4
+TIMELINE_MAX_ANIMATIONS = 10000
+
+TEX_CLASSES = {"Tex", "MathTex", "Title", "BulletedList", "Matrix", "MathTable", "SingleStringMathTex"}
+THREE_D_BASES = {"ThreeDScene", "SpecialThreeDScene"}
+
+# Wall-clock seconds per feature at -qm, used until enough renders are recorded
+DEFAULT_COEFFICIENTS = (1.5, 6.0, 0.8, 3.0)  # 2D second, 3D second, tex object, startup
+QUALITY_SCALE = {"-ql": 0.3, "-qm": 1.0, "-qh": 2.5, "-qp": 4.0, "-qk": 8.0}
+CALIBRATION_MIN_SAMPLES = int(os.environ.get("COST_CALIBRATION_MIN_SAMPLES", "10"))
+CALIBRATION_WINDOW = int(os.environ.get("COST_CALIBRATION_WINDOW", "500"))
+# Pull towards the default coefficients so a few noisy samples cannot swing the fit
+CALIBRATION_RIDGE = 5.0
+
+
+@dataclass
+class CostFeatures:
+    """What the static pass found in one scene file."""
+    animation_seconds: float = 0.0
+    tex_count: int = 0
+    play_count: int = 0
+    is_3d: bool = False
+    parsed: bool = True
+
+    def vector(self):
+        two_d = 0.0 if self.is_3d else self.animation_seconds
+        three_d = self.animation_seconds if self.is_3d else 0.0
+        return [two_d, three_d, float(self.tex_count), 1.0]
+
+
+def _constant_number(node):
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        return float(node.value)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        value = _constant_number(node.operand)
+        return -value if value is not None else None
+    return None
+
+
+def _loop_iterations(node):
+    """Trip count of a for loop when it is a literal range() or sequence."""
+    target = node.iter
+    if isinstance(target, (ast.List, ast.Tuple, ast.Set)):
+        return len(target.elts)
+    if isinstance(target, ast.Call) and isinstance(target.func, ast.Name) and target.func.id == "range":
+        bounds = [_constant_number(arg) for arg in target.args]
+        if bounds and None not in bounds:
+            try:
+                return max(0, len(range(*(int(b) for b in bounds))))
+            except (ValueError, OverflowError, TypeError):
+                pass  # Zero step, huge or non-finite bounds, or the wrong number of arguments
+    return UNKNOWN_LOOP_ITERATIONS
+
+
+class _CostVisitor(ast.NodeVisitor):
+
+    def __init__(self):
+        self.features = CostFeatures()
+        self.multiplier = 1.0
+
+    def _visit_loop(self, node, iterations):
+        saved = self.multiplier
+        self.multiplier *= iterations
+        for child in node.body:
+            self.visit(child)
+        self.multiplier = saved
+        for child in node.orelse:
+            self.visit(child)
+
+    def visit_For(self, node):
+        self.visit(node.iter)
+        self._visit_loop(node, _loop_iterations(node))
+
+    def visit_While(self, node):
+        self.visit(node.test)
+        self._visit_loop(node, UNKNOWN_LOOP_ITERATIONS)
+
+    def visit_ClassDef(self, node):
+        if any(isinstance(base, ast.Name) and base.id in THREE_D_BASES for base in node.bases):
+            self.features.is_3d = True
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        func = node.func
+        if isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name) and func.value.id == "self":
+            if func.attr == "play":
+                run_time = next((_constant_number(kw.value) for kw in node.keywords if kw.arg == "run_time"), None)
+                self.features.animation_seconds += (run_time or DEFAULT_PLAY_SECONDS) * self.multiplier
+                self.features.play_count += 1
+            elif func.attr == "wait":
+                duration = _constant_number(node.args[0]) if node.args else next(
+                    (_constant_number(kw.value) for kw in node.keywords if kw.arg == "duration"), None)
+                self.features.animation_seconds += (duration or DEFAULT_WAIT_SECONDS) * self.multiplier
+        elif isinstance(func, ast.Name) and func.id in TEX_CLASSES:
+            self.features.tex_count += 1
+        self.generic_visit(node)
+
+
+class _TimelineVisitor(ast.NodeVisitor):
+    """Estimated seconds of each self.play()/self.wait(), in the order manim numbers them.
+
+    Walks construct() and follows calls to self.<method>() of the same class
+    and to module-level functions into their bodies, as they run.
+    """
+
+    def __init__(self, methods, functions):
+        self.timeline = []
+        self.methods = methods
+        self.functions = functions
+        self.calling = []  # Definitions being followed, so recursion stops
+
+    def _visit_loop(self, node, iterations):
+        outer = self.timeline
+        self.timeline = []
+        for child in node.body:
+            self.visit(child)
+        body = self.timeline
+        self.timeline = outer
+        # Unrolled, but bounded for huge literal ranges
+        repeats = min(iterations, TIMELINE_MAX_ANIMATIONS // max(1, len(body)))
+        self.timeline.extend(body * int(repeats))
+        for child in node.orelse:
+            self.visit(child)
+
+    def visit_For(self, node):
+        self.visit(node.iter)
+        self._visit_loop(node, _loop_iterations(node))
+
+    def visit_While(self, node):
+        self.visit(node.test)
+        self._visit_loop(node, UNKNOWN_LOOP_ITERATIONS)
+
+    def visit_FunctionDef(self, node):
+        pass  # Nested definitions run when called, not where they are written
+
+    visit_AsyncFunctionDef = visit_Lambda = visit_ClassDef = visit_FunctionDef
+
+    def follow(self, definition):
+        if definition in self.calling or len(self.timeline) >= TIMELINE_MAX_ANIMATIONS:
+            return
+        self.calling.append(definition)
+        for child in definition.body:
+            self.visit(child)
+        self.calling.pop()
+
+    def visit_Call(self, node):
+        # Arguments run first, so animations built by nested calls come before this one
+        self.generic_visit(node)
+        func = node.func
+        if isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name) and func.value.id == "self":
+            if func.attr == "play":
+                run_time = next((_constant_number(kw.value) for kw in node.keywords if kw.arg == "run_time"), None)
+                self.timeline.append(run_time or DEFAULT_PLAY_SECONDS)
+            elif func.attr == "wait":
+                duration = _constant_number(node.args[0]) if node.args else next(
+                    (_constant_number(kw.value) for kw in node.keywords if kw.arg == "duration"), None)
+                self.timeline.append(duration or DEFAULT_WAIT_SECONDS)
+            elif func.attr in self.methods:
+                self.follow(self.methods[func.attr])
+        elif isinstance(func, ast.Name) and func.id in self.functions:
+            self.follow(self.functions[func.id])
+
+
+def _scene_class(tree, scene_name=None):
+    """The class named scene_name, else the first one defining construct()."""
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        if scene_name is not None:
+            if node.name == scene_name:
+                return node
+        elif any(isinstance(item, ast.FunctionDef) and item.name == "construct" for item in node.body):
+            return node
+    return None
+
+
+def animation_timeline(code, scene_name=None):
+    """Estimated seconds of each animation of code in play order, as numbered by manim's -n option.
+
+    The walk starts at construct() of scene_name (default: the first class
+    with a construct()) and follows self.<method>() calls to methods of that
+    class and calls to module-level functions. Anything else, such as
+    inherited methods, methods of other objects or functions passed around
+    as values, is not followed, so animations it plays are missing. Loops
+    are unrolled with the same trip counts estimate_features() assumes, so
+    the count is only as exact as those. Empty for unparseable code or
+    without a scene.
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return []
+    scene = _scene_class(tree, scene_name)
+    if scene is None:
+        return []
+    methods = {item.name: item for item in scene.body if isinstance(item, ast.FunctionDef)}
+    functions = {node.name: node for node in tree.body if isinstance(node, ast.FunctionDef)}
+    if "construct" not in methods:
+        return []
+    visitor = _TimelineVisitor(methods, functions)
+    visitor.follow(methods["construct"])
+    return visitor.timeline[:TIMELINE_MAX_ANIMATIONS]
+
+
+def estimate_features(code):
+    """Return the CostFeatures of code; unparseable code gets parsed=False."""
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return CostFeatures(parsed=False)
+    visitor = _CostVisitor()
+    visitor.visit(tree)
+    return visitor.features
+
+
+def _solve(matrix, rhs):
+    """Solve a small dense linear system by Gaussian elimination with pivoting."""
+    n = len(rhs)
+    rows = [list(matrix[i]) + [rhs[i]] for i in range(n)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(rows[r][col]))
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        if abs(rows[col][col]) < 1e-12:
+            return None
+        for r in range(n):
+            if r != col:
+                factor = rows[r][col] / rows[col][col]
+                rows[r] = [a - factor * b for a, b in zip(rows[r], rows[col])]
+    return [rows[i][n] / rows[i][i] for i in range(n)]
+
+
+def fit_coefficients(samples, prior):
+    """Ridge least-squares fit of render seconds on feature vectors, shrunk towards prior."""
+    n = len(prior)
+    matrix = [[CALIBRATION_RIDGE if i == j else 0.0 for j in range(n)] for i in range(n)]
+    rhs = [CALIBRATION_RIDGE * p for p in prior]
+    for vector, seconds in samples:
+        for i in range(n):
+            rhs[i] += vector[i] * seconds
+            for j in range(n):
+                matrix[i][j] += vector[i] * vector[j]
+    solution = _solve(matrix, rhs)
+    if solution is None:
+        return tuple(prior)
+    return tuple(max(0.0, c) for c in solution)
+
+
+class CostModel:
+    """Predicts render seconds per quality flag and learns from recorded renders."""
+
+    def __init__(self, ledger=None):
+        self.ledger = ledger
+        self._coefficients = {}
+        self._lock = threading.Lock()
+
+    def coefficients(self, quality_flags):
+        with self._lock:
+            if quality_flags not in self._coefficients:
+                scale = QUALITY_SCALE.get(quality_flags, 1.0)
+                self._coefficients[quality_flags] = tuple(c * scale for c in DEFAULT_COEFFICIENTS)
+            return self._coefficients[quality_flags]
+
+    def predict(self, features, quality_flags="-qm"):
+        coefficients = self.coefficients(quality_flags)
+        return sum(c * x for c, x in zip(coefficients, features.vector()))
+
+    def estimate(self, code, quality_flags="-qm"):
+        """Predicted render seconds for code."""
+        return self.predict(estimate_features(code), quality_flags)
+
+    def observe(self, animation_id, features, quality_flags, seconds):
+        """Record an actual render time for later calibration."""
+        if self.ledger is not None and features.parsed:
+            self.ledger.record_render_time(animation_id, quality_flags, features.vector(),
+                                           self.predict(features, quality_flags), seconds)
+
+    def calibrate(self):
+        """Refit every quality's coefficients from recent recorded renders."""
+        if self.ledger is None:
+            return
+        for quality_flags in self.ledger.timed_qualities():
+            samples = self.ledger.render_timings(quality_flags, CALIBRATION_WINDOW)
+            if len(samples) < CALIBRATION_MIN_SAMPLES:
+                continue
+            scale = QUALITY_SCALE.get(quality_flags, 1.0)
+            fitted = fit_coefficients(samples, [c * scale for c in DEFAULT_COEFFICIENTS])
+            with self._lock:
+                self._coefficients[quality_flags] = fitted
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "estimate" and len(sys.argv) == 3:
+        with open(sys.argv[2], 'r') as f:
+            features = estimate_features(f.read())
+        print(json.dumps(asdict(features), indent=2))
+        model = CostModel()
+        for flags in QUALITY_SCALE:
+            print(f"{flags}: ~{model.predict(features, flags):.1f}s")
+    elif command == "stats":
+        from job_ledger import JobLedger
+
+        ledger = JobLedger()
+        model = CostModel(ledger)
+        model.calibrate()
+        for flags in ledger.timed_qualities():
+            samples = ledger.render_timings(flags, CALIBRATION_WINDOW)
+            coefficients = model.coefficients(flags)
+            error = sum(abs(sum(c * x for c, x in zip(coefficients, v)) - s) for v, s in samples) / len(samples)
+            print(f"{flags}: {len(samples)} renders, coefficients "
+                  f"{', '.join(f'{c:.2f}' for c in coefficients)}, mean abs error {error:.1f}s")
+    else:
+        print("Usage: python render_cost.py [estimate your_manim_script.py | stats]")
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""HTTP intake for interactive render requests from the chat app.
+
+Runs inside render_animations.py when RENDER_INTAKE_PORT is set. Requests
+are queued in the interactive lane of the shared render queue, which is
+served ahead of the dataset backfill.
+
+Endpoints:
+    POST /render        {"code", "prompt"?, "group"?, "wait"?} -> 202 {"animation_id"}
+                        With "wait": true the reply is held until the render
+                        finishes (or RENDER_INTAKE_WAIT seconds pass) and
+                        carries {"success", "url"} or {"success", "error"}.
+    GET  /render/<id>   {"status": "queued" | "rendering" | "done" | "failed", "progress"?, "url"?, "error"?}
+                        "progress" is the fraction of frames rendered so far.
+    GET  /health        {"interactive_queued", "batch_queued"}
+
+The intake listens on RENDER_INTAKE_HOST, loopback by default. If
+RENDER_INTAKE_TOKEN is set, requests must send it as a bearer token; the chat
+app reads the same variable. Binding any other host requires the token.
+"""
+import ipaddress
+import json
+import os
+import socket
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RENDER_INTAKE_HOST = os.environ.get("RENDER_INTAKE_HOST", "127.0.0.1")
+RENDER_INTAKE_TOKEN = os.environ.get("RENDER_INTAKE_TOKEN")
+RENDER_INTAKE_WAIT = float(os.environ.get("RENDER_INTAKE_WAIT", "55"))  # Under the chat app's 60s route limit
+INTAKE_HISTORY = 1000  # Finished requests kept for status queries
+
+
+class PendingRender:
+    """Outcome of one interactive request, filled in by the job callback."""
+
+    def __init__(self):
+        self.animation_id = None
+        self.done = threading.Event()
+        self.success = None
+        self.url = None
+        self.error = None
+        self.progress = None
+
+    def report_progress(self, fraction):
+        self.progress = fraction
+
+    def finish(self, success, result):
+        self.success = success
+        if success:
+            self.url = result
+        else:
+            self.error = result
+        self.done.set()
+
+    def as_dict(self):
+        if not self.done.is_set():
+            if self.progress is None:
+                return {'animation_id': self.animation_id, 'status': "queued"}
+            return {'animation_id': self.animation_id, 'status': "rendering", 'progress': round(self.progress, 3)}
+        if self.success:
+            return {'animation_id': self.animation_id, 'status': "done", 'success': True, 'url': self.url}
+        return {'animation_id': self.animation_id, 'status': "failed", 'success': False, 'error': self.error}
+
+
+class IntakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self):
+        if not self.server.token:
+            return True
+        return self.headers.get("Authorization") == f"Bearer {self.server.token}"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if not self._authorized():
+            self._reply(401, {'error': "unauthorized"})
+            return
+        if self.path.rstrip("/") != "/render":
+            self._reply(404, {'error': "not found"})
+            return
+        try:
+            request = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            self._reply(400, {'error': "body must be JSON"})
+            return
+        if not request.get('code'):
+            self._reply(400, {'error': "missing code"})
+            return
+
+        pending = self.server.submit(request['code'], request.get('prompt', ""), str(request.get('group', "")))
+        if request.get('wait') and pending.done.wait(self.server.wait_timeout):
+            self._reply(200, pending.as_dict())
+        else:
+            self._reply(202, pending.as_dict())
+
+    def do_GET(self):
+        if not self._authorized():
+            self._reply(401, {'error': "unauthorized"})
+        elif self.path == "/health":
+            self._reply(200, self.server.health())
+        elif self.path.startswith("/render/"):
+            pending = self.server.lookup(self.path[len("/render/"):])
+            if pending is None:
+                self._reply(404, {'error': "unknown animation"})
+            else:
+                self._reply(200, pending.as_dict())
+        else:
+            self._reply(404, {'error': "not found"})
+
+
+class IntakeServer(ThreadingHTTPServer):
+    """Accepts interactive renders and hands them to enqueue(code, prompt, group, callback, on_progress)."""
+    daemon_threads = True
+
+    def __init__(self, address, enqueue, health=dict, token=RENDER_INTAKE_TOKEN, wait_timeout=RENDER_INTAKE_WAIT):
+        super().__init__(address, IntakeHandler)
+        self.enqueue = enqueue
+        self.health = health
+        self.token = token
+        self.wait_timeout = wait_timeout
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, code, prompt, group):
+        pending = PendingRender()
+        pending.animation_id = self.enqueue(code, prompt, group, pending.finish, pending.report_progress)
+        with self._lock:
+            self._pending[pending.animation_id] = pending
+            while len(self._pending) > INTAKE_HISTORY:
+                oldest = next(iter(self._pending))
+                if not self._pending[oldest].done.is_set():
+                    break
+                del self._pending[oldest]
+        return pending
+
+    def lookup(self, animation_id):
+        with self._lock:
+            return self._pending.get(animation_id)
+
+
+def is_loopback(host):
+    """Whether every address host resolves to is a loopback address."""
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, None)}
+    except socket.gaierror:
+        return False
+    return bool(addresses) and all(ipaddress.ip_address(address.split("%")[0]).is_loopback for address in addresses)
+
+
+def start_intake(enqueue, port, health=dict, host=RENDER_INTAKE_HOST, token=RENDER_INTAKE_TOKEN):
+    """Serve the intake on a background thread. Returns the server.
+
+    Raises ValueError for a host other than loopback without a token, since
+    anyone who can reach the port could then queue arbitrary scene code.
+    """
+    if not token and not is_loopback(host):
+        raise ValueError(f"Refusing to serve the render intake on {host} without RENDER_INTAKE_TOKEN")
+    server = IntakeServer((host, port), enqueue, health, token)
+    threading.Thread(target=server.serve_forever, name="render-intake", daemon=True).start()
+    return server
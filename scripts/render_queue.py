@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""Priority queue of render jobs shared by the scan loop and render workers.
+
+Jobs are split into lanes. Every queued interactive job (chat requests) is
+served before any batch job (dataset backfill), and workers can be reserved
+for the interactive lane, so a backfill never stands between a user and
+their render.
+
+Within a lane, lower priority values are served first. Among jobs of the
+same priority, the lane shares workers fairly between job groups (one group
+per dataset source or chat user): the group that has been served least goes
+next. Inside a group, jobs are ordered by a deadline of enqueue time plus
+SJF_STRETCH times the job's estimated render seconds. Short jobs overtake
+long ones queued at about the same time, but a long job is never starved by
+a stream of later short ones.
+
+The size bound only applies to puts made with bounded=True (new work from
+the dataset scan). Follow-up jobs queued by workers or upload callbacks
+never block, so a full queue cannot deadlock the workers that drain it.
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+PRIORITY_PREVIEW = 0
+PRIORITY_FINAL = 10
+
+LANE_INTERACTIVE = "interactive"
+LANE_BATCH = "batch"
+LANES = (LANE_INTERACTIVE, LANE_BATCH)  # Serving order
+
+# Seconds of queueing a job may be overtaken for, per estimated render second
+SJF_STRETCH = float(os.environ.get("SJF_STRETCH", "10"))
+
+
+@dataclass
+class RenderJob:
+    """One animation to render at one quality tier."""
+    code_hash: str
+    animation_id: str
+    code: str
+    prompt: str
+    tier: str = "final"  # "preview" or "final"
+    estimate: float = 0.0  # Predicted render seconds, see render_cost
+    lane: str = LANE_BATCH
+    group: str = ""  # Fair-share key within the lane
+    callback: object = None  # Called as callback(success, url_or_error) when the job finishes
+    on_progress: object = None  # Called as on_progress(fraction) while manim renders
+    quality_flags: str = None  # Overrides the tier's quality, e.g. for a retry after running out of memory
+    enqueued_at: float = None  # time.monotonic() of the last put(), set by the queue
+    started_at: float = None  # time.monotonic() when a worker took it, set by the queue
+
+
+class RenderQueue:
+    """Thread-safe lane-aware priority queue with join()/task_done() like queue.Queue."""
+
+    def __init__(self, maxsize=0, stretch=SJF_STRETCH):
+        self.maxsize = maxsize
+        self.stretch = stretch
+        # lane -> group -> heap of (priority, deadline, counter, job)
+        self._heaps = {lane: {} for lane in LANES}
+        # lane -> group -> jobs handed out, for fair share
+        self._served = {lane: {} for lane in LANES}
+        self._size = 0
+        self._counter = itertools.count()
+        self._unfinished = {lane: 0 for lane in LANES}
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._all_done = threading.Condition(self._lock)
+
+    def put(self, job, priority=PRIORITY_FINAL, bounded=True):
+        """Queue job; with bounded=True, block while the queue is at maxsize."""
+        if job.lane not in LANES:
+            raise ValueError(f"Unknown render lane: {job.lane}")
+        with self._not_full:
+            while bounded and self.maxsize and self._size >= self.maxsize:
+                self._not_full.wait()
+            self._unfinished[job.lane] += 1
+            self._push(job, priority)
+
+    def put_later(self, job, delay, priority=PRIORITY_FINAL):
+        """Queue job after delay seconds without blocking, e.g. a retry with backoff.
+
+        The job counts as unfinished from now on, so join() waits for it.
+        """
+        if job.lane not in LANES:
+            raise ValueError(f"Unknown render lane: {job.lane}")
+        with self._lock:
+            self._unfinished[job.lane] += 1
+        timer = threading.Timer(delay, self._put_delayed, args=(job, priority))
+        timer.daemon = True
+        timer.start()
+
+    def _put_delayed(self, job, priority):
+        with self._lock:
+            self._push(job, priority)
+
+    def _push(self, job, priority):
+        """Add job to its lane's heaps; the caller holds the lock and has counted it as unfinished."""
+        groups = self._heaps[job.lane]
+        served = self._served[job.lane]
+        if job.group not in groups:
+            groups[job.group] = []
+            # A group that was idle joins at the current share instead of
+            # claiming all the turns it missed
+            served[job.group] = min((served[g] for g in groups if g != job.group), default=0)
+        job.enqueued_at = time.monotonic()
+        deadline = job.enqueued_at + self.stretch * job.estimate
+        heapq.heappush(groups[job.group], (priority, deadline, next(self._counter), job))
+        self._size += 1
+        # Workers may be waiting on different lanes, so wake them all
+        self._not_empty.notify_all()
+
+    def _next(self, lanes):
+        """(lane, group) holding the job _pop() would return, or None."""
+        for lane in LANES:
+            if lane not in lanes or not self._heaps[lane]:
+                continue
+            groups = self._heaps[lane]
+            served = self._served[lane]
+            best_priority = min(heap[0][0] for heap in groups.values())
+            group = min((g for g, heap in groups.items() if heap[0][0] == best_priority),
+                        key=lambda g: (served[g], groups[g][0][1]))
+            return lane, group
+        return None
+
+    def _pop(self, lanes):
+        found = self._next(lanes)
+        if found is None:
+            return None
+        lane, group = found
+        groups = self._heaps[lane]
+        served = self._served[lane]
+        job = heapq.heappop(groups[group])[-1]
+        job.started_at = time.monotonic()
+        served[group] += 1
+        if not groups[group]:
+            del groups[group]
+            del served[group]
+        self._size -= 1
+        return job
+
+    def get(self, lanes=LANES):
+        """Remove and return the most urgent job from lanes, blocking until one is available."""
+        with self._not_empty:
+            while True:
+                job = self._pop(lanes)
+                if job is not None:
+                    self._not_full.notify()
+                    return job
+                self._not_empty.wait()
+
+    def get_batch(self, lanes=LANES, size=1, compatible=None):
+        """Like get(), then keep taking jobs while the next one is compatible(first, job), up to size jobs.
+
+        Stops at the first job that isn't compatible, so a batch never
+        reorders the queue; it only hands out in one go what would have been
+        handed out next anyway.
+        """
+        with self._not_empty:
+            while True:
+                first = self._pop(lanes)
+                if first is not None:
+                    break
+                self._not_empty.wait()
+            batch = [first]
+            while len(batch) < size and compatible is not None:
+                found = self._next(lanes)
+                if found is None or not compatible(first, self._heaps[found[0]][found[1]][0][-1]):
+                    break
+                batch.append(self._pop(lanes))
+            self._not_full.notify(len(batch))
+            return batch
+
+    def task_done(self, job):
+        with self._all_done:
+            self._unfinished[job.lane] -= 1
+            self._all_done.notify_all()
+
+    def join(self, lanes=LANES):
+        """Block until every job queued in lanes has been marked done."""
+        with self._all_done:
+            while any(self._unfinished[lane] for lane in lanes):
+                self._all_done.wait()
+
+    def qsize(self, lanes=LANES):
+        with self._lock:
+            return sum(len(heap) for lane in lanes for heap in self._heaps[lane].values())
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""Run a render command under hard time, memory and CPU budgets.
+
+The command runs in its own session, so it and everything it starts (LaTeX,
+ffmpeg) share one process group. The whole group is killed with SIGKILL as
+soon as any budget is breached:
+    wall time   checked by the parent while it collects the output
+    memory      RSS summed over the process group, read from /proc
+    CPU time    RLIMIT_CPU in the child, enforced by the kernel
+
+A breach becomes its own failure class (Timeout, MemoryLimit or CpuLimit),
+not a generic RenderError, so it can be counted and handled differently.
+Output is streamed line by line to a callback that can also end the run
+early, and only a bounded tail of it is kept.
+
+The wall-time budget scales with the render's estimated duration from
+render_cost.py, between RENDER_TIMEOUT_MIN and RENDER_TIMEOUT_MAX seconds.
+The memory cap needs /proc; on systems without it (macOS), only the time
+and CPU budgets apply.
+"""
+import os
+import queue
+import resource
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+RENDER_TIMEOUT_MIN = float(os.environ.get("RENDER_TIMEOUT_MIN", "60"))
+RENDER_TIMEOUT_MAX = float(os.environ.get("RENDER_TIMEOUT_MAX", "1800"))
+RENDER_TIMEOUT_FACTOR = float(os.environ.get("RENDER_TIMEOUT_FACTOR", "4"))  # Budget as a multiple of the estimate
+RENDER_MAX_RSS_MB = int(os.environ.get("RENDER_MAX_RSS_MB", "3072"))  # Per render, across its process group
+RENDER_CPU_FACTOR = float(os.environ.get("RENDER_CPU_FACTOR", "2"))  # CPU seconds allowed per second of wall budget
+SANDBOX_POLL_INTERVAL = 0.5
+SANDBOX_TAIL_LINES = int(os.environ.get("SANDBOX_TAIL_LINES", "200"))  # Output lines kept per stream
+
+LIMIT_ERRORS = ("Timeout", "MemoryLimit", "CpuLimit")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+@dataclass
+class RenderLimits:
+    """Budgets for one render. None disables a budget."""
+    wall_seconds: float = RENDER_TIMEOUT_MAX
+    max_rss_mb: int = RENDER_MAX_RSS_MB
+    cpu_seconds: float = RENDER_TIMEOUT_MAX * RENDER_CPU_FACTOR
+
+    @classmethod
+    def for_estimate(cls, estimate_seconds):
+        """Budgets for a render predicted to take estimate_seconds."""
+        wall = min(max(estimate_seconds * RENDER_TIMEOUT_FACTOR, RENDER_TIMEOUT_MIN), RENDER_TIMEOUT_MAX)
+        return cls(wall_seconds=wall, cpu_seconds=wall * RENDER_CPU_FACTOR)
+
+
+@dataclass
+class SandboxResult:
+    """Outcome of one run_sandboxed() call."""
+    returncode: int
+    stdout: str = ""
+    stderr: str = ""
+    breach: str = None  # One of LIMIT_ERRORS
+    abort: str = None  # Error class returned by on_line
+    error: str = None
+    peak_rss_mb: float = 0.0
+    elapsed: float = 0.0
+
+
+def group_rss_mb(pgid):
+    """Resident memory of every process in a process group, in MB. None without /proc."""
+    if not os.path.isdir("/proc/self"):
+        return None
+    total_pages = 0
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", 'r') as f:
+                stat = f.read()
+            # The command name may contain spaces; the fields after it are fixed
+            fields = stat[stat.rindex(")") + 2:].split()
+            if int(fields[2]) == pgid:
+                total_pages += int(fields[21])
+        except (OSError, ValueError, IndexError):
+            continue  # Exited while we were reading
+    return total_pages * PAGE_SIZE / 1024 / 1024
+
+
+def _cpu_rlimit(cpu_seconds):
+    # The soft limit sends SIGXCPU, the hard limit SIGKILL
+    soft = max(1, int(cpu_seconds))
+    return soft, soft + 5
+
+
+def _kill_group(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _pump(pipe, stream, lines):
+    """Reader thread: forward each line of pipe to the lines queue, then None at EOF."""
+    try:
+        for line in pipe:
+            lines.put((stream, line))
+    except (OSError, ValueError):
+        pass
+    finally:
+        lines.put((stream, None))
+
+
+def run_sandboxed(cmd, cwd=None, limits=None, env=None, on_line=None):
+    """Run cmd (an argument list) under limits and return a SandboxResult.
+
+    stdout and stderr are read line by line as they are written; carriage
+    returns end a line too, so progress bars arrive as updates. Each line is
+    passed to on_line(stream, line), which may return (error_class, error)
+    to kill the process group at once. Only the last SANDBOX_TAIL_LINES of
+    each stream are kept.
+    """
+    limits = limits or RenderLimits()
+    started = time.perf_counter()
+    # prlimit sets the CPU budget from outside, which avoids running Python between fork and exec in a
+    # threaded parent; setrlimit in the child is the fallback where it's missing (macOS)
+    preexec = None
+    if limits.cpu_seconds and not hasattr(resource, "prlimit"):
+        rlimit = _cpu_rlimit(limits.cpu_seconds)
+        preexec = lambda: resource.setrlimit(resource.RLIMIT_CPU, rlimit)
+    # Universal newlines turn tqdm's \r updates into lines
+    proc = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                            errors="replace", start_new_session=True, preexec_fn=preexec)
+    if limits.cpu_seconds and preexec is None:
+        try:
+            resource.prlimit(proc.pid, resource.RLIMIT_CPU, _cpu_rlimit(limits.cpu_seconds))
+        except OSError:
+            pass  # Already exited
+
+    result = SandboxResult(returncode=None)
+    tails = {'stdout': deque(maxlen=SANDBOX_TAIL_LINES), 'stderr': deque(maxlen=SANDBOX_TAIL_LINES)}
+    lines = queue.Queue()
+    readers = [threading.Thread(target=_pump, args=(pipe, stream, lines), name=f"sandbox-{stream}", daemon=True)
+               for pipe, stream in ((proc.stdout, 'stdout'), (proc.stderr, 'stderr'))]
+    for reader in readers:
+        reader.start()
+
+    try:
+        open_streams = len(readers)
+        next_check = started + SANDBOX_POLL_INTERVAL
+        exited_at = None
+        while open_streams:
+            try:
+                stream, line = lines.get(timeout=SANDBOX_POLL_INTERVAL)
+            except queue.Empty:
+                stream = None
+            if stream is not None:
+                if line is None:
+                    open_streams -= 1
+                    continue
+                tails[stream].append(line)
+                verdict = on_line(stream, line) if on_line else None
+                if verdict:
+                    result.abort, result.error = verdict
+                    break
+
+            now = time.perf_counter()
+            if now < next_check:
+                continue
+            next_check = now + SANDBOX_POLL_INTERVAL
+            if proc.poll() is not None:
+                exited_at = exited_at or now
+                if now - exited_at > SANDBOX_POLL_INTERVAL:
+                    break  # manim exited but something it started still holds the output pipes
+            elif limits.wall_seconds and now - started > limits.wall_seconds:
+                result.breach = "Timeout"
+                result.error = f"Render exceeded its {limits.wall_seconds:.0f}s time budget"
+                break
+            elif limits.max_rss_mb:
+                rss = group_rss_mb(proc.pid)
+                if rss is not None:
+                    result.peak_rss_mb = max(result.peak_rss_mb, rss)
+                    if rss > limits.max_rss_mb:
+                        result.breach = "MemoryLimit"
+                        result.error = f"Render used {rss:.0f} MB, over its {limits.max_rss_mb} MB budget"
+                        break
+    finally:
+        if open_streams or proc.poll() is None:
+            _kill_group(proc)
+        proc.wait()
+        for reader in readers:
+            reader.join(timeout=5)
+        # Keep whatever was written before the kill
+        while True:
+            try:
+                stream, line = lines.get_nowait()
+            except queue.Empty:
+                break
+            if line is not None:
+                tails[stream].append(line)
+        proc.stdout.close()
+        proc.stderr.close()
+
+    result.returncode = proc.returncode
+    result.stdout, result.stderr = "".join(tails['stdout']), "".join(tails['stderr'])
+    result.elapsed = time.perf_counter() - started
+    if result.breach is None and result.abort is None and proc.returncode == -signal.SIGXCPU:
+        # The kernel enforced RLIMIT_CPU; it applies to each process in the group separately
+        result.breach = "CpuLimit"
+        result.error = f"Render used more than its {limits.cpu_seconds:.0f}s CPU budget"
+    return result
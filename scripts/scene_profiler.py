@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""Sampling profiler for a single manim render.
+
+Runs the manim CLI in this process while a background thread samples the
+main thread's stack every PROFILE_INTERVAL seconds. Each sample is
+attributed to the scene-file line it was executing and to a category. The
+innermost self.play()/self.wait() call on the stack wins, so each call gets
+its own total even when it is made from a helper method. The categories are:
+    construct   the scene's own Python
+    mobject     mobject construction and transforms
+    animation   animation interpolation
+    updaters    mobject updaters
+    latex       Tex/MathTex compilation
+    rasterize   Cairo drawing and the camera
+    encode      writing frames and combining the video
+    manim       everything else inside manim (setup, config, ...)
+
+The profile is written as JSON, including the samples as collapsed stacks.
+Profiles from many renders merge into one flamegraph input.
+
+Usage:
+    python scene_profiler.py run --out profile.json -- scene.py MyScene -qm
+    python scene_profiler.py collapse profiles/ > renders.folded   # flamegraph.pl / speedscope input
+    python scene_profiler.py top profiles/                         # slowest scene lines across renders
+"""
+import ast
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL", "0.005"))
+PROFILE_TOP_LINES = 10
+
+# Checked in order; the first category with a matching frame below the scene wins
+CATEGORY_MARKERS = (
+    ("encode", ("scene_file_writer", "av.", "subprocess")),
+    ("latex", ("tex_file_writing", "manim.utils.tex")),
+    ("rasterize", ("manim.camera", "cairo", "manim.renderer")),
+    ("updaters", ("update",)),
+    ("animation", ("manim.animation",)),
+    ("mobject", ("manim.mobject",)),
+    ("manim", ("manim",)),
+)
+
+
+def frame_label(code, scene_path, lineno=None):
+    """Stable name for a frame: dotted module plus function, and the line for scene frames."""
+    filename = code.co_filename
+    if filename == scene_path:
+        return f"scene.{code.co_name}:{lineno}"
+    marker = "site-packages" + os.sep
+    if marker in filename:
+        module = filename.split(marker, 1)[1]
+    else:
+        module = os.path.basename(filename)
+    module = module[:-3] if module.endswith(".py") else module
+    return f"{module.replace(os.sep, '.')}.{code.co_name}"
+
+
+def animation_lines(scene_path):
+    """Map every line covered by a self.play()/self.wait() call in the scene file to "play" or "wait"."""
+    try:
+        with open(scene_path, 'r') as f:
+            tree = ast.parse(f.read())
+    except (OSError, SyntaxError):
+        return {}
+    lines = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) \
+                and node.func.attr in ("play", "wait") and isinstance(node.func.value, ast.Name) \
+                and node.func.value.id == "self":
+            for line in range(node.lineno, (node.end_lineno or node.lineno) + 1):
+                lines[line] = node.func.attr
+    return lines
+
+
+def categorize(labels):
+    """Category of a sample from the frame labels below the innermost scene frame."""
+    if not labels:
+        return "construct"
+    for category, markers in CATEGORY_MARKERS:
+        for label in labels:
+            if any(marker in label for marker in markers):
+                return category
+    return "construct"
+
+
+class SamplingProfiler:
+    """Samples one thread's stack on a timer thread."""
+
+    def __init__(self, scene_path, interval=PROFILE_INTERVAL, thread_id=None):
+        self.scene_path = os.path.abspath(scene_path)
+        self.interval = interval
+        self.thread_id = thread_id or threading.main_thread().ident
+        self.samples = 0
+        self.collapsed = Counter()
+        self.line_categories = defaultdict(Counter)  # scene line (or None) -> category -> samples
+        self.animation_lines = animation_lines(self.scene_path)
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = None
+        self.wall = 0.0
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="scene-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.wall = time.perf_counter() - self._started
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        frames = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        frames.reverse()  # Root first
+
+        labels = [frame_label(f.f_code, self.scene_path, f.f_lineno) for f in frames]
+        scene_depths = [i for i, f in enumerate(frames) if f.f_code.co_filename == self.scene_path]
+        play_depths = [i for i in scene_depths if frames[i].f_lineno in self.animation_lines]
+        scene_depth = (play_depths or scene_depths or [None])[-1]
+        if scene_depth is None:
+            line = None
+            category = categorize(labels)
+        else:
+            line = frames[scene_depth].f_lineno
+            category = categorize(labels[scene_depth + 1:])
+        self.samples += 1
+        self.collapsed[";".join(labels)] += 1
+        self.line_categories[line][category] += 1
+
+    def report(self):
+        """Profile as a JSON-serializable dict."""
+        seconds_per_sample = self.wall / self.samples if self.samples else 0.0
+        try:
+            with open(self.scene_path, 'r') as f:
+                source = f.read().split("\n")
+        except OSError:
+            source = []
+
+        lines = []
+        categories = Counter()
+        for line, counts in self.line_categories.items():
+            categories.update(counts)
+            if line is None:
+                continue
+            samples = sum(counts.values())
+            lines.append({
+                'line': line,
+                'source': source[line - 1].strip()[:160] if 0 < line <= len(source) else "",
+                'kind': self.animation_lines.get(line, "python"),
+                'samples': samples,
+                'seconds': samples * seconds_per_sample,
+                'categories': dict(counts),
+            })
+        lines.sort(key=lambda entry: -entry['samples'])
+        return {
+            'scene_path': self.scene_path,
+            'interval': self.interval,
+            'samples': self.samples,
+            'seconds': self.wall,
+            'outside_scene_seconds': sum(self.line_categories.get(None, {}).values()) * seconds_per_sample,
+            'categories': {name: count * seconds_per_sample for name, count in categories.most_common()},
+            'lines': lines,
+            'collapsed': dict(self.collapsed),
+        }
+
+
+def top_offenders(profile, limit=PROFILE_TOP_LINES):
+    """The scene lines that took longest, with their category split."""
+    return profile['lines'][:limit]
+
+
+def run(out_path, manim_args, tex_cache_dir=None):
+    """Render with the manim CLI under the profiler and write the profile. Returns an exit code."""
+    from manim.__main__ import main as manim_main
+
+    if tex_cache_dir:
+        from tex_cache import install
+        install(tex_cache_dir)
+
+    scene_path = next((arg for arg in manim_args if arg.endswith(".py")), "")
+    profiler = SamplingProfiler(scene_path)
+    profiler.start()
+    exit_code = 0
+    try:
+        manim_main(args=manim_args, standalone_mode=False)
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else 1
+    except Exception as e:
+        print(f"{type(e).__name__}: {e}", file=sys.stderr)
+        exit_code = 1
+    finally:
+        profiler.stop()
+        with open(out_path, 'w') as f:
+            json.dump(profiler.report(), f)
+    return exit_code
+
+
+def load_profiles(directory):
+    profiles = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        with open(path, 'r') as f:
+            profiles.append((os.path.splitext(os.path.basename(path))[0], json.load(f)))
+    return profiles
+
+
+def collapse(directory):
+    """Print the merged collapsed stacks of every profile in directory, in folded format."""
+    merged = Counter()
+    for _, profile in load_profiles(directory):
+        merged.update(profile['collapsed'])
+    for stack, count in merged.most_common():
+        print(f"{stack} {count}")
+
+
+def top(directory, limit=20):
+    """Print the slowest scene lines and the category totals across all profiles."""
+    entries = []
+    categories = Counter()
+    for name, profile in load_profiles(directory):
+        categories.update(profile['categories'])
+        entries.extend((entry['seconds'], name, entry) for entry in profile['lines'])
+    total = sum(categories.values())
+    print("Time by category:")
+    for category, seconds in categories.most_common():
+        print(f"  {category:<12}{seconds:>10.1f}s {seconds / total if total else 0:>6.1%}")
+    print("\nSlowest scene lines:")
+    for seconds, name, entry in sorted(entries, key=lambda item: -item[0])[:limit]:
+        main_category = max(entry['categories'], key=entry['categories'].get)
+        print(f"  {seconds:>7.2f}s  {name}:{entry['line']:<5} [{main_category}] {entry['source']}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if len(args) >= 4 and args[0] == "run" and args[1] == "--out" and "--" in args:
+        options = args[3:args.index("--")]
+        tex_cache_dir = options[options.index("--tex-cache") + 1] if "--tex-cache" in options else None
+        sys.exit(run(args[2], args[args.index("--") + 1:], tex_cache_dir))
+    elif len(args) == 2 and args[0] == "collapse":
+        collapse(args[1])
+    elif len(args) == 2 and args[0] == "top":
+        top(args[1])
+    else:
+        print("Usage: python scene_profiler.py [run --out profile.json -- <manim args> | collapse DIR | top DIR]")
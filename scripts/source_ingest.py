@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Incremental readers for the renderer's source dataset.
+
+JsonlSource tails an append-only JSONL file (one {"prompt", "code"} object
+per line) from a byte offset persisted in the job ledger, so only records
+appended since the last commit are parsed and hashed. JsonArraySource keeps
+the legacy single-JSON-array format working, but skips re-parsing when the
+file has not changed and caches code hashes between scans.
+
+Both sources expose wait_for_change(), which returns as soon as the file's
+size or mtime moves instead of sleeping a fixed interval.
+"""
+import hashlib
+import json
+import os
+import time
+
+WATCH_POLL_INTERVAL = float(os.environ.get("WATCH_POLL_INTERVAL", "1.0"))  # Seconds between stat() checks
+
+
+def get_code_hash(code):
+    """Generate a unique hash for the code to track what's been processed."""
+    return hashlib.md5(code.encode('utf-8')).hexdigest()
+
+
+def file_signature(path):
+    """Return (size, mtime_ns, inode) for path, or None if it doesn't exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+
+class _WatchedSource:
+    def __init__(self, path):
+        self.path = path
+        self._seen_signature = None
+
+    def wait_for_change(self, timeout):
+        """Block until the file changes or timeout seconds pass. Returns True on change."""
+        deadline = time.monotonic() + timeout
+        while True:
+            if file_signature(self.path) != self._seen_signature:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(WATCH_POLL_INTERVAL, remaining))
+
+
+class JsonlSource(_WatchedSource):
+    """Append-only JSONL source read from a persisted byte offset."""
+
+    def __init__(self, path, ledger):
+        super().__init__(path)
+        self.ledger = ledger
+        self._key = f"ingest:{os.path.abspath(path)}"
+        state = json.loads(ledger.get_meta(self._key, "{}"))
+        self.offset = state.get('offset', 0)
+        self.records = state.get('records', 0)
+        self.inode = state.get('inode')
+        self._pending = None
+
+    def read_new(self):
+        """Parse records appended since the last commit.
+
+        Returns a list of (animation_id, item, code_hash). A trailing line
+        without a newline is still being written and is left for next time.
+        """
+        signature = file_signature(self.path)
+        self._seen_signature = signature
+        if signature is None:
+            return []
+
+        size, _, inode = signature
+        offset, records = self.offset, self.records
+        if size < offset or (self.inode is not None and inode != self.inode):
+            print(f"{self.path} was truncated or replaced; reading it from the start")
+            offset, records = 0, 0
+
+        if size == offset:
+            self._pending = (offset, records, inode)
+            return []
+
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            chunk = f.read(size - offset)
+
+        end = chunk.rfind(b'\n') + 1
+        new_items = []
+        for line in chunk[:end].splitlines():
+            if not line.strip():
+                continue
+            index = records
+            records += 1
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Skipping malformed record {index} in {self.path}: {e}")
+                continue
+            if isinstance(item, dict) and 'code' in item and 'prompt' in item:
+                new_items.append((f"{index:04d}", item, get_code_hash(item['code'])))
+
+        self._pending = (offset + end, records, inode)
+        return new_items
+
+    def commit(self):
+        """Persist the offset reached by the last read_new() once its records are handled."""
+        if self._pending is None:
+            return
+        self.offset, self.records, self.inode = self._pending
+        self._pending = None
+        self.ledger.set_meta(self._key, json.dumps(
+            {'offset': self.offset, 'records': self.records, 'inode': self.inode}))
+
+
+class JsonArraySource(_WatchedSource):
+    """Legacy source: the whole dataset as one JSON array, re-read only when it changes."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._hashes = {}
+
+    def read_new(self):
+        """Return (animation_id, item, code_hash) for every item if the file changed, else [].
+
+        Raises json.JSONDecodeError while the file is mid-write; the change
+        is picked up again on the next call.
+        """
+        signature = file_signature(self.path)
+        if signature is None or signature == self._seen_signature:
+            self._seen_signature = signature
+            return []
+
+        self._seen_signature = signature
+        with open(self.path, 'r') as f:
+            current_data = json.load(f)
+
+        hashes = {}
+        items = []
+        for idx, item in enumerate(current_data):
+            if 'code' not in item or 'prompt' not in item:
+                continue
+            code = item['code']
+            code_hash = self._hashes.get(code) or get_code_hash(code)
+            hashes[code] = code_hash
+            items.append((f"{idx:04d}", item, code_hash))
+        self._hashes = hashes
+        return items
+
+    def commit(self):
+        pass
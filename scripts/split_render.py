@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""Render one long scene as parallel animation ranges joined by ffmpeg.
+
+manim's -n START,END option renders only animations START to END of a scene.
+It still runs construct() from the top, but it skips rasterizing and
+encoding before START and stops after END. A long scene is cut into up to
+SPLIT_RENDER_PARTS ranges with about equal estimated seconds each, based on
+render_cost.animation_timeline(). The ranges render as parallel manim
+processes. ffmpeg's concat demuxer then joins the pieces with -c copy, which
+is lossless because every piece comes from the same encoder settings.
+
+The animation count is a static estimate, so the last range is always
+open-ended. A range that starts past the real end of the scene renders
+nothing and is dropped. The estimate only follows construct() into methods
+of the scene class and module-level functions (see animation_timeline()).
+
+manim does not seed random or numpy.random itself, so each piece's script
+seeds both with SPLIT_SEED first and every piece replays the same random
+state. Scenes using a generator those seeds don't reach (an unseeded
+numpy.random.default_rng(), SystemRandom, os.urandom) are not split.
+
+Usage:
+    python split_render.py scene.py SceneName [-qm] [--parts 4]
+"""
+import argparse
+import ast
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ffmpeg_tools import run_ffmpeg
+from manim_render import RenderResult, expected_output_path, render_scene
+from render_cache import fingerprint
+from render_cost import animation_timeline
+
+SPLIT_RENDER_PARTS = int(os.environ.get("SPLIT_RENDER_PARTS", "1"))  # Parallel pieces per long scene; 1 disables
+SPLIT_MIN_SECONDS = float(os.environ.get("SPLIT_MIN_SECONDS", "120"))  # Estimated render time that triggers a split
+SPLIT_MIN_ANIMATIONS = 2  # Per piece; below this the replayed prefix outweighs the saving
+SPLIT_SEED = 0
+# Randomness the seeds in seeded() don't make repeatable across processes
+UNSEEDED_RANDOMNESS = re.compile(r"default_rng\(\s*\)|SystemRandom|urandom|secrets\.")
+
+
+def plan_ranges(code, parts=SPLIT_RENDER_PARTS, scene_name=None):
+    """(start, end) animation ranges to render code in, or [] if it isn't worth splitting.
+
+    Boundaries fall where the estimated seconds so far pass each multiple of
+    total / parts. The last range has end None.
+    """
+    if UNSEEDED_RANDOMNESS.search(code):
+        return []
+    timeline = animation_timeline(code, scene_name)
+    parts = min(parts, len(timeline) // SPLIT_MIN_ANIMATIONS)
+    if parts < 2:
+        return []
+    total = sum(timeline)
+    starts = [0]
+    elapsed = 0.0
+    for index, seconds in enumerate(timeline[:-1]):
+        elapsed += seconds
+        if elapsed >= total * len(starts) / parts and index + 1 - starts[-1] >= SPLIT_MIN_ANIMATIONS:
+            starts.append(index + 1)
+            if len(starts) == parts:
+                break
+    if len(starts) < 2:
+        return []
+    return [(start, end - 1) for start, end in zip(starts, starts[1:])] + [(starts[-1], None)]
+
+
+def seeded(code, seed=SPLIT_SEED):
+    """code with random and numpy.random seeded before anything else runs."""
+    tree = ast.parse(code)
+    # After the docstring and __future__ imports, which must come first
+    line = 0
+    for index, node in enumerate(tree.body):
+        if isinstance(node, ast.ImportFrom) and node.module == "__future__" \
+                or index == 0 and isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant):
+            line = node.end_lineno
+        else:
+            break
+    lines = code.split("\n")
+    seeding = (f"import random as _split_random, numpy as _split_numpy; "
+               f"_split_random.seed({seed}); _split_numpy.random.seed({seed})")
+    return "\n".join(lines[:line] + [seeding] + lines[line:])
+
+
+def concat_path(path):
+    """Quote a file path for an ffmpeg concat list."""
+    return "'" + path.replace("'", "'\\''") + "'"
+
+
+def render_split(code, scene_name, work_dir, output_name, ranges, quality_flags="-qm", fmt="mp4",
+                 disable_caching=True, cache=None, fps=None, limits=None, tex_cache_dir=None):
+    """Render scene_name from code as parallel ranges and return a RenderResult like render_scene()'s.
+
+    Each range renders in its own work_dir/part<N> directory. The joined
+    video lands at the same path render_scene() would use and is cached the
+    same way. If a piece fails, the result is the failure of the earliest
+    failing piece.
+    """
+    started = time.perf_counter()
+    result = RenderResult(success=False, scene_name=scene_name)
+    try:
+        work_dir = os.path.abspath(work_dir)
+        os.makedirs(work_dir, exist_ok=True)
+        script_path = os.path.join(work_dir, f"{output_name}.py")
+        with open(script_path, 'w') as f:
+            f.write(code)
+        output_path = expected_output_path(os.path.join(work_dir, "media"), script_path, output_name, quality_flags,
+                                           fmt, fps)
+        cache_key = None
+        if cache is not None:
+            cache_key = fingerprint(code, scene_name, quality_flags, fmt, extra=(fps or "",))
+            if cache.fetch(cache_key, output_path, fmt):
+                result.success = True
+                result.cached = True
+                result.output_path = output_path
+                result.timings['total'] = time.perf_counter() - started
+                return result
+
+        piece_code = seeded(code)
+
+        def render_piece(index):
+            return render_scene(piece_code, scene_name, os.path.join(work_dir, f"part{index}"),
+                                f"{output_name}_part{index}", quality_flags, fmt, disable_caching, fps=fps,
+                                limits=limits, tex_cache_dir=tex_cache_dir, animation_range=ranges[index])
+
+        manim_started = time.perf_counter()
+        with ThreadPoolExecutor(len(ranges), thread_name_prefix="split-render") as pool:
+            pieces = list(pool.map(render_piece, range(len(ranges))))
+        result.timings['manim'] = time.perf_counter() - manim_started
+
+        # Ranges past the real end of the scene produce no video
+        while len(pieces) > 1 and pieces[-1].error_class == "MissingOutput":
+            pieces.pop()
+        failed = next((piece for piece in pieces if not piece.success), None)
+        if failed is not None:
+            result.error_class = failed.error_class
+            result.error = failed.error
+            result.stderr = failed.stderr
+            result.timings['total'] = time.perf_counter() - started
+            return result
+
+        concat_started = time.perf_counter()
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        list_path = os.path.join(work_dir, "pieces.txt")
+        with open(list_path, 'w') as f:
+            f.writelines(f"file {concat_path(piece.output_path)}\n" for piece in pieces)
+        if len(pieces) == 1:
+            shutil.move(pieces[0].output_path, output_path)
+            ok, stderr = True, ""
+        else:
+            ok, stderr = run_ffmpeg(["-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", output_path])
+        result.timings['concat'] = time.perf_counter() - concat_started
+        if not ok:
+            result.error_class = "ConcatError"
+            result.error = f"Could not join {len(pieces)} pieces: {stderr.strip()[:500]}"
+        else:
+            result.success = True
+            result.output_path = output_path
+            if cache_key is not None:
+                cache.put(cache_key, output_path, fmt)
+    except Exception as e:
+        result.error_class = type(e).__name__
+        result.error = str(e)
+
+    result.timings['total'] = time.perf_counter() - started
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="split_render.py")
+    parser.add_argument("script")
+    parser.add_argument("scene")
+    for flag in ("-ql", "-qm", "-qh", "-qp", "-qk"):
+        parser.add_argument(flag, dest="quality", action="store_const", const=flag, default="-qm")
+    parser.add_argument("--parts", type=int, default=max(2, SPLIT_RENDER_PARTS))
+    args = parser.parse_args()
+    with open(args.script, 'r') as f:
+        source = f.read()
+    planned = plan_ranges(source, args.parts, args.scene)
+    if not planned:
+        print(f"{args.scene} has too few animations to split into {args.parts} parts")
+    else:
+        print("Ranges: " + ", ".join(f"{start}-{'end' if end is None else end}" for start, end in planned))
+        name = os.path.splitext(os.path.basename(args.script))[0]
+        rendered = render_split(source, args.scene, f"split_{name}", name, planned, args.quality)
+        if rendered.success:
+            print(f"Rendered {rendered.output_path} in {rendered.timings['total']:.1f}s")
+        else:
+            print(f"Failed ({rendered.error_class}): {rendered.error}")
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""Local HTTP stand-in for the parts of the Supabase API we use.
+
+Serves standard and TUS resumable uploads plus public downloads from a
+local directory, and an in-memory version of the REST table API (inserts,
+upserts with on_conflict, and selects including count). Optional injected
+latency and failure rates let the retry and backoff paths run without
+network access.
+
+Usage:
+    python storage_standin.py [--port 54321] [--dir standin_storage] [--latency 0.2] [--fail-rate 0.1]
+
+Then run the renderer with STORAGE_URL=http://127.0.0.1:54321, plus
+SUPABASE_URL=http://127.0.0.1:54321 to send metadata there too.
+
+From Python:
+    server, base_url = start_standin("/tmp/storage")
+    ...
+    server.shutdown()
+"""
+import argparse
+import base64
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+OBJECT_PREFIX = "/storage/v1/object/"
+PUBLIC_PREFIX = "/storage/v1/object/public/"
+RESUMABLE_PREFIX = "/storage/v1/upload/resumable"
+REST_PREFIX = "/rest/v1/"
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _reply(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            return b"".join(chunks)
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _simulate(self):
+        """Apply injected latency; return True if this request should fail."""
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        return random.random() < self.server.fail_rate
+
+    def _object_path(self, bucket_and_name):
+        path = os.path.normpath(os.path.join(self.server.directory, bucket_and_name))
+        if not path.startswith(os.path.abspath(self.server.directory) + os.sep):
+            raise ValueError("path escapes storage directory")
+        return path
+
+    def do_POST(self):
+        body = self._read_body()
+        if self._simulate():
+            self._reply(503, b'{"error": "injected failure"}')
+        elif self.path.startswith(REST_PREFIX):
+            self._upsert_rows(body)
+        elif self.path.startswith(RESUMABLE_PREFIX):
+            self._create_resumable()
+        elif self.path.startswith(OBJECT_PREFIX):
+            self._store(self.path[len(OBJECT_PREFIX):], body)
+        else:
+            self._reply(404)
+
+    do_PUT = do_POST
+
+    def _store(self, bucket_and_name, body):
+        path = self._object_path(bucket_and_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.part"
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+        self.server.record("upload", bucket_and_name, len(body))
+        self._reply(200, b'{"Key": "%s"}' % bucket_and_name.encode())
+
+    def _table_request(self):
+        """Split a REST path into (table name, query dict)."""
+        url = urlsplit(self.path)
+        return url.path[len(REST_PREFIX):].strip("/"), parse_qs(url.query)
+
+    def _upsert_rows(self, body):
+        table, query = self._table_request()
+        rows = json.loads(body or b"[]")
+        if isinstance(rows, dict):
+            rows = [rows]
+        conflict_column = query.get("on_conflict", [None])[0]
+        with self.server.lock:
+            stored = self.server.tables.setdefault(table, {})
+            for row in rows:
+                key = row.get(conflict_column) if conflict_column else None
+                if key is None:
+                    key = row.get("id") or uuid.uuid4().hex
+                stored[key] = {**stored.get(key, {}), **row}
+        self.server.record("upsert", table, len(rows))
+        self._reply(201, json.dumps(rows).encode(), {"Content-Type": "application/json"})
+
+    def _select_rows(self):
+        table, query = self._table_request()
+        with self.server.lock:
+            rows = list(self.server.tables.get(table, {}).values())
+        headers = {"Content-Type": "application/json", "Content-Range": f"0-{max(len(rows) - 1, 0)}/{len(rows)}"}
+        if query.get("select", [""])[0] == "count":
+            self._reply(200, json.dumps([{"count": len(rows)}]).encode(), headers)
+            return
+        limit = int(query.get("limit", [len(rows)])[0])
+        self._reply(200, json.dumps(rows[:limit]).encode(), headers)
+
+    def _create_resumable(self):
+        metadata = {}
+        for pair in self.headers.get("Upload-Metadata", "").split(","):
+            if " " in pair:
+                key, value = pair.split(" ", 1)
+                metadata[key] = base64.b64decode(value).decode()
+        upload_id = uuid.uuid4().hex
+        with self.server.lock:
+            self.server.resumable[upload_id] = {
+                'target': f"{metadata.get('bucketName')}/{metadata.get('objectName')}",
+                'length': int(self.headers["Upload-Length"]),
+                'data': bytearray(),
+            }
+        self._reply(201, headers={"Location": f"{RESUMABLE_PREFIX}/{upload_id}", "Tus-Resumable": "1.0.0"})
+
+    def _resumable(self):
+        upload_id = self.path[len(RESUMABLE_PREFIX):].strip("/")
+        return self.server.resumable.get(upload_id)
+
+    def do_HEAD(self):
+        upload = self._resumable() if self.path.startswith(RESUMABLE_PREFIX) else None
+        if upload is None:
+            self._reply(404)
+            return
+        self._reply(200, headers={"Upload-Offset": str(len(upload['data'])),
+                                  "Upload-Length": str(upload['length']), "Tus-Resumable": "1.0.0"})
+
+    def do_PATCH(self):
+        body = self._read_body()
+        upload = self._resumable() if self.path.startswith(RESUMABLE_PREFIX) else None
+        if upload is None:
+            self._reply(404)
+            return
+        if self._simulate():
+            self._reply(503, b'{"error": "injected failure"}')
+            return
+        if int(self.headers["Upload-Offset"]) != len(upload['data']):
+            self._reply(409, headers={"Upload-Offset": str(len(upload['data']))})
+            return
+        upload['data'].extend(body)
+        if len(upload['data']) >= upload['length']:
+            path = self._object_path(upload['target'])
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(upload['data'])
+            self.server.record("upload", upload['target'], upload['length'])
+        self._reply(204, headers={"Upload-Offset": str(len(upload['data'])), "Tus-Resumable": "1.0.0"})
+
+    def do_GET(self):
+        if self.path.startswith(REST_PREFIX):
+            self._select_rows()
+            return
+        if not self.path.startswith(PUBLIC_PREFIX):
+            self._reply(404)
+            return
+        try:
+            path = self._object_path(self.path[len(PUBLIC_PREFIX):])
+            with open(path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            self._reply(404)
+            return
+        self._reply(200, body, {"Content-Type": "application/octet-stream"})
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, directory, latency=0.0, fail_rate=0.0, verbose=False):
+        super().__init__(address, StandinHandler)
+        self.directory = os.path.abspath(directory)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.verbose = verbose
+        self.lock = threading.Lock()
+        self.resumable = {}
+        self.tables = {}  # table name -> {conflict key: row}
+        self.requests = []
+
+    def record(self, kind, target, size):
+        with self.lock:
+            self.requests.append({'kind': kind, 'target': target, 'size': size, 'time': time.time()})
+
+
+def start_standin(directory, port=0, latency=0.0, fail_rate=0.0):
+    """Start a stand-in server on a background thread. Returns (server, base_url)."""
+    os.makedirs(directory, exist_ok=True)
+    server = StandinServer(("127.0.0.1", port), directory, latency, fail_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for Supabase Storage and tables")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--dir", default="standin_storage")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every upload and upsert")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of uploads and upserts answered with HTTP 503")
+    args = parser.parse_args()
+
+    os.makedirs(args.dir, exist_ok=True)
+    server = StandinServer(("127.0.0.1", args.port), args.dir, args.latency, args.fail_rate, verbose=True)
+    print(f"Storage stand-in serving {args.dir} at http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stand-in stopped.")
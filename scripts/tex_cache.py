@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""Shared cache of compiled LaTeX for Tex and MathTex.
+
+Renders run with --disable_caching in a fresh work directory, so manim's Tex
+directory starts empty every time and each expression goes through latex and
+dvisvgm again. This cache sits in front of manim's tex_to_svg_file(). Each
+SVG is stored in TEX_CACHE_DIR under a hash of the full LaTeX document
+(template, environment and expression) and the compiler, so a later render
+in any process or run reads it from there instead of compiling.
+
+Entries are published by render_cache.RenderCache with an atomic rename, so
+a concurrent render never reads a partial SVG. Two renders compiling the same
+expression at once both compile, and the second rename wins. The directory
+is kept under TEX_CACHE_MAX_MB by least-recent use.
+
+Text and MarkupText are drawn by Pango without LaTeX and are not cached.
+
+Usage:
+    python tex_cache.py run [--dir DIR] -- scene.py MyScene -qm    # the manim CLI, with the cache
+    python tex_cache.py warm [combined_data.json] [--limit N] [--workers 4]
+    python tex_cache.py stats
+"""
+import argparse
+import ast
+import hashlib
+import os
+import sys
+import tempfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+from code_repair import repair
+from render_cache import RenderCache
+
+TEX_CACHE_DIR = os.environ.get("TEX_CACHE_DIR", "tex_cache")  # Empty disables the cache
+TEX_CACHE_MAX_MB = int(os.environ.get("TEX_CACHE_MAX_MB", "512"))
+TEX_CLASSES = ("Tex", "MathTex")
+# Modules that import tex_to_svg_file by name and so need the hook too
+TEX_MODULES = ("manim.utils.tex_file_writing", "manim.mobject.text.tex_mobject")
+
+stats = Counter()
+_installed_dir = None
+
+
+def cache_key(document, tex_template):
+    digest = hashlib.sha256()
+    for part in (document, getattr(tex_template, "tex_compiler", ""), getattr(tex_template, "output_format", "")):
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def install(directory=TEX_CACHE_DIR, max_mb=TEX_CACHE_MAX_MB):
+    """Route this process's Tex compilation through the cache in directory.
+
+    Returns False, leaving manim alone, if its tex_to_svg_file() isn't where
+    this manim version is expected to have it.
+    """
+    global _installed_dir
+    if _installed_dir is not None:
+        return _installed_dir == directory
+    import importlib
+
+    from manim import config
+
+    modules = [importlib.import_module(name) for name in TEX_MODULES]
+    original = getattr(modules[0], "tex_to_svg_file", None)
+    if original is None:
+        print("manim has no tex_file_writing.tex_to_svg_file; rendering without the tex cache", file=sys.stderr)
+        return False
+    cache = RenderCache(directory, max_mb * 1024 * 1024)
+
+    def cached_tex_to_svg_file(expression, environment=None, tex_template=None):
+        template = tex_template or config.tex_template
+        try:
+            if environment is not None:
+                document = template.get_texcode_for_expression_in_env(expression, environment)
+            else:
+                document = template.get_texcode_for_expression(expression)
+        except AttributeError:
+            return original(expression, environment, tex_template)
+        key = cache_key(document, template)
+        path = cache.get(key, "svg")
+        if path is not None:
+            stats['hits'] += 1
+            return Path(path)
+        svg_path = original(expression, environment, tex_template)
+        cache.put(key, svg_path, "svg")
+        stats['misses'] += 1
+        return svg_path
+
+    for module in modules:
+        if getattr(module, "tex_to_svg_file", None) is original:
+            module.tex_to_svg_file = cached_tex_to_svg_file
+    _installed_dir = directory
+    return True
+
+
+def run(directory, manim_args):
+    """Run the manim CLI in this process with the cache installed. Returns an exit code."""
+    from manim.__main__ import main as manim_main
+
+    install(directory)
+    try:
+        manim_main(args=manim_args, standalone_mode=False)
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else 1
+    except Exception as e:
+        print(f"{type(e).__name__}: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _is_literal(node):
+    """Constants, manim constant names (RED, UP) and containers of them."""
+    if isinstance(node, (ast.Constant, ast.Name)):
+        return True
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        return all(_is_literal(item) for item in node.elts)
+    if isinstance(node, ast.Dict):
+        return all(key is not None and _is_literal(key) for key in node.keys) \
+            and all(_is_literal(value) for value in node.values)
+    return False
+
+
+def tex_literals(code):
+    """Source of every Tex/MathTex call in code whose arguments are all literals."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return set()
+    calls = set()
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in TEX_CLASSES):
+            continue
+        if node.args and all(isinstance(arg, ast.Constant) and isinstance(arg.value, str) for arg in node.args) \
+                and all(kw.arg is not None and _is_literal(kw.value) for kw in node.keywords):
+            calls.add(ast.unparse(node))
+    return calls
+
+
+def _warm_chunk(directory, sources):
+    """Worker: build each Tex call with the cache installed. Returns (hits, misses, failed)."""
+    import manim
+
+    install(directory)
+    failed = 0
+    namespace = {name: value for name, value in vars(manim).items() if not name.startswith("_")}
+    namespace["__builtins__"] = {}
+    with tempfile.TemporaryDirectory(prefix="tex_warm_") as tex_dir:
+        # Intermediate .tex/.dvi files go to a private directory; only the SVGs are shared
+        with manim.tempconfig({"tex_dir": tex_dir}):
+            for source in sources:
+                try:
+                    eval(source, namespace)  # Only calls tex_literals() vetted: Tex/MathTex of literals
+                except Exception:
+                    failed += 1
+    return stats['hits'], stats['misses'], failed
+
+
+def warm(dataset, limit=None, workers=os.cpu_count() or 1, directory=TEX_CACHE_DIR):
+    """Compile every literal Tex/MathTex in the dataset into the cache."""
+    from benchmark_pipeline import load_samples
+
+    sources = set()
+    for code in load_samples(dataset, limit):
+        result = repair(code)
+        if result.ok:
+            sources |= tex_literals(result.code)
+    sources = sorted(sources)
+    print(f"Found {len(sources)} distinct literal Tex/MathTex expressions")
+    if not sources:
+        return
+    workers = max(1, min(workers, len(sources)))
+    totals = Counter()
+    # spawn: each worker imports manim itself
+    with ProcessPoolExecutor(workers, mp_context=get_context("spawn")) as pool:
+        chunks = [sources[i::workers] for i in range(workers)]
+        for hits, misses, failed in pool.map(_warm_chunk, [directory] * workers, chunks):
+            totals.update(hits=hits, misses=misses, failed=failed)
+    print(f"Compiled {totals['misses']} expressions into {directory}; {totals['hits']} were already cached, "
+          f"{totals['failed']} failed to build")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args[:1] == ["run"] and "--" in args:
+        options = args[1:args.index("--")]
+        directory = options[options.index("--dir") + 1] if "--dir" in options else TEX_CACHE_DIR
+        sys.exit(run(directory, args[args.index("--") + 1:]))
+    elif args[:1] == ["warm"]:
+        from benchmark_pipeline import DEFAULT_DATASET
+
+        parser = argparse.ArgumentParser(prog="tex_cache.py warm")
+        parser.add_argument("dataset", nargs="?", default=DEFAULT_DATASET)
+        parser.add_argument("--limit", type=int)
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--dir", default=TEX_CACHE_DIR)
+        options = parser.parse_args(args[1:])
+        warm(options.dataset, options.limit, options.workers, options.dir)
+    elif args[:1] == ["stats"]:
+        cache = RenderCache(TEX_CACHE_DIR, TEX_CACHE_MAX_MB * 1024 * 1024)
+        entries = cache.entries()
+        total = sum(size for _, size, _ in entries)
+        print(f"{len(entries)} SVGs, {total / 1024 / 1024:.1f} MB of {TEX_CACHE_MAX_MB} MB in {cache.directory}")
+    else:
+        print("Usage: python tex_cache.py [run [--dir DIR] -- <manim args> | warm [dataset] [--limit N] | stats]")
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""Background upload stage for rendered animations.
+
+Render workers hand finished files to an UploadStage and move on; a small
+pool of upload threads streams them to Supabase Storage with retries and
+exponential backoff. Files are streamed from disk in chunks rather than read
+into memory. Files above RESUMABLE_THRESHOLD_MB use the TUS resumable
+endpoint, so a retry continues from the last acknowledged chunk.
+
+STORAGE_URL may point at storage_standin.py instead of Supabase.
+"""
+import base64
+import os
+import queue
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+
+import httpx
+
+from metrics import metrics
+
+UPLOAD_WORKERS = int(os.environ.get("UPLOAD_WORKERS", "4"))
+UPLOAD_MAX_RETRIES = int(os.environ.get("UPLOAD_MAX_RETRIES", "5"))
+UPLOAD_BACKOFF = float(os.environ.get("UPLOAD_BACKOFF", "1.0"))  # Seconds before the first retry; doubles each time
+UPLOAD_TIMEOUT = float(os.environ.get("UPLOAD_TIMEOUT", "120"))
+RESUMABLE_THRESHOLD_MB = int(os.environ.get("RESUMABLE_THRESHOLD_MB", "50"))
+CHUNK_SIZE = 6 * 1024 * 1024  # Supabase's TUS endpoint requires 6 MB chunks
+
+
+class UploadError(Exception):
+    """Upload failure; retryable errors are worth another attempt."""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def iter_file(path, chunk_size=CHUNK_SIZE):
+    """Yield a file's bytes in chunks without loading it all."""
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def _check_response(response):
+    if response.status_code < 300:
+        return
+    retryable = response.status_code >= 500 or response.status_code in (408, 409, 429)
+    raise UploadError(f"HTTP {response.status_code}: {response.text[:200]}", retryable)
+
+
+class StorageClient:
+    """Minimal Supabase Storage client that streams uploads."""
+
+    def __init__(self, base_url, api_key, bucket, timeout=UPLOAD_TIMEOUT):
+        self.base_url = base_url.rstrip('/')
+        self.bucket = bucket
+        self.headers = {"Authorization": f"Bearer {api_key}", "apikey": api_key or ""}
+        self.http = httpx.Client(timeout=timeout, headers=self.headers)
+
+    def public_url(self, name):
+        return f"{self.base_url}/storage/v1/object/public/{self.bucket}/{name}"
+
+    def upload(self, path, name, content_type="video/mp4", state=None):
+        """Upload path as name and return its public URL.
+
+        state is a dict owned by the caller that carries resumable-upload
+        progress between attempts.
+        """
+        size = os.path.getsize(path)
+        try:
+            if size > RESUMABLE_THRESHOLD_MB * 1024 * 1024:
+                self._upload_resumable(path, name, content_type, size, state if state is not None else {})
+            else:
+                response = self.http.post(
+                    f"{self.base_url}/storage/v1/object/{self.bucket}/{name}",
+                    content=iter_file(path),
+                    headers={"Content-Type": content_type, "Content-Length": str(size), "x-upsert": "true"})
+                _check_response(response)
+        except httpx.TransportError as e:
+            raise UploadError(f"{type(e).__name__}: {e}")
+        return self.public_url(name)
+
+    def _upload_resumable(self, path, name, content_type, size, state):
+        tus_headers = {"Tus-Resumable": "1.0.0"}
+        if 'location' not in state:
+            metadata = ",".join(
+                f"{key} {base64.b64encode(value.encode()).decode()}"
+                for key, value in (("bucketName", self.bucket), ("objectName", name), ("contentType", content_type)))
+            response = self.http.post(
+                f"{self.base_url}/storage/v1/upload/resumable",
+                headers={**tus_headers, "Upload-Length": str(size), "Upload-Metadata": metadata, "x-upsert": "true"})
+            _check_response(response)
+            state['location'] = str(response.url.join(response.headers["Location"]))
+            offset = 0
+        else:
+            # Resume: ask the server how much it already has
+            response = self.http.head(state['location'], headers=tus_headers)
+            _check_response(response)
+            offset = int(response.headers["Upload-Offset"])
+
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            while offset < size:
+                chunk = f.read(CHUNK_SIZE)
+                response = self.http.patch(
+                    state['location'], content=chunk,
+                    headers={**tus_headers, "Upload-Offset": str(offset),
+                             "Content-Type": "application/offset+octet-stream"})
+                _check_response(response)
+                offset = int(response.headers.get("Upload-Offset", offset + len(chunk)))
+                f.seek(offset)
+
+
+@dataclass
+class UploadJob:
+    """A rendered file waiting to be uploaded, with its completion callbacks."""
+    file_path: str
+    object_name: str
+    on_success: object
+    on_failure: object
+    content_type: str = "video/mp4"
+    attempts: int = 0
+    enqueued_at: float = field(default_factory=time.time)
+    state: dict = field(default_factory=dict)
+
+
+class UploadStage:
+    """Queue plus upload threads; submit() never blocks on the network."""
+
+    def __init__(self, client, workers=UPLOAD_WORKERS, max_retries=UPLOAD_MAX_RETRIES, backoff=UPLOAD_BACKOFF):
+        self.client = client
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._jobs = queue.Queue()
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._run, name=f"upload-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, file_path, object_name, on_success, on_failure, content_type="video/mp4"):
+        """Queue a file for upload. on_success(url) or on_failure(error) runs on an upload thread."""
+        self._jobs.put(UploadJob(file_path, object_name, on_success, on_failure, content_type))
+
+    def join(self):
+        """Wait until every submitted upload has succeeded or given up."""
+        self._jobs.join()
+
+    def close(self):
+        for _ in self._threads:
+            self._jobs.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                self._jobs.task_done()
+                break
+            try:
+                self._upload_with_retries(job)
+            finally:
+                self._jobs.task_done()
+
+    def _upload_with_retries(self, job):
+        while True:
+            job.attempts += 1
+            try:
+                with metrics.span("upload", object_name=job.object_name, attempt=job.attempts):
+                    url = self.client.upload(job.file_path, job.object_name, job.content_type, job.state)
+            except Exception as e:
+                retryable = getattr(e, 'retryable', False)
+                if not retryable or job.attempts > self.max_retries:
+                    print(f"Giving up on upload of {job.object_name} after {job.attempts} attempts: {e}")
+                    self._callback(job.on_failure, e)
+                    return
+                delay = self.backoff * (2 ** (job.attempts - 1)) * random.uniform(0.5, 1.5)
+                print(f"Upload of {job.object_name} failed ({e}); retrying in {delay:.1f}s")
+                metrics.incr("upload_retries_total")
+                time.sleep(delay)
+                continue
+            print(f"Uploaded {job.object_name} to storage")
+            self._callback(job.on_success, url)
+            return
+
+    def _callback(self, callback, value):
+        try:
+            callback(value)
+        except Exception as e:
+            print(f"Error in upload callback: {e}")
@@ -0,0 +1,3 @@
+-- Render service request id for animations that outlive the generate-animation request.
+-- The animation status routes poll the service with it and write the URL back.
+ALTER TABLE public.chat_messages ADD COLUMN IF NOT EXISTS render_id TEXT;
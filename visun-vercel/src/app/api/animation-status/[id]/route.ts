@@ -1,5 +1,6 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { getServiceSupabase } from '@/lib/supabase';
+import { syncRenderStatus } from '@/lib/render-service';
 
 export async function GET(
   request: NextRequest,
@@ -20,7 +21,7 @@ export async function GET(
     const supabase = getServiceSupabase();
     const { data, error } = await supabase
       .from('chat_messages')
-      .select('animation_status, animation_url, animation_error')
+      .select('animation_status, animation_url, animation_error, render_id')
       .eq('id', messageId)
       .single();
     
@@ -32,11 +33,14 @@ export async function GET(
       }, { status: 500 });
     }
     
+    // Renders that outlived generate-animation finish on the render service
+    const message = await syncRenderStatus(supabase, messageId, data);
+    
     return NextResponse.json({ 
       success: true, 
-      status: data.animation_status,
-      url: data.animation_url || null,
-      error: data.animation_error || null
+      status: message.animation_status,
+      url: message.animation_url || null,
+      error: message.animation_error || null
     });
     
   } catch (error) {
@@ -1,5 +1,6 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { getServiceSupabase } from '@/lib/supabase';
+import { syncRenderStatus } from '@/lib/render-service';
 
 export const config = {
   runtime: 'nodejs'
@@ -25,13 +26,13 @@ export async function GET(request: NextRequest) {
     const supabase = getServiceSupabase();
     
     // Get the message with animation status
-    const { data: message, error: messageError } = await supabase
+    const { data, error: messageError } = await supabase
       .from('chat_messages')
-      .select('animation_status, animation_url, animation_error')
+      .select('animation_status, animation_url, animation_error, render_id')
       .eq('id', messageId)
       .single();
     
-    if (messageError || !message) {
+    if (messageError || !data) {
       console.error('Error fetching message:', messageError);
       return NextResponse.json({
         success: false,
@@ -39,6 +40,9 @@ export async function GET(request: NextRequest) {
       }, { status: 500 });
     }
     
+    // Renders that outlived generate-animation finish on the render service
+    const message = await syncRenderStatus(supabase, messageId, data);
+    
     return NextResponse.json({
       success: true,
       status: message.animation_status,
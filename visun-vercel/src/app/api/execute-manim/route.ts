@@ -5,6 +5,7 @@ import fs from 'fs';
 import path from 'path';
 import { put } from '@vercel/blob';
 import { getServiceSupabase } from '@/lib/supabase';
+import { renderServiceHeaders, renderServiceUrl } from '@/lib/render-service';
 
 const execAsync = promisify(exec);
 
@@ -18,10 +19,12 @@ export const config = {
  */
 export async function POST(request: NextRequest) {
   try {
-    // Health check first
-    await healthCheck();
+    // Health check first; the render service brings its own manim
+    if (!renderServiceUrl) {
+      await healthCheck();
+    }
     
-    const { code, messageId } = await request.json();
+    const { code, messageId, prompt, sessionId } = await request.json();
     
     if (!code || !messageId) {
       return NextResponse.json({
@@ -33,6 +36,11 @@ export async function POST(request: NextRequest) {
     
     console.log(`Processing animation for message: ${messageId}`);
     
+    // The shared render service serves chat renders ahead of the dataset backfill
+    if (renderServiceUrl) {
+      return await renderWithService(code, messageId, prompt || '', sessionId);
+    }
+    
     // Save code to temporary file
     const tempDir = '/tmp';
     const codeFile = path.join(tempDir, `${messageId}.py`);
@@ -111,6 +119,61 @@ export async function POST(request: NextRequest) {
   }
 }
 
+/**
+ * Queues the render in the interactive lane of the render service and waits for its URL
+ */
+async function renderWithService(code: string, messageId: string, prompt: string, sessionId?: string) {
+  const response = await fetch(`${renderServiceUrl}/render`, {
+    method: 'POST',
+    headers: renderServiceHeaders(),
+    // Renders are shared fairly between chat sessions
+    body: JSON.stringify({ code, prompt, group: sessionId || messageId, wait: true })
+  });
+  const result = await response.json();
+  const supabase = getServiceSupabase();
+  
+  if (response.status === 202) {
+    // Still rendering; the animation status routes pick up the URL from the service with this id
+    const { error: updateError } = await supabase
+      .from('chat_messages')
+      .update({
+        animation_status: 'processing',
+        render_id: result.animation_id
+      })
+      .eq('id', messageId);
+    
+    if (updateError) {
+      console.error('Failed to update message record:', updateError);
+    }
+    
+    return NextResponse.json({ pending: true, animationId: result.animation_id }, { status: 202 });
+  }
+  if (!response.ok || !result.success) {
+    return NextResponse.json({
+      success: false,
+      error: `Render service failed: ${result.error}`,
+      url: '/placeholder-animation.mp4'
+    }, { status: 500 });
+  }
+  
+  const { error: updateError } = await supabase
+    .from('chat_messages')
+    .update({
+      animation_url: result.url,
+      animation_status: 'completed'
+    })
+    .eq('id', messageId);
+  
+  if (updateError) {
+    console.error('Failed to update message record:', updateError);
+  }
+  
+  return NextResponse.json({
+    success: true,
+    url: result.url
+  });
+}
+
 /**
  * Performs a health check to ensure the Manim environment is available
  */
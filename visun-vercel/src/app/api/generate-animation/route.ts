@@ -39,7 +39,7 @@ export async function POST(request: NextRequest) {
     // Get the message content
     const { data: message, error: messageError } = await supabase
       .from('chat_messages')
-      .select('content, role')
+      .select('content, role, session_id')
       .eq('id', messageId)
       .single();
     
@@ -99,7 +99,9 @@ export async function POST(request: NextRequest) {
       },
       body: JSON.stringify({
         code: manimCode,
-        messageId
+        messageId,
+        prompt: message.content,
+        sessionId: message.session_id
       }),
     });
     
@@ -116,6 +118,15 @@ export async function POST(request: NextRequest) {
     
     const data = await executeResponse.json();
     
+    if (executeResponse.status === 202) {
+      // The render outlived this request; the client keeps polling the animation status
+      return NextResponse.json({
+        success: false,
+        pending: true,
+        message: 'Animation is still rendering'
+      }, { status: 202 });
+    }
+    
     return NextResponse.json({
       success: true,
       url: data.url,
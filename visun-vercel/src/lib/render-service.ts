@@ -0,0 +1,51 @@
+// Client for the shared render service (scripts/render_intake.py)
+
+export const renderServiceUrl = process.env.RENDER_SERVICE_URL || '';
+
+export const renderServiceHeaders = (): Record<string, string> => ({
+  'Content-Type': 'application/json',
+  ...(process.env.RENDER_INTAKE_TOKEN ? { Authorization: `Bearer ${process.env.RENDER_INTAKE_TOKEN}` } : {})
+});
+
+/**
+ * Brings a message whose render outlived the request up to date with the render service.
+ * Writes the URL or error onto the message once the render finishes and returns the updated row.
+ */
+export async function syncRenderStatus(supabase, messageId: string, message) {
+  if (!renderServiceUrl || message.animation_status !== 'processing' || !message.render_id) {
+    return message;
+  }
+
+  const response = await fetch(`${renderServiceUrl}/render/${message.render_id}`, {
+    headers: renderServiceHeaders()
+  });
+  if (response.status === 404) {
+    // The service restarted or dropped the request from its history
+    const update = { animation_status: 'error', animation_error: 'Render was lost by the render service' };
+    await supabase.from('chat_messages').update(update).eq('id', messageId);
+    return { ...message, ...update };
+  }
+  if (!response.ok) {
+    return message;
+  }
+
+  const result = await response.json();
+  let update = null;
+  if (result.status === 'done') {
+    update = { animation_status: 'completed', animation_url: result.url, animation_error: null };
+  } else if (result.status === 'failed') {
+    update = { animation_status: 'error', animation_error: `Render service failed: ${result.error}` };
+  }
+  if (!update) {
+    return message;
+  }
+
+  const { error: updateError } = await supabase
+    .from('chat_messages')
+    .update(update)
+    .eq('id', messageId);
+  if (updateError) {
+    console.error('Failed to update message record:', updateError);
+  }
+  return { ...message, ...update };
+}